@@ -1,33 +1,114 @@
+"""
+Advent Of Code 2019 runner.
+
+Day packages (dayNN/dayNN.py) are discovered on disk and imported only when they are run (see commons.solvers), only
+requested parts are solved. Independent days run concurrently in a process pool, results are printed in day order.
+    python AdventOfCode2019.py                      - all days
+    python -m AdventOfCode2019 --days 3 7 --parts 1 - part one of day03 and day07
+    python -m AdventOfCode2019 --workers 1 --timing - sequentially in this process, with wall time of every day
+"""
+from commons.solvers import PART_NAMES, PART_NUMBERS, dayNumber, discoverDays, getSolver
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import argparse
+import os
+import sys
+import time
+
 RESULT_PRINT_FORMAT = "Day {day_number}, partOne: {solution[0]}\nDay {day_number}, partTwo: {solution[1]}"
+PART_PRINT_FORMAT = "Day {day_number}, part{part_name}: {result}"
+
+
+def runDay(day_number, parts=PART_NUMBERS):
+    """
+    Loads input of single day and solves requested parts only.
+    :param day_number: e.g. "03"
+    :param parts: parts to be solved
+    :return: tuple(day_number, solution[tuple of results in order of parts], wall_time[float])
+    """
+    start = time.perf_counter()
+    solution = getSolver(day_number).solve(parts=parts)
+    return day_number, solution, time.perf_counter() - start
+
+
+def runDays(day_numbers, workers=None, parts=PART_NUMBERS):
+    """
+    Runs days, concurrently in a process pool (workers > 1), or one after another in this process (workers == 1).
+    :param day_numbers: [] of day numbers
+    :param workers: number of pool processes (default - number of CPUs)
+    :param parts: parts to be solved
+    :return: [] of tuples (day_number, solution, wall_time) in order of day_numbers
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(day_numbers))
+
+    if workers <= 1:
+        return [runDay(day_number, parts) for day_number in day_numbers]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runDay, day_numbers, repeat(tuple(parts))))
+
+
+def formatResults(day_results, parts=PART_NUMBERS):
+    """
+    Formats solutions of days in day order.
+    :param day_results: [] of tuples (day_number, solution, wall_time)
+    :param parts: parts the solutions hold
+    :return: str
+    """
+    lines = []
+    for day_number, solution, wall_time in sorted(day_results):
+        if tuple(parts) == PART_NUMBERS:
+            lines.append(RESULT_PRINT_FORMAT.format(day_number=day_number, solution=solution))
+        else:
+            lines.extend(PART_PRINT_FORMAT.format(day_number=day_number, part_name=PART_NAMES[part], result=result)
+                         for part, result in zip(parts, solution))
+    return "\n".join(lines)
+
+
+def formatTimings(day_results, total_time):
+    """
+    Formats wall time of every day and of the whole run.
+    """
+    lines = ["{:<8}{:>12}".format("day", "wall time")]
+    lines.extend("{:<8}{:>11.3f}s".format(day_number, wall_time)
+                 for day_number, solution, wall_time in sorted(day_results))
+    lines.append("{:<8}{:>11.3f}s".format("total", total_time))
+    return "\n".join(lines)
 
-# Run day01
-from day01 import day01
-print(RESULT_PRINT_FORMAT.format(day_number="01", solution=day01.solve()))
 
-# Run day02
-from day02 import day02
-print(RESULT_PRINT_FORMAT.format(day_number="02", solution=day02.solve()))
+def main(arguments=None):
+    available_days = discoverDays()
 
-# Run day03
-from day03 import day03
-print(RESULT_PRINT_FORMAT.format(day_number="03", solution=day03.solve()))
+    parser = argparse.ArgumentParser(description="Advent Of Code 2019 solutions runner")
+    parser.add_argument("--days", nargs="+", type=int, help="days to run (default - all days)")
+    parser.add_argument("--parts", nargs="+", type=int, choices=PART_NUMBERS, default=list(PART_NUMBERS),
+                        help="parts to solve (default - both)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes running days concurrently, 1 - run in this process "
+                             "(default - number of CPUs)")
+    parser.add_argument("--timing", action="store_true", help="print wall time of every day")
+    arguments = parser.parse_args(arguments)
 
-# Run day04
-from day04 import day04
-print(RESULT_PRINT_FORMAT.format(day_number="04", solution=day04.solve()))
+    if arguments.days is None:
+        day_numbers = available_days
+    else:
+        day_numbers = [dayNumber(day) for day in sorted(set(arguments.days))]
+        unknown_days = [day_number for day_number in day_numbers if day_number not in available_days]
+        if unknown_days:
+            parser.error("unknown days {}, available days {}".format(", ".join(unknown_days),
+                                                                     ", ".join(available_days)))
 
-# Run day05
-from day05 import day05
-print(RESULT_PRINT_FORMAT.format(day_number="05", solution=day05.solve()))
+    parts = tuple(sorted(set(arguments.parts)))
+    start = time.perf_counter()
+    day_results = runDays(day_numbers, arguments.workers, parts)
+    total_time = time.perf_counter() - start
 
-# Run day06
-from day06 import day06
-print(RESULT_PRINT_FORMAT.format(day_number="06", solution=day06.solve()))
+    print(formatResults(day_results, parts))
+    if arguments.timing:
+        print(formatTimings(day_results, total_time), file=sys.stderr)
 
-# Run day07
-from day07 import day07
-print(RESULT_PRINT_FORMAT.format(day_number="07", solution=day07.solve()))
 
-# Run day08
-from day08 import day08
-print(RESULT_PRINT_FORMAT.format(day_number="08", solution=day08.solve()))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
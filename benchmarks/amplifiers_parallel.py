@@ -0,0 +1,52 @@
+"""
+Scaling of day07 amplifier search over executors, for N amplifiers (N! phase permutations).
+Run from root package: python -m benchmarks.amplifiers_parallel [max_amplifiers_count]
+"""
+from commons.intcode import ProgramImage
+from day07.day07 import findMaxAmplifiersOutput
+import os
+import sys
+import time
+
+# Synthetic amplifier: reads phase and signal, spins in a short work loop, outputs signal * 3 + phase
+AMPLIFIER_PROGRAM = [3, 100,  # phase -> 100
+                     3, 101,  # signal -> 101
+                     1101, 0, 20, 102,  # counter = 20
+                     1001, 102, -1, 102,  # counter -= 1
+                     1005, 102, 8,  # if counter != 0: jump to 8
+                     1002, 101, 3, 101,  # signal *= 3
+                     1, 101, 100, 101,  # signal += phase
+                     4, 101,  # output signal
+                     99]
+AMPLIFIER_PROGRAM += [0] * (103 - len(AMPLIFIER_PROGRAM))
+
+
+def main():
+    max_amplifiers_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    program_image = ProgramImage(AMPLIFIER_PROGRAM)
+    ROW_FORMAT = "{:>11}{:>14}{:>12}{:>12}{:>12}"
+
+    print("CPUs: {}".format(os.cpu_count()))
+    print(ROW_FORMAT.format("amplifiers", "permutations", "serial", "thread", "process"))
+
+    for amplifiers_count in range(5, max_amplifiers_count + 1):
+        timings = []
+        results = set()
+
+        for executor in ("serial", "thread", "process"):
+            start = time.perf_counter()
+            results.add(findMaxAmplifiersOutput(program_image, range(amplifiers_count), False, executor=executor))
+            timings.append(time.perf_counter() - start)
+
+        # Every executor must find the same maximum
+        assert len(results) == 1, results
+
+        permutations_count = 1
+        for i in range(2, amplifiers_count + 1):
+            permutations_count *= i
+
+        print(ROW_FORMAT.format(amplifiers_count, permutations_count, *("{:.3f}s".format(x) for x in timings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares scalar and batched (NumPy lockstep) Intcode execution on parameter sweeps.
+Run from root package: python -m benchmarks.intcode_batch
+"""
+from benchmarks.amplifiers_parallel import AMPLIFIER_PROGRAM
+from benchmarks.intcode_jit import PROGRAMS
+from commons.intcode import IntcodeMachine, ProgramImage
+from commons.intcode_batch import BatchMachine
+from day07.day07 import findMaxAmplifiersOutput
+import numpy
+import time
+
+
+def sweepDay02Scalar():
+    program_image = ProgramImage(PROGRAMS["02"])
+    results = []
+    for noun in range(100):
+        for verb in range(100):
+            machine = IntcodeMachine(program_image)
+            machine.setRegister(1, noun)
+            machine.setRegister(2, verb)
+            machine.runProgram()
+            results.append(machine.registers[0])
+    return results
+
+
+def sweepDay02Batch():
+    combinations = numpy.arange(100 * 100)
+    machine = BatchMachine(PROGRAMS["02"], len(combinations))
+    machine.setRegisters(1, combinations // 100)
+    machine.setRegisters(2, combinations % 100)
+    machine.runProgram()
+    return machine.getRegisters(0).tolist()
+
+
+def timeIt(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    ROW_FORMAT = "{:<28}{:>12}{:>12}{:>10}"
+    print(ROW_FORMAT.format("sweep", "scalar", "batch", "speedup"))
+
+    scalar_time, scalar_result = timeIt(sweepDay02Scalar)
+    batch_time, batch_result = timeIt(sweepDay02Batch)
+    assert scalar_result == batch_result
+    print(ROW_FORMAT.format("day02 noun/verb 100x100", "{:.4f}s".format(scalar_time), "{:.4f}s".format(batch_time),
+                            "{:.2f}x".format(scalar_time / batch_time)))
+
+    program_image = ProgramImage(AMPLIFIER_PROGRAM)
+    for amplifiers_count in range(5, 9):
+        scalar_time, scalar_result = timeIt(findMaxAmplifiersOutput, program_image, range(amplifiers_count), False)
+        batch_time, batch_result = timeIt(findMaxAmplifiersOutput, program_image, range(amplifiers_count), False,
+                                          None, "batch")
+        assert scalar_result == batch_result
+        print(ROW_FORMAT.format("{} amplifiers chain".format(amplifiers_count), "{:.4f}s".format(scalar_time),
+                                "{:.4f}s".format(batch_time), "{:.2f}x".format(scalar_time / batch_time)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compares interpreted and compiled (JIT) Intcode execution.
+Run from root package: python -m benchmarks.intcode_jit
+"""
+from commons.commons import read_puzzle_ints
+from commons.intcode import IntcodeMachine, predecodeProgram
+from commons.intcode_jit import CompiledProgram
+from commons.intcode_network import IntcodeNetwork
+from day05.day05 import VirtualMachine as Day05VirtualMachine
+from day07.day07 import VirtualMachine as Day07VirtualMachine
+from itertools import permutations
+import os
+import time
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def readProgram(day_number):
+    """
+    Reads Intcode program of a day.
+    :param day_number: e.g. "02"
+    :return: [] program
+    """
+    day_path = os.path.join(ROOT_PATH, "day" + day_number)
+    return list(read_puzzle_ints(day_path, "day{}_input.txt".format(day_number)))
+
+
+def countdownProgram(iterations):
+    """
+    Synthetic hot loop: counts down from iterations to 0, adding 3 to accumulator in every iteration, outputs accumulator.
+    :param iterations: loop iterations count
+    :return: [] program
+    """
+    program = [1101, 0, iterations, 100,  # counter = iterations
+               1001, 100, -1, 100,  # counter -= 1
+               1001, 101, 3, 101,  # accumulator += 3
+               1005, 100, 4,  # if counter != 0: jump to 4
+               4, 101,  # output accumulator
+               99]
+    return program + [0] * (102 - len(program))
+
+
+# Programs are read only once, so that compiled code can be shared between cold and warm runs
+PROGRAMS = {day_number: readProgram(day_number) for day_number in ("02", "05", "07")}
+COUNTDOWN_PROGRAM = countdownProgram(500000)
+
+
+def benchDay02(compiled):
+    program = PROGRAMS["02"]
+    predecoded = predecodeProgram(program)
+    results = []
+    for noun in range(100):
+        for verb in range(100):
+            machine = IntcodeMachine(program, predecoded, compiled(program, (1, 2)))
+            machine.setRegister(1, noun)
+            machine.setRegister(2, verb)
+            machine.runProgram()
+            results.append(machine.registers[0])
+    return hash(tuple(results))
+
+
+def benchDay05(compiled):
+    program = PROGRAMS["05"]
+    outputs = []
+    for system_id in (1, 5):
+        machine = Day05VirtualMachine(program, system_id, compiled(program))
+        machine.runProgram()
+        outputs.append(machine.getDiagnosticCode())
+    return tuple(outputs)
+
+
+def benchDay07(compiled):
+    program = PROGRAMS["07"]
+    max_output = 0
+    for phases in permutations(range(5, 10)):
+        network = IntcodeNetwork()
+        amplifiers = [network.addMachine(Day07VirtualMachine(program, phase, compiled(program))) for phase in phases]
+        network.connectChain(amplifiers, loop=True)
+        amplifiers[0].addInput(0)
+        network.run()
+        max_output = max(max_output, amplifiers[-1].getDiagnosticCode())
+    return max_output
+
+
+def benchCountdown(compiled):
+    program = COUNTDOWN_PROGRAM
+    machine = IntcodeMachine(program, compiled=compiled(program))
+    machine.runProgram()
+    return machine.getDiagnosticCode()
+
+
+def interpreted(program, volatile_addresses=()):
+    return None
+
+
+def sharedCompiled():
+    """
+    Returns factory, which compiles program once and shares compiled code by all machines (warm JIT after first run).
+    """
+    compiled_programs = {}
+
+    def factory(program, volatile_addresses=()):
+        if id(program) not in compiled_programs:
+            compiled_programs[id(program)] = CompiledProgram(program, volatile_addresses)
+        return compiled_programs[id(program)]
+
+    return factory
+
+
+def timeIt(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    BENCHMARKS = [("day02 noun/verb sweep", benchDay02), ("day05 diagnostics", benchDay05),
+                  ("day07 feedback search", benchDay07), ("countdown loop 500k", benchCountdown)]
+    ROW_FORMAT = "{:<24}{:>14}{:>14}{:>14}{:>10}"
+
+    print(ROW_FORMAT.format("benchmark", "interpreter", "jit cold", "jit warm", "speedup"))
+    for benchmark_name, benchmark in BENCHMARKS:
+        interpreter_time, interpreter_result = timeIt(benchmark, interpreted)
+
+        factory = sharedCompiled()
+        cold_time, cold_result = timeIt(benchmark, factory)
+        warm_time, warm_result = timeIt(benchmark, factory)
+
+        # Compiled code must produce exactly the same results
+        assert interpreter_result == cold_result == warm_result, benchmark_name
+
+        print(ROW_FORMAT.format(benchmark_name, "{:.4f}s".format(interpreter_time), "{:.4f}s".format(cold_time),
+                                "{:.4f}s".format(warm_time), "{:.2f}x".format(interpreter_time / warm_time)))
+
+
+if __name__ == "__main__":
+    main()
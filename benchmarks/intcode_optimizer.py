@@ -0,0 +1,71 @@
+"""
+Checks and measures Intcode optimizer - every program is run unmodified and optimized on the interpreter, with several
+inputs, and the runs must be equivalent (commons.intcode_optimizer.findDifferences). Then both are timed.
+Run from root package: python -m benchmarks.intcode_optimizer
+"""
+from benchmarks.amplifiers_parallel import AMPLIFIER_PROGRAM
+from benchmarks.intcode_jit import countdownProgram, readProgram
+from commons.intcode import IntcodeMachine, ProgramImage
+from commons.intcode_optimizer import findDifferences, optimizeProgram
+import time
+
+# day02 noun and verb values
+NOUN_VERB_VALUES = range(100)
+
+# Program name: (program, volatile addresses, preserved addresses, [] of (inputs, registers) runs)
+PROGRAMS = {
+    "day02": (readProgram("02"), {1: NOUN_VERB_VALUES, 2: NOUN_VERB_VALUES}, (0,),
+              [((), {1: noun, 2: verb}) for noun in range(0, 100, 11) for verb in range(0, 100, 7)]),
+    "day05": (readProgram("05"), (), (), [((system_id,), None) for system_id in (1, 5)]),
+    "day07": (readProgram("07"), (), (), [((phase, signal), None) for phase in range(10) for signal in (0, 17)]),
+    "countdown loop 200k": (countdownProgram(200000), (), (), [((), None)]),
+    "amplifier": (AMPLIFIER_PROGRAM, (), (), [((phase, signal), None) for phase in range(10) for signal in (0, 17)]),
+}
+
+
+def runAll(program_image, runs):
+    for inputs, registers in runs:
+        machine = IntcodeMachine(program_image)
+        for address, value in (registers or {}).items():
+            machine.setRegister(address, value)
+        machine.addInput(*inputs)
+        machine.runProgram()
+
+
+def timeIt(function, *args, repeat=3):
+    """
+    Returns best wall time of repeat calls.
+    """
+    best_time = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+    return best_time
+
+
+def main():
+    ROW_FORMAT = "{:<22}{:>8}{:>8}{:>14}{:>14}{:>10}"
+    print(ROW_FORMAT.format("program", "folded", "fused", "unmodified", "optimized", "speedup"))
+
+    for program_name, (program, volatile_addresses, preserve_addresses, runs) in PROGRAMS.items():
+        optimized_program = optimizeProgram(program, volatile_addresses, preserve_addresses)
+        if not optimized_program.analysis.complete:
+            print("{:<22}not optimized - {}".format(program_name, optimized_program.analysis.reason))
+            continue
+
+        # Optimized program must behave exactly as unmodified one
+        for inputs, registers in runs:
+            differences = findDifferences(program, optimized_program, inputs, registers)
+            assert not differences, "{} {} {}: {}".format(program_name, inputs, registers, differences)
+
+        unmodified_time = timeIt(runAll, ProgramImage(program), runs)
+        optimized_time = timeIt(runAll, optimized_program.image, runs)
+        print(ROW_FORMAT.format(program_name, optimized_program.folded_operands,
+                                len(optimized_program.fused_addresses), "{:.4f}s".format(unmodified_time),
+                                "{:.4f}s".format(optimized_time), "{:.2f}x".format(unmodified_time / optimized_time)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmark suite - seeded synthetic inputs for every day, far larger than the bundled puzzle inputs (long Intcode
+programs, multi-million-step wires, wide password ranges, deep orbit trees, huge images).
+Input is parsed and solved by the registered parse and part functions of the day (commons.solvers).
+Every step (parsing and parts) is timed as best of repeated runs, peak memory is measured in a separate traced run.
+Parts run on freshly parsed input every time (parsed inputs memoize their own work, e.g. day06 orbit depths).
+Results can be saved as a baseline and compared with later runs.
+Run from root package:
+    python -m benchmarks.suite [--days 3 6] [--scale 2] [--repeat 3] [--seed 2019] [--save FILE] [--compare FILE]
+"""
+from benchmarks.amplifiers_parallel import AMPLIFIER_PROGRAM
+from commons.solvers import PART_NAMES, getSolver
+from day02.day02 import EXPECTED_OUTPUT, runProgram
+from day08.day08 import COL_HEIGHT, ROW_WIDTH, decodeImageFile
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+
+# Generators of synthetic inputs - every generator returns tuple(input description, puzzle input text, extra steps),
+# input is parsed and solved by parse and part functions of the day (see commons.solvers), extra steps are [] of
+# tuples (step name, function) measured on top of them
+
+
+def generateDay01(rng, scale, work_path):
+    masses_count = int(1000000 * scale)
+    masses_text = "\n".join(str(rng.randint(1000, 10 ** 9)) for i in range(masses_count))
+    return "{} masses".format(masses_count), masses_text, []
+
+
+def generateDay02(rng, scale, work_path):
+    # Same shape as puzzle program: mem[3] = noun + verb, then long chain of add/mul with constants, result to mem[0]
+    instructions_count = int(20000 * scale)
+    instructions = [1, 0, 0, 3, 1, 1, 2, 3]
+    constants = []
+    data_start = len(instructions) + 4 * instructions_count + 4 + 1
+
+    for i in range(instructions_count):
+        if rng.random() < 0.002:
+            instructions += [2, 3, data_start + len(constants), 3]
+            constants.append(2)
+        else:
+            instructions += [1, 3, data_start + len(constants), 3]
+            constants.append(rng.randint(0, 1000))
+    instructions += [1, 3, data_start + len(constants), 0, 99]
+    constants.append(0)
+
+    # Last constant is chosen so that random noun and verb give the output part two is looking for
+    program = instructions + constants
+    constants[-1] = EXPECTED_OUTPUT - runProgram(program, rng.randint(0, 99), rng.randint(0, 99))
+    program_text = ",".join(str(word) for word in instructions + constants)
+    return "{} instructions".format(instructions_count + 3), program_text, []
+
+
+def generateDay03(rng, scale, work_path):
+    segments_count = int(2000 * scale)
+    wires_text = ["".join(",{}{}".format(rng.choice("LRUD"), rng.randint(1, 5000))
+                          for i in range(segments_count))[1:] for wire in range(2)]
+    wire_length = sum(int(section[1:]) for section in wires_text[0].split(","))
+    return "2 wires x {} segments, {} steps".format(segments_count, wire_length), "\n".join(wires_text), []
+
+
+def generateDay04(rng, scale, work_path):
+    digits_count = max(6, round(12 * scale))
+    password_min = rng.randint(10 ** (digits_count - 1), 10 ** digits_count // 2)
+    password_max = rng.randint(password_min, 10 ** digits_count - 1)
+    return "{}-digit range".format(digits_count), "{}-{}".format(password_min, password_max), []
+
+
+def generateDay05(rng, scale, work_path):
+    # Reads system id, adds it to accumulator in a loop, outputs accumulator
+    iterations = int(300000 * scale)
+    program = [3, 100,  # system id -> 100
+               1101, 0, iterations, 101,  # counter = iterations
+               1001, 101, -1, 101,  # counter -= 1
+               1, 102, 100, 102,  # accumulator += system id
+               1005, 101, 6,  # if counter != 0: jump to 6
+               4, 102,  # output accumulator
+               99]
+    program += [0] * (103 - len(program))
+    return "{} loop iterations".format(iterations), ",".join(str(word) for word in program), []
+
+
+def generateDay06(rng, scale, work_path):
+    bodies_count = int(300000 * scale)
+    chain_depth = bodies_count // 6
+    orbits = ["COM)P1"] + ["P{})P{}".format(i - 1, i) for i in range(2, chain_depth + 1)]
+    orbits += ["P{})P{}".format(rng.randint(1, i - 1), i) for i in range(chain_depth + 1, bodies_count)]
+    orbits += ["P{})YOU".format(rng.randint(1, bodies_count - 1)), "P{})SAN".format(rng.randint(1, bodies_count - 1))]
+    rng.shuffle(orbits)
+    return "{} bodies, chain {} deep".format(bodies_count, chain_depth), "\n".join(orbits), []
+
+
+def generateDay07(rng, scale, work_path):
+    # Amplifier work loop counter scaled
+    loop_iterations = int(200 * scale)
+    program = AMPLIFIER_PROGRAM[:]
+    program[6] = loop_iterations
+    return "amplifier loop x{}".format(loop_iterations), ",".join(str(word) for word in program), []
+
+
+def generateDay08(rng, scale, work_path):
+    layers_count = int(60000 * scale)
+    image_text = "".join(rng.choice("0122222222") for i in range(ROW_WIDTH * COL_HEIGHT * layers_count))
+
+    # Same image decoded in chunks straight from file
+    image_path = os.path.join(work_path, "day08_image.txt")
+    with open(image_path, "w") as image_file:
+        image_file.write(image_text + "\n")
+
+    return "{}x{} x {} layers".format(ROW_WIDTH, COL_HEIGHT, layers_count), image_text, [
+        ("decodeFile", lambda: decodeImageFile(image_path, ROW_WIDTH, COL_HEIGHT)),
+    ]
+
+
+GENERATORS = {"01": generateDay01, "02": generateDay02, "03": generateDay03, "04": generateDay04,
+              "05": generateDay05, "06": generateDay06, "07": generateDay07, "08": generateDay08}
+
+
+def daySteps(day_number, input_text, extra_steps):
+    """
+    Returns measured steps of a day - parse, every part of the day and extra steps. Parts are solved on input parsed
+    by their setup before every run, so that no run reuses work memoized by the parsed input of previous one.
+    :return: [] of tuples (step name, function, setup function[None - no setup])
+    """
+    solver = getSolver(day_number)
+    parsed = {}
+
+    def parse():
+        parsed["input"] = solver.parseInput(input_text)
+
+    def partStep(part):
+        return lambda: solver.solvePart(part, parsed["input"])
+
+    return [("parse", parse, None)] + [("part" + PART_NAMES[part], partStep(part), parse)
+                                       for part in sorted(solver.parts)] + \
+        [(step_name, function, None) for step_name, function in extra_steps]
+
+
+def measureStep(function, repeat, setup=None):
+    """
+    Returns best wall time of repeat runs and peak traced memory of one more run.
+    :param setup: function called before every run (not measured)
+    :return: tuple(time[float], peak_bytes[int])
+    """
+    best_time = None
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best_time = elapsed if best_time is None else min(best_time, elapsed)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best_time, peak_bytes
+
+
+def runSuite(day_numbers, scale=1.0, repeat=3, seed=2019):
+    """
+    Generates inputs and measures every step of every day.
+    :return: [] of dicts (day, input, step, time, peak_bytes)
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as work_path:
+        for day_number in day_numbers:
+            rng = random.Random("{}-{}".format(seed, day_number))
+            input_description, input_text, extra_steps = GENERATORS[day_number](rng, scale, work_path)
+            for step_name, function, setup in daySteps(day_number, input_text, extra_steps):
+                step_time, peak_bytes = measureStep(function, repeat, setup)
+                results.append({"day": day_number, "input": input_description, "step": step_name, "time": step_time,
+                                "peak_bytes": peak_bytes})
+    return results
+
+
+def formatResults(results, baseline_results=None):
+    """
+    Formats table of results, with time ratio to baseline (same day, input and step) if baseline is given.
+    """
+    baseline_times = {(result["day"], result["input"], result["step"]): result["time"]
+                      for result in baseline_results or ()}
+
+    ROW_FORMAT = "{:<5}{:<38}{:<13}{:>11}{:>12}{:>10}"
+    lines = [ROW_FORMAT.format("day", "input", "step", "time", "peak MB", "vs base")]
+    for result in results:
+        baseline_time = baseline_times.get((result["day"], result["input"], result["step"]))
+        ratio = "{:.2f}x".format(result["time"] / baseline_time) if baseline_time else "-"
+        lines.append(ROW_FORMAT.format(result["day"], result["input"], result["step"], "{:.4f}s".format(result["time"]),
+                                       "{:.1f}".format(result["peak_bytes"] / 2 ** 20), ratio))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite with synthetic inputs")
+    parser.add_argument("--days", nargs="+", type=int, help="days to benchmark (default - all days)")
+    parser.add_argument("--scale", type=float, default=1.0, help="input size multiplier")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of every step (best is reported)")
+    parser.add_argument("--seed", type=int, default=2019, help="seed of input generators")
+    parser.add_argument("--save", help="save results as baseline JSON file")
+    parser.add_argument("--compare", help="compare with baseline JSON file")
+    arguments = parser.parse_args()
+
+    day_numbers = sorted(GENERATORS) if arguments.days is None else ["{:02d}".format(day) for day in arguments.days]
+    results = runSuite(day_numbers, arguments.scale, arguments.repeat, arguments.seed)
+
+    baseline_results = None
+    if arguments.compare:
+        with open(arguments.compare) as baseline_file:
+            baseline_results = json.load(baseline_file)["results"]
+    print(formatResults(results, baseline_results))
+
+    if arguments.save:
+        with open(arguments.save, "w") as baseline_file:
+            json.dump({"python": platform.python_version(), "scale": arguments.scale, "seed": arguments.seed,
+                       "results": results}, baseline_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
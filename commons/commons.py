@@ -1,8 +1,182 @@
+"""
+Puzzle input layer shared by all days.
+
+Files are always opened by absolute path (directory of the day module + file name), the working directory of the
+process is never changed, so days may be solved from threads or parallel processes. Besides lines, input can be read
+as raw bytes, memory mapped, iterated lazily line by line, or parsed in bulk to lists or arrays of integers.
+
+Parsed form of an input can be cached next to the input file (load_parsed_input), repeated runs then skip parsing.
+"""
+from array import array
+from contextlib import contextmanager
+import hashlib
+import mmap
+import os
+import pickle
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def puzzle_input_path(path, file_name):
+    """
+    Returns absolute path of input file.
+    :param path: directory of input file, e.g. os.path.dirname(os.path.abspath(__file__))
+    :param file_name: name of input file
+    """
+    return os.path.join(os.path.abspath(path), file_name)
+
+
 def read_puzzle_input(path, file_name):
-    import os
-    os.chdir(path)
+    """
+    Reads input file as list of lines (including line endings).
+    """
+    with open(puzzle_input_path(path, file_name), "r") as input_file:
+        return input_file.readlines()
+
+
+def read_puzzle_bytes(path, file_name):
+    """
+    Reads whole input file as bytes, without decoding.
+    """
+    with open(puzzle_input_path(path, file_name), "rb") as input_file:
+        return input_file.read()
+
+
+@contextmanager
+def map_puzzle_input(path, file_name):
+    """
+    Memory maps input file (read only), pages are loaded by the OS only when they are accessed. Slices of the map
+    are bytes, memoryview(map) gives zero-copy view.
+        with map_puzzle_input(path, "input.txt") as input_map:
+            ...
+    """
+    with open(puzzle_input_path(path, file_name), "rb") as input_file:
+        # Empty file can't be mapped
+        if os.fstat(input_file.fileno()).st_size == 0:
+            yield b""
+            return
+        input_map = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield input_map
+        finally:
+            input_map.close()
+
+
+def iter_puzzle_lines(path, file_name):
+    """
+    Lazily iterates lines of input file (without line endings), file is never read whole into memory.
+    """
+    with open(puzzle_input_path(path, file_name), "r") as input_file:
+        for input_line in input_file:
+            yield input_line.rstrip("\r\n")
+
+
+def parse_ints(data, separator=b",", as_numpy=False):
+    """
+    Parses separated integers in bulk, e.g. Intcode program "1,0,0,3,99" or one number per line (separator=None -
+    any whitespace).
+    :param data: bytes (or mmap, str)
+    :param separator: separator of numbers, None - any whitespace
+    :param as_numpy: True - return numpy int64 array (requires numpy, values must fit int64)
+    :return: [] of integers (unbounded, e.g. Intcode values), or numpy array
+    """
+    data = data.encode("ascii") if isinstance(data, str) else bytes(data)
+    if isinstance(separator, str):
+        separator = separator.encode("ascii")
+
+    # int() accepts bytes with surrounding whitespace (e.g. trailing new line)
+    values = list(map(int, data.split(separator))) if data.strip() else []
+
+    if as_numpy:
+        if numpy is None:
+            raise ImportError("as_numpy requires numpy")
+        # Packed to int64 in bulk, OverflowError for values out of its range
+        return numpy.frombuffer(array("q", values), dtype=numpy.int64).copy()
+    return values
+
+
+def read_puzzle_ints(path, file_name, separator=b",", as_numpy=False):
+    """
+    Reads input file of separated integers, see parse_ints.
+    """
+    return parse_ints(read_puzzle_bytes(path, file_name), separator, as_numpy)
+
+
+# Parsed input cache file: <input file>.<cache name>.parsed, contains pickled header followed by pickled parsed input
+PARSED_CACHE_SUFFIX = ".parsed"
+PARSED_CACHE_FORMAT = 2
+# Set to "0" to disable parsed input cache (inputs are always parsed)
+PARSED_CACHE_ENVIRONMENT_VARIABLE = "AOC_PARSED_INPUT_CACHE"
+
+
+def _file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_parsed_input(path, file_name, cache_name, parse_function, validate="mtime", parser_version=1):
+    """
+    Returns parsed input - parse_function(path, file_name) result, cached in binary file next to the input file.
+    Cache is used only while the input file and the parser are unchanged, otherwise input is parsed again and cache
+    rewritten.
+    Cache, which can't be read or written (e.g. read only directory), is silently ignored.
+    :param path: directory of input file
+    :param file_name: name of input file
+    :param cache_name: name of parsed form, e.g. "intcode" - different parsers of same input must use different names
+    :param parse_function: function(path, file_name) returning picklable parsed input
+    :param validate: "mtime" - cache is valid for same size and modification time of input file, "hash" - also for
+        same SHA-256 of contents (survives touch, copy or checkout of unchanged file)
+    :param parser_version: version of parsed form - increase it, whenever parse_function or classes of parsed input
+        change, so caches pickled by the old parser are not loaded (qualified name of parse_function is checked too)
+    :return: parsed input
+    """
+    if os.environ.get(PARSED_CACHE_ENVIRONMENT_VARIABLE, "1") == "0":
+        return parse_function(path, file_name)
+
+    input_path = puzzle_input_path(path, file_name)
+    cache_path = "{}.{}{}".format(input_path, cache_name, PARSED_CACHE_SUFFIX)
+
+    input_stat = os.stat(input_path)
+    header = {"format": PARSED_CACHE_FORMAT, "cache_name": cache_name, "size": input_stat.st_size,
+              "mtime_ns": input_stat.st_mtime_ns,
+              "parser": "{}.{}".format(parse_function.__module__, parse_function.__qualname__),
+              "parser_version": parser_version}
+
+    try:
+        with open(cache_path, "rb") as cache_file:
+            cached_header = pickle.load(cache_file)
+            if all(cached_header.get(key) == value for key, value in header.items()):
+                return pickle.load(cache_file)
+            if validate == "hash" and all(cached_header.get(key) == header[key]
+                                          for key in ("format", "cache_name", "size", "parser", "parser_version")) and \
+                    cached_header.get("sha256") == _file_digest(input_path):
+                return pickle.load(cache_file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, IndexError, TypeError):
+        pass
+
+    parsed_input = parse_function(path, file_name)
+
+    if validate == "hash":
+        header["sha256"] = _file_digest(input_path)
+
+    # Written to unique temporary file first, parallel runs (processes or threads) never read half-written cache
+    temporary_path = None
+    try:
+        file_descriptor, temporary_path = tempfile.mkstemp(prefix=os.path.basename(cache_path) + ".",
+                                                           dir=os.path.dirname(cache_path))
+        with os.fdopen(file_descriptor, "wb") as cache_file:
+            pickle.dump(header, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(parsed_input, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    except OSError:
+        if temporary_path is not None and os.path.exists(temporary_path):
+            os.remove(temporary_path)
 
-    input_file = open(file_name, "r")
-    input_lines = input_file.readlines()
-    input_file.close()
-    return input_lines
+    return parsed_input
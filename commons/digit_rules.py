@@ -0,0 +1,264 @@
+"""
+Digit rules (password-style constraints) compiled into a digit-DP automaton.
+
+Every rule is a small automaton over decimal digits of a number - initialState(), step(state, digit) returning next
+state (None rejects the number) and accepts(state). DigitAutomaton runs several rule sets at once (product of rule
+states) and counts or enumerates numbers of a range [low, high], which satisfy all rules of a set. Counting memoizes
+(remaining digits, state) pairs, so it takes time polynomial in the number of digits, not in the size of the range.
+
+New rules subclass DigitRule - step() must be overridden, initialState() and accepts() have defaults, e.g.:
+    DigitAutomaton([[NonDecreasing(), RunLength(2)], [NonDecreasing(), RunLength(2, 2)]]).count(lo, hi)
+"""
+from abc import ABC, abstractmethod
+
+
+class DigitRule(ABC):
+    """
+    Base class of digit rules. States must be hashable.
+    """
+    def initialState(self):
+        return None
+
+    @abstractmethod
+    def step(self, state, digit):
+        """
+        Returns state after digit is appended, None if no number with such prefix can satisfy the rule.
+        """
+
+    def accepts(self, state):
+        """
+        Returns True, when number ending in state satisfies the rule.
+        """
+        return True
+
+
+class NonDecreasing(DigitRule):
+    def __init__(self, strict=False):
+        """
+        Digits never decrease (e.g. 11234), with strict=True they always increase (e.g. 12349).
+        """
+        self.strict = strict
+
+    def step(self, state, digit):
+        if state is not None and (digit < state or (self.strict and digit == state)):
+            return None
+        return digit
+
+
+class NonIncreasing(DigitRule):
+    def __init__(self, strict=False):
+        """
+        Digits never increase (e.g. 99310), with strict=True they always decrease (e.g. 9310).
+        """
+        self.strict = strict
+
+    def step(self, state, digit):
+        if state is not None and (digit > state or (self.strict and digit == state)):
+            return None
+        return digit
+
+
+class RunLength(DigitRule):
+    def __init__(self, min_length, max_length=None):
+        """
+        Some run of same digits (not part of a longer run) is min_length..max_length digits long, e.g. RunLength(2) -
+        two or more same digits in a row, RunLength(2, 2) - exactly two same digits in a row.
+        :param min_length: minimum length of run
+        :param max_length: maximum length of run (default - unlimited)
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        # Run length is counted only up to the limit - longer runs can't change the result any more
+        self.run_limit = min_length if max_length is None else max_length + 1
+
+    def _matches(self, run):
+        return run >= self.min_length and (self.max_length is None or run <= self.max_length)
+
+    def initialState(self):
+        # (last digit, length of current run, some finished run matches)
+        return None, 0, False
+
+    def step(self, state, digit):
+        last_digit, run, found = state
+        if digit == last_digit:
+            return last_digit, min(run + 1, self.run_limit), found
+        return digit, 1, found or self._matches(run)
+
+    def accepts(self, state):
+        return state[2] or self._matches(state[1])
+
+
+class DigitSum(DigitRule):
+    def __init__(self, minimum=0, maximum=None):
+        """
+        Sum of digits is minimum..maximum.
+        :param minimum: minimum sum
+        :param maximum: maximum sum (default - unlimited)
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def initialState(self):
+        return 0
+
+    def step(self, state, digit):
+        digit_sum = state + digit
+        if self.maximum is not None and digit_sum > self.maximum:
+            return None
+        # Without maximum only reaching minimum matters
+        return digit_sum if self.maximum is not None else min(digit_sum, self.minimum)
+
+    def accepts(self, state):
+        return state >= self.minimum
+
+
+# State of rejected rule in automaton state (None is a valid rule state, e.g. NonDecreasing before first digit)
+_REJECTED = ("rejected",)
+
+
+def _rejectedIfNone(rule_state):
+    return _REJECTED if rule_state is None else rule_state
+
+
+class DigitAutomaton():
+    def __init__(self, rule_sets):
+        """
+        Compiles rule sets into single automaton, state is a tuple of states of all rules.
+        :param rule_sets: [] of [] of DigitRule - number matches a set, when it satisfies all its rules
+        """
+        self.rule_sets = [list(rule_set) for rule_set in rule_sets]
+        self.rules = [rule for rule_set in self.rule_sets for rule in rule_set]
+
+        # Indexes of rules of every set in the state tuple
+        self.set_rules = []
+        first_idx = 0
+        for rule_set in self.rule_sets:
+            self.set_rules.append(range(first_idx, first_idx + len(rule_set)))
+            first_idx += len(rule_set)
+
+        self.completions = {}  # Memoized counts of completions indexed by (remaining digits, state)
+
+    def initialState(self):
+        return tuple(rule.initialState() for rule in self.rules)
+
+    def step(self, state, digit):
+        """
+        Returns state after digit, rejected rules have state _REJECTED. None, when every rule set is rejected.
+        """
+        next_state = tuple(_REJECTED if rule_state is _REJECTED else _rejectedIfNone(rule.step(rule_state, digit))
+                           for rule, rule_state in zip(self.rules, state))
+        if all(any(next_state[rule_idx] is _REJECTED for rule_idx in rule_indexes) for rule_indexes in self.set_rules):
+            return None
+        return next_state
+
+    def accepts(self, state):
+        """
+        Returns tuple of 0/1 for every rule set - number ending in state satisfies all rules of the set.
+        """
+        return tuple(int(all(state[rule_idx] is not _REJECTED and self.rules[rule_idx].accepts(state[rule_idx])
+                             for rule_idx in rule_indexes))
+                     for rule_indexes in self.set_rules)
+
+    def _completions(self, remaining_digits, state):
+        """
+        Counts completions of prefix in state by remaining_digits digits (any digits), for every rule set.
+        """
+        key = (remaining_digits, state)
+        counts = self.completions.get(key)
+        if counts is not None:
+            return counts
+
+        if remaining_digits == 0:
+            counts = self.accepts(state)
+        else:
+            counts = [0] * len(self.rule_sets)
+            for digit in range(10):
+                next_state = self.step(state, digit)
+                if next_state is not None:
+                    for set_idx, count in enumerate(self._completions(remaining_digits - 1, next_state)):
+                        counts[set_idx] += count
+            counts = tuple(counts)
+
+        self.completions[key] = counts
+        return counts
+
+    def countUpTo(self, number):
+        """
+        Counts numbers 0..number matching every rule set.
+        :return: tuple of counts, one for every rule set
+        """
+        counts = [0] * len(self.rule_sets)
+        if number < 0:
+            return tuple(counts)
+
+        def addCounts(state, remaining_digits):
+            if state is not None:
+                for set_idx, count in enumerate(self._completions(remaining_digits, state)):
+                    counts[set_idx] += count
+
+        digits = [int(digit) for digit in str(number)]
+
+        # Shorter numbers - digits are not limited (only single digit number may start with 0)
+        for length in range(1, len(digits)):
+            for first_digit in range(0 if length == 1 else 1, 10):
+                addCounts(self.step(self.initialState(), first_digit), length - 1)
+
+        # Numbers of the same length - follow digits of number, every lower digit on a position frees the rest
+        state = self.initialState()
+        for position, limit_digit in enumerate(digits):
+            lowest_digit = 0 if position > 0 or len(digits) == 1 else 1
+            for digit in range(lowest_digit, limit_digit):
+                addCounts(self.step(state, digit), len(digits) - position - 1)
+
+            state = self.step(state, limit_digit)
+            if state is None:
+                return tuple(counts)
+
+        # Number itself
+        addCounts(state, 0)
+        return tuple(counts)
+
+    def count(self, low, high):
+        """
+        Counts numbers low..high (inclusive, not negative) matching every rule set.
+        :return: tuple of counts, one for every rule set
+        """
+        if high < low:
+            return (0,) * len(self.rule_sets)
+        return tuple(up_to_high - below_low for up_to_high, below_low
+                     in zip(self.countUpTo(high), self.countUpTo(low - 1)))
+
+    def enumerate(self, low, high, set_idx=0):
+        """
+        Generates numbers low..high (inclusive, not negative) matching rule set set_idx, in ascending order.
+        Subtrees without any match are skipped using memoized counts.
+        """
+        low = max(low, 0)
+
+        def walk(state, value, remaining_digits, low_digits, high_digits):
+            # low_digits/high_digits - remaining digits of limits, while prefix equals prefix of the limit
+            if remaining_digits == 0:
+                if self.accepts(state)[set_idx]:
+                    yield value
+                return
+
+            if low_digits is None and high_digits is None and not self._completions(remaining_digits, state)[set_idx]:
+                return
+
+            lowest_digit = low_digits[0] if low_digits is not None else 0
+            highest_digit = high_digits[0] if high_digits is not None else 9
+            for digit in range(lowest_digit, highest_digit + 1):
+                next_state = self.step(state, digit)
+                if next_state is None:
+                    continue
+                yield from walk(next_state, value * 10 + digit, remaining_digits - 1,
+                                low_digits[1:] if low_digits is not None and digit == lowest_digit else None,
+                                high_digits[1:] if high_digits is not None and digit == highest_digit else None)
+
+        for length in range(len(str(low)), len(str(high)) + 1):
+            length_low = max(low, 10 ** (length - 1) if length > 1 else 0)
+            length_high = min(high, 10 ** length - 1)
+            if length_low > length_high:
+                continue
+            yield from walk(self.initialState(), 0, length,
+                            [int(digit) for digit in str(length_low)], [int(digit) for digit in str(length_high)])
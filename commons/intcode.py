@@ -0,0 +1,417 @@
+"""
+Shared Intcode engine used by day02, day05 and day07.
+
+Every instruction word (opcode + parameter modes, e.g. 1002) is decoded exactly once into a specialised handler
+function. Handlers are looked up in DECODE_TABLE (keyed by the whole word) and cached per address in the machine, so
+the run loop performs a single list lookup and a single call per executed instruction - no mode parsing, no temporary
+lists or tuples.
+
+Accepted instruction words are the same as in the original day05/day07 machines - any non-negative word with known
+opcode, every non-zero mode digit means immediate mode and remaining digits (mode of write target, modes of halt) are
+ignored. DECODE_TABLE holds canonical words (modes 0 or 1 of parameters read with a mode), other words are decoded
+through canonicalInstruction.
+
+Handler contract: handler(vm, memory, decoded, ip) -> next instruction pointer.
+A negative return value (~next_ip) asks the run loop to stop and resume later from next_ip (program halted, machine
+paused after output or blocked on input).
+"""
+from collections import OrderedDict, deque
+import copy
+import threading
+
+# Operand access by parameter mode
+# position mode 0 - value stored at address given by parameter, immediate mode 1 - parameter itself
+_OPERAND_SOURCE = ("mem[mem[ip + {offset}]]", "mem[ip + {offset}]")
+
+# Handler templates indexed by opcode: (number of parameters read with a mode, source of the handler body).
+# Assignments are always treated as IMMEDIATE (the target address is the parameter itself), exactly as in the original
+# day05/day07 machines. Every write invalidates decoded cache on the written address, as the program may modify itself.
+_HANDLER_TEMPLATES = {
+    1: (2, "target = mem[ip + 3]\n"
+           "mem[target] = {p1} + {p2}\n"
+           "decoded[target] = None\n"
+           "return ip + 4\n"),
+    2: (2, "target = mem[ip + 3]\n"
+           "mem[target] = {p1} * {p2}\n"
+           "decoded[target] = None\n"
+           "return ip + 4\n"),
+    3: (0, "value = vm.readInput()\n"
+           "if value is None:\n"
+           "    vm.waiting_for_input = True\n"
+           "    vm.steps_executed -= 1\n"
+           "    return ~ip\n"
+           "target = mem[ip + 1]\n"
+           "mem[target] = value\n"
+           "decoded[target] = None\n"
+           "return ip + 2\n"),
+    4: (1, "value = {p1}\n"
+           "vm.machine_output.append(value)\n"
+           "for channel in vm.output_channels:\n"
+           "    channel.append(value)\n"
+           "if vm.pause_on_output:\n"
+           "    return ~(ip + 2)\n"
+           "return ip + 2\n"),
+    5: (2, "if {p1} != 0:\n"
+           "    return {p2}\n"
+           "return ip + 3\n"),
+    6: (2, "if {p1} == 0:\n"
+           "    return {p2}\n"
+           "return ip + 3\n"),
+    7: (2, "target = mem[ip + 3]\n"
+           "mem[target] = 1 if {p1} < {p2} else 0\n"
+           "decoded[target] = None\n"
+           "return ip + 4\n"),
+    8: (2, "target = mem[ip + 3]\n"
+           "mem[target] = 1 if {p1} == {p2} else 0\n"
+           "decoded[target] = None\n"
+           "return ip + 4\n"),
+    99: (0, "vm.stopped = True\n"
+            "return ~(ip + 1)\n"),
+}
+
+# Input instruction blocks (machine returns from runProgram and retries the instruction on next run), when readInput
+# returns NO_INPUT
+NO_INPUT = None
+
+# Instruction length (opcode word + parameters) indexed by opcode
+INSTRUCTION_LENGTHS = {1: 4, 2: 4, 3: 2, 4: 2, 5: 3, 6: 3, 7: 4, 8: 4, 99: 1}
+
+# Number of parameters read with a mode indexed by opcode (parameters of jumps included, write targets excluded)
+MODED_PARAMS_COUNTS = {opcode: moded_params_count for opcode, (moded_params_count, body_template)
+                       in _HANDLER_TEMPLATES.items()}
+
+# Write target parameter offset indexed by opcode, for instructions which write to memory
+WRITE_TARGET_OFFSETS = {1: 3, 2: 3, 3: 1, 7: 3, 8: 3}
+
+
+def canonicalInstruction(instruction_word):
+    """
+    Returns canonical form of instruction word (key of DECODE_TABLE), e.g. 21102 -> 1102, 1299 -> 99, 2001 -> 1001.
+    :param instruction_word: opcode + parameter modes
+    :return: int, None for invalid instruction word
+    """
+    if instruction_word < 0 or instruction_word % 100 not in _HANDLER_TEMPLATES:
+        return None
+    opcode = instruction_word % 100
+    return opcode + sum(100 * pow(10, param_idx) for param_idx in range(MODED_PARAMS_COUNTS[opcode])
+                        if instruction_word // (100 * pow(10, param_idx)) % 10)
+
+
+def handlerBody(instruction_word):
+    """
+    Returns python source of handler body (without indentation) for valid instruction word, e.g. 1002.
+    :param instruction_word: opcode + parameter modes
+    :return: str
+    """
+    instruction_word = canonicalInstruction(instruction_word)
+    opcode = instruction_word % 100
+    moded_params_count, body_template = _HANDLER_TEMPLATES[opcode]
+    # ABCDE -> DE = opcode, C = param1 mode, B = param2 mode
+    operands = {"p{}".format(param_idx + 1): _OPERAND_SOURCE[instruction_word // (100 * pow(10, param_idx)) % 10]
+                .format(offset=param_idx + 1) for param_idx in range(moded_params_count)}
+    return body_template.format(**operands)
+
+
+def _buildDecodeTable():
+    """
+    Generates specialised handler for every valid instruction word.
+    :return: dict {instruction_word: handler}
+    """
+    decode_table = {}
+
+    for opcode, (moded_params_count, body_template) in _HANDLER_TEMPLATES.items():
+        # Every combination of modes for parameters which are read, e.g. 00, 01, 10, 11 for two parameters
+        for modes_combination in range(pow(2, moded_params_count)):
+            param_modes = [(modes_combination >> param_idx) & 1 for param_idx in range(moded_params_count)]
+
+            # ABCDE -> DE = opcode, C = param1 mode, B = param2 mode
+            instruction_word = opcode + sum(mode * 100 * pow(10, param_idx)
+                                            for param_idx, mode in enumerate(param_modes))
+
+            handler_name = "op{}".format(instruction_word)
+            handler_source = "def {}(vm, mem, decoded, ip):\n".format(handler_name) + \
+                             "".join("    " + line + "\n" for line in handlerBody(instruction_word).splitlines())
+
+            namespace = {}
+            exec(compile(handler_source, "<intcode {}>".format(handler_name), "exec"), namespace)
+            decode_table[instruction_word] = namespace[handler_name]
+
+    return decode_table
+
+
+# Decoded handlers indexed by instruction word (opcode + modes), shared by all machines
+DECODE_TABLE = _buildDecodeTable()
+
+
+def getHandler(instruction_word):
+    """
+    Returns handler of instruction word, including words, which aren't canonical (see canonicalInstruction).
+    :return: handler, None for invalid instruction word
+    """
+    handler = DECODE_TABLE.get(instruction_word)
+    if handler is None:
+        canonical_word = canonicalInstruction(instruction_word)
+        if canonical_word is not None:
+            handler = DECODE_TABLE[canonical_word]
+    return handler
+
+
+def predecodeProgram(program_instructions):
+    """
+    Decodes every address of a program up front. Words, which are not valid instructions (data) are left as None.
+    Result can be shared by many machines running the same program, each machine works on its own copy.
+    :param program_instructions: [] program
+    :return: [] of handlers, indexed by address
+    """
+    return [getHandler(word) for word in program_instructions]
+
+
+class ProgramImage():
+    def __init__(self, program_instructions, predecoded=None):
+        """
+        Immutable base image of a program, shared by all machines (and snapshots) running it - program words and their
+        predecoded handlers. Machines copy it into their own memory, snapshots store only cells which differ from it.
+        Tuples are used for the image, as copying tuple into machine's list memory doesn't need to create any int
+        objects (unlike array('q')).
+        :param program_instructions: [] program
+        :param predecoded: [] handlers indexed by address (default - predecodeProgram(program_instructions)), e.g. with
+            fused handlers installed by commons.intcode_optimizer
+        """
+        self.words = tuple(program_instructions)
+        self.predecoded = tuple(predecodeProgram(self.words) if predecoded is None else predecoded)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __getitem__(self, address):
+        return self.words[address]
+
+
+# Images of recently used programs, indexed by program words (see getProgramImage)
+PROGRAM_IMAGE_CACHE_SIZE = 32
+_program_images = OrderedDict()
+_program_images_lock = threading.Lock()
+
+
+def getProgramImage(program_instructions):
+    """
+    Returns shared ProgramImage of a program. Images of recently used programs stay decoded, so that repeated runs of
+    the same program (e.g. every job of a long running service) skip decoding.
+    :param program_instructions: [] program or ProgramImage (returned as it is)
+    :return: ProgramImage
+    """
+    if isinstance(program_instructions, ProgramImage):
+        return program_instructions
+
+    words = tuple(program_instructions)
+    with _program_images_lock:
+        program_image = _program_images.pop(words, None)
+        if program_image is None:
+            program_image = ProgramImage(words)
+        # Most recently used image is last, least recently used is dropped
+        _program_images[words] = program_image
+        if len(_program_images) > PROGRAM_IMAGE_CACHE_SIZE:
+            _program_images.popitem(last=False)
+    return program_image
+
+
+def _copyState(state):
+    """
+    Copies machine attributes, containers (memory, outputs, input channel) are copied shallowly.
+    :param state: dict of attributes
+    :return: dict
+    """
+    return {key: copy.copy(value) if isinstance(value, (list, deque, dict, set)) else value
+            for key, value in state.items()}
+
+
+class MachineSnapshot():
+    def __init__(self, machine_class, image, overlay, state):
+        """
+        Immutable capture of machine state. Memory is stored as overlay over program image.
+        :param machine_class: class of captured machine
+        :param image: ProgramImage
+        :param overlay: tuple of (address, value) - memory cells, which differ from image
+        :param state: dict of remaining machine attributes (private copies of containers)
+        """
+        self.machine_class = machine_class
+        self.image = image
+        self.overlay = overlay
+        self.state = state
+
+    def restore(self):
+        """
+        Creates new machine in captured state.
+        :return: machine of captured class
+        """
+        machine = self.machine_class.__new__(self.machine_class)
+        machine.__dict__.update(_copyState(self.state))
+
+        machine.image = self.image
+        machine.registers = list(self.image.words)
+        machine.decoded = list(self.image.predecoded)
+        for address, value in self.overlay:
+            machine.registers[address] = value
+            machine.decoded[address] = None
+        machine.jit_state = None
+
+        return machine
+
+
+class IntcodeMachine():
+    def __init__(self, program_instructions, predecoded=None, compiled=None):
+        """
+        Creates machine, copy of program in internal memory and moves instruction pointer to beginning of program.
+        :param program_instructions: [] program or ProgramImage (shared predecoded image)
+        :param predecoded: [] result of predecodeProgram(program_instructions), skips decoding in every new machine
+        :param compiled: commons.intcode_jit.CompiledProgram - run compiled code instead of interpreting
+        """
+        if isinstance(program_instructions, ProgramImage):
+            self.image = program_instructions
+            predecoded = program_instructions.predecoded if predecoded is None else predecoded
+            program_instructions = program_instructions.words
+        else:
+            self.image = None
+
+        self.registers = list(program_instructions)
+        # Decoded handler cache, indexed by address
+        self.decoded = list(predecoded) if predecoded is not None else [None] * len(self.registers)
+        self.instruction_pointer = 0
+        self.machine_output = []
+        self.pause_on_output = False  # Return from runProgram after every output instruction
+        self.stopped = False
+        self.steps_executed = 0
+        self.compiled = compiled
+        self.jit_state = None  # Compiled code used by this machine, created on first run
+        self.input_channel = None  # deque of input values (see readInput)
+        self.output_channels = []  # deques, every output value is appended to
+        self.waiting_for_input = False
+        self.profiler = None  # commons.intcode_profiler.IntcodeProfiler, instrumented runs (see setProfiler)
+
+    def setProfiler(self, profiler):
+        """
+        Attaches profiler - following runs are interpreted by its instrumented loop (also in compiled mode), None
+        detaches it. Machines without profiler pay a single check per runProgram call.
+        :param profiler: commons.intcode_profiler.IntcodeProfiler, commons.intcode_trace.TraceRecorder (any object with
+            instrumented run(vm)) or None
+        """
+        self.profiler = profiler
+
+    def setRegister(self, address, value):
+        """
+        Writes value into memory before (or between) runs, decoded cache on the address is invalidated.
+        :param address: address to be modified
+        :param value: new value
+        """
+        self.registers[address] = value
+        self.decoded[address] = None
+        if self.jit_state is not None and self.jit_state.code[address]:
+            self.jit_state.invalidate(address, self.instruction_pointer)
+
+    def fork(self):
+        """
+        Returns independent copy of machine in its current state (e.g. to continue search from common prefix state,
+        instead of re-running it from address 0). Input channel is copied, output channels still point to the channels
+        of original machine's consumers.
+        :return: machine of same class
+        """
+        machine = self.__class__.__new__(self.__class__)
+        machine.__dict__.update(_copyState(self.__dict__))
+        # Compiled code state is bound to memory of the machine, forked machine builds its own
+        machine.jit_state = None
+        return machine
+
+    def snapshot(self):
+        """
+        Captures machine state. Memory is stored only as cells, which differ from program image.
+        :return: MachineSnapshot
+        """
+        image = self.image
+        if image is None or len(image.words) != len(self.registers):
+            image = ProgramImage(self.registers)
+
+        overlay = tuple((address, value) for address, (value, base_value) in enumerate(zip(self.registers, image.words))
+                        if value != base_value)
+
+        state = _copyState({key: value for key, value in self.__dict__.items()
+                            if key not in ("registers", "decoded", "image", "jit_state")})
+
+        return MachineSnapshot(self.__class__, image, overlay, state)
+
+    def addInput(self, *values):
+        """
+        Appends values to input channel of machine.
+        :param values: input values
+        """
+        if self.input_channel is None:
+            self.input_channel = deque()
+        self.input_channel.extend(values)
+
+    def readInput(self):
+        """
+        Returns value for input instruction - next value from input channel, NO_INPUT if the channel is empty (machine
+        blocks until more input arrives). Raises RuntimeError for machine without input channel. Override in machines,
+        which read input differently.
+        """
+        if self.input_channel is None:
+            raise RuntimeError("Machine does not provide input")
+        if self.input_channel:
+            return self.input_channel.popleft()
+        return NO_INPUT
+
+    def decode(self, address):
+        """
+        Decodes instruction word stored on address and caches the handler.
+        :param address: address of instruction word
+        :return: handler
+        """
+        handler = getHandler(self.registers[address])
+        if handler is None:
+            raise ValueError("Invalid instruction {} at address {}".format(self.registers[address], address))
+        self.decoded[address] = handler
+        return handler
+
+    def runProgram(self):
+        """
+        Runs program in machine memory, until it halts, blocks on empty input channel (or outputs a value, if
+        pause_on_output is set).
+        """
+        self.waiting_for_input = False
+
+        if self.profiler is not None:
+            self.profiler.run(self)
+            return
+
+        if self.compiled is not None:
+            self.compiled.run(self)
+            return
+
+        memory = self.registers
+        decoded = self.decoded
+        ip = self.instruction_pointer
+        steps = 0
+
+        while ip >= 0:
+            handler = decoded[ip]
+            if handler is None:
+                handler = self.decode(ip)
+            ip = handler(self, memory, decoded, ip)
+            steps += 1
+
+        self.instruction_pointer = ~ip
+        self.steps_executed += steps
+
+    def isStopped(self):
+        return self.stopped
+
+    def isWaitingForInput(self):
+        return self.waiting_for_input
+
+    def getDiagnosticCode(self):
+        """
+        Returns diagnostic code of a machine - last entry in machine output.
+        """
+        return self.machine_output[-1]
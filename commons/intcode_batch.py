@@ -0,0 +1,206 @@
+"""
+Batched Intcode execution - K instances of the same program run in lockstep, with NumPy memory of shape K x memory.
+
+Throughput mode for parameter sweeps (day02 noun/verb search, day07 phase permutations), where per-instance Python
+overhead dominates. Instances are grouped by instruction pointer and instruction word, every group is advanced by one
+instruction with vectorized add/mul/compare/jump operations. Instances, whose control flow diverges, simply end up in
+different groups.
+
+All arithmetic is done in int64.
+Requires NumPy (optional dependency - the rest of the package doesn't need it).
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from commons.intcode import INSTRUCTION_LENGTHS, canonicalInstruction
+
+# Canonical instruction words (opcode + modes) are always lower, grouping key is ip * _WORDS_RANGE + word
+_WORDS_RANGE = 100000
+
+
+class BatchMachine():
+    def __init__(self, program_instructions, instances_count):
+        """
+        Creates instances_count machines with the same program.
+        :param program_instructions: [] program or commons.intcode.ProgramImage
+        :param instances_count: number of instances K
+        """
+        if numpy is None:
+            raise ImportError("BatchMachine requires numpy")
+
+        self.instances_count = instances_count
+        self.registers = numpy.tile(numpy.array(list(program_instructions), dtype=numpy.int64), (instances_count, 1))
+        self.instruction_pointers = numpy.zeros(instances_count, dtype=numpy.int64)
+        self.stopped = numpy.zeros(instances_count, dtype=bool)
+        self.waiting_for_input = numpy.zeros(instances_count, dtype=bool)
+
+        # Input values - column per addInput call, every instance has its own read position
+        self.inputs = numpy.zeros((instances_count, 0), dtype=numpy.int64)
+        self.input_positions = numpy.zeros(instances_count, dtype=numpy.int64)
+
+        # Output events (instance indexes, values), last output and number of outputs of every instance
+        self.output_events = []
+        self.last_output = numpy.zeros(instances_count, dtype=numpy.int64)
+        self.output_counts = numpy.zeros(instances_count, dtype=numpy.int64)
+
+        self.steps_executed = 0  # Instructions executed by all instances together
+        self.groups_executed = 0  # Vectorized group steps
+
+    def setRegisters(self, address, values):
+        """
+        Writes value (or one value per instance) into memory of all instances.
+        :param address: address to be modified
+        :param values: int or array of K ints
+        """
+        self.registers[:, address] = values
+
+    def getRegisters(self, address):
+        """
+        Returns value on address of every instance.
+        :return: array of K ints
+        """
+        return self.registers[:, address].copy()
+
+    def addInput(self, values):
+        """
+        Appends one input value for every instance.
+        :param values: int or array of K ints
+        """
+        column = numpy.empty((self.instances_count, 1), dtype=numpy.int64)
+        column[:, 0] = values
+        self.inputs = numpy.concatenate((self.inputs, column), axis=1)
+        self.waiting_for_input[:] = False
+
+    def getOutputs(self):
+        """
+        Returns outputs of every instance.
+        :return: [] of [] outputs, indexed by instance
+        """
+        outputs = [[] for i in range(self.instances_count)]
+        for instances, values in self.output_events:
+            for instance, value in zip(instances.tolist(), values.tolist()):
+                outputs[instance].append(value)
+        return outputs
+
+    def isStopped(self):
+        """
+        Returns True, when all instances halted.
+        """
+        return bool(self.stopped.all())
+
+    def _operand(self, instances, ip, offset, mode):
+        parameters = self.registers[instances, ip + offset]
+        if mode == 1:
+            return parameters
+        return self.registers[instances, parameters]
+
+    def _executeGroup(self, instances, ip, word):
+        """
+        Executes instruction word on address ip for group of instances.
+        """
+        registers = self.registers
+        canonical_word = canonicalInstruction(word)
+        if canonical_word is None:
+            raise ValueError("Invalid instruction {} at address {}".format(word, ip))
+        word = canonical_word
+        opcode = word % 100
+        mode_one = word // 100 % 10
+        mode_two = word // 1000 % 10
+        next_ip = ip + INSTRUCTION_LENGTHS[opcode]
+
+        if opcode in (1, 2, 7, 8):
+            param_one = self._operand(instances, ip, 1, mode_one)
+            param_two = self._operand(instances, ip, 2, mode_two)
+            if opcode == 1:
+                result = param_one + param_two
+            elif opcode == 2:
+                result = param_one * param_two
+            elif opcode == 7:
+                result = (param_one < param_two).astype(numpy.int64)
+            else:
+                result = (param_one == param_two).astype(numpy.int64)
+            # Assignments are always immediate - target address is parameter itself
+            registers[instances, registers[instances, ip + 3]] = result
+            self.instruction_pointers[instances] = next_ip
+
+        elif opcode == 3:
+            # Instances, which consumed all their input, wait on the instruction
+            positions = self.input_positions[instances]
+            has_input = positions < self.inputs.shape[1]
+            self.waiting_for_input[instances[~has_input]] = True
+            instances = instances[has_input]
+            if len(instances) == 0:
+                return 0
+            positions = positions[has_input]
+
+            registers[instances, registers[instances, ip + 1]] = self.inputs[instances, positions]
+            self.input_positions[instances] += 1
+            self.instruction_pointers[instances] = next_ip
+
+        elif opcode == 4:
+            values = self._operand(instances, ip, 1, mode_one)
+            self.output_events.append((instances, values))
+            self.last_output[instances] = values
+            self.output_counts[instances] += 1
+            self.instruction_pointers[instances] = next_ip
+
+        elif opcode in (5, 6):
+            condition = self._operand(instances, ip, 1, mode_one) != 0
+            if opcode == 6:
+                condition = ~condition
+            # Jump target is read only by instances taking the jump, as in the scalar machine
+            self.instruction_pointers[instances] = next_ip
+            taken_instances = instances[condition]
+            if len(taken_instances):
+                self.instruction_pointers[taken_instances] = self._operand(taken_instances, ip, 2, mode_two)
+
+        elif opcode == 99:
+            self.stopped[instances] = True
+
+        else:
+            raise ValueError("Invalid instruction {} at address {}".format(word, ip))
+
+        return len(instances)
+
+    def runProgram(self):
+        """
+        Runs all instances, until every instance halts or waits for input.
+        """
+        all_instances = numpy.arange(self.instances_count)
+
+        while True:
+            running = all_instances[~(self.stopped | self.waiting_for_input)]
+            if len(running) == 0:
+                return
+
+            # Group instances by instruction pointer and instruction word (self-modifying code may differ)
+            instruction_pointers = self.instruction_pointers[running]
+            words = self.registers[running, instruction_pointers]
+
+            # Lockstep - all instances execute the same instruction
+            if (instruction_pointers == instruction_pointers[0]).all() and (words == words[0]).all():
+                self.steps_executed += self._executeGroup(running, int(instruction_pointers[0]), int(words[0]))
+                self.groups_executed += 1
+                continue
+
+            # Instances are grouped by canonical words - they accept the same words as the lockstep path
+            unique_words, word_idx = numpy.unique(words, return_inverse=True)
+            canonical_words = [canonicalInstruction(int(word)) for word in unique_words.tolist()]
+            if None in canonical_words:
+                invalid_idx = int(numpy.argmax(numpy.isin(words, unique_words[canonical_words.index(None)])))
+                raise ValueError("Invalid instruction {} at address {}".format(words[invalid_idx],
+                                                                               instruction_pointers[invalid_idx]))
+            words = numpy.array(canonical_words, dtype=words.dtype)[word_idx.reshape(-1)]
+
+            group_keys, group_idx = numpy.unique(instruction_pointers * _WORDS_RANGE + words, return_inverse=True)
+
+            # Sort once, so every group is a contiguous slice
+            order = numpy.argsort(group_idx, kind="stable")
+            boundaries = numpy.searchsorted(group_idx[order], numpy.arange(len(group_keys) + 1))
+
+            for key_idx, group_key in enumerate(group_keys.tolist()):
+                instances = running[order[boundaries[key_idx]:boundaries[key_idx + 1]]]
+                self.steps_executed += self._executeGroup(instances, group_key // _WORDS_RANGE, group_key % _WORDS_RANGE)
+                self.groups_executed += 1
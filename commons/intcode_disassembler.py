@@ -0,0 +1,87 @@
+"""
+Intcode disassembler - instruction words are decoded with the same opcode and parameter mode encoding as the machines
+use (ABCDE -> DE = opcode, C = param1 mode, B = param2 mode, A = param3 mode).
+
+Operands are written as [12] for position mode (value stored at address 12) and 12 for immediate mode. Write targets
+are always addresses, e.g.:
+       4  1002  4,3,4                   mul [4], 3 -> [4]
+Words, which are not valid instructions, are listed as data.
+"""
+from commons.intcode import INSTRUCTION_LENGTHS, MODED_PARAMS_COUNTS, canonicalInstruction
+
+# Short mnemonics indexed by opcode
+MNEMONICS = {1: "add", 2: "mul", 3: "in", 4: "out", 5: "jt", 6: "jf", 7: "lt", 8: "eq", 99: "halt"}
+
+
+def formatOperand(word, param_idx, param):
+    """
+    Returns text of operand read with a mode - [address] in position mode, value in immediate mode.
+    :param word: instruction word
+    :param param_idx: 0 based index of parameter
+    :param param: parameter stored in program
+    """
+    if word // (100 * pow(10, param_idx)) % 10:
+        return str(param)
+    return "[{}]".format(param)
+
+
+def disassembleInstruction(words, address):
+    """
+    Disassembles single instruction.
+    :param words: [] program or memory
+    :param address: address of instruction word
+    :return: tuple(text[str], length[int]) - text is "data <word>" and length 1 for invalid instructions (also for
+        instructions, whose parameters exceed program)
+    """
+    word = words[address]
+    if canonicalInstruction(word) is None or address + INSTRUCTION_LENGTHS[word % 100] > len(words):
+        return "data {}".format(word), 1
+
+    opcode = word % 100
+    length = INSTRUCTION_LENGTHS[opcode]
+    params = words[address + 1:address + length]
+    moded_params_count = MODED_PARAMS_COUNTS[opcode]
+    operands = [formatOperand(word, param_idx, params[param_idx]) for param_idx in range(moded_params_count)]
+
+    text = MNEMONICS[opcode]
+    if operands:
+        text += " " + ", ".join(operands)
+    if len(params) > moded_params_count:
+        text += (" -> " if operands else " ") + "[{}]".format(params[moded_params_count])
+    return text, length
+
+
+def disassemble(program_instructions, start=0, end=None, code_addresses=None):
+    """
+    Disassembles program by linear sweep - every valid instruction word is decoded and sweep continues after its
+    parameters, other words are data.
+    :param program_instructions: [] program, memory of a machine or commons.intcode.ProgramImage
+    :param start: first address
+    :param end: address to stop at (default - end of program)
+    :param code_addresses: addresses of instructions, only these are decoded, other words are data (default - all valid
+        instruction words), e.g. reachable instructions commons.intcode_optimizer.analyzeProgram(program).instructions
+    :return: [] of tuple(address, [] words, text)
+    """
+    words = list(program_instructions)
+    end = len(words) if end is None else min(end, len(words))
+
+    lines = []
+    address = start
+    while address < end:
+        if code_addresses is None or address in code_addresses:
+            text, length = disassembleInstruction(words, address)
+        else:
+            text, length = "data {}".format(words[address]), 1
+        lines.append((address, words[address:address + length], text))
+        address += length
+    return lines
+
+
+def formatListing(program_instructions, start=0, end=None, code_addresses=None):
+    """
+    Returns disassembly listing (see disassemble) as text - address, instruction word, parameters and instruction.
+    """
+    return "\n".join("{:>8}  {:<6}{:<24}{}".format(address, instruction_words[0],
+                                                  ",".join(str(param) for param in instruction_words[1:]), text)
+                     for address, instruction_words, text in disassemble(program_instructions, start, end,
+                                                                         code_addresses))
@@ -0,0 +1,383 @@
+"""
+Intcode to Python compiler (JIT) - optional execution mode of commons.intcode.IntcodeMachine.
+
+Program is compiled lazily by basic blocks - linear runs of instructions ending with a jump or halt. Every block is
+turned into Python source, with decoded parameter modes and operands baked in as constants, and compiled with
+compile()/exec. Compiled blocks are kept in CompiledProgram, which is shared by all machines running the same program,
+so e.g. every noun/verb run of day02 or every amplifier of day07 reuses code compiled by the first machine.
+
+Self-modifying programs:
+    - every compiled write checks, whether target address is baked into some compiled block of the machine,
+      if so, the block is left immediately and the affected blocks are invalidated,
+    - operand words, which are overwritten (or differ from the shared image, e.g. day02 noun and verb), become volatile -
+      blocks are recompiled to read them from memory at runtime,
+    - instruction words rewritten more than REWRITE_LIMIT times are no longer compiled, they fall back to interpreter.
+"""
+from commons.intcode import INSTRUCTION_LENGTHS, WRITE_TARGET_OFFSETS, canonicalInstruction
+from functools import partial
+from operator import itemgetter
+
+# Number of rewrites of single instruction word, after which the address is left to interpreter
+REWRITE_LIMIT = 8
+
+# Opcodes ending a basic block - jumps and halt
+_BLOCK_END_OPCODES = (5, 6, 99)
+
+
+class CompiledBlock():
+    def __init__(self, start, end, function, baked_addresses, baked_values, instruction_addresses, source):
+        """
+        Single compiled basic block.
+        :param start: address of first instruction
+        :param end: address following the last instruction
+        :param function: compiled function(vm, mem, code) -> next instruction pointer
+        :param baked_addresses: [] addresses, whose values are baked into the code as constants
+        :param baked_values: [] values of baked addresses at compile time
+        :param instruction_addresses: set of addresses of instruction words within the block
+        :param source: generated python source (for debugging)
+        """
+        self.start = start
+        self.end = end
+        self.function = function
+        self.baked_addresses = baked_addresses
+        self.baked_values = baked_values
+        self.instruction_addresses = instruction_addresses
+        self.source = source
+
+    def matchesMemory(self, memory):
+        """
+        Checks, whether block compiled from other memory image is valid for memory.
+        :param memory: [] machine memory
+        :return: [] of baked addresses with different values (empty, if block can be used)
+        """
+        return [address for address, value in zip(self.baked_addresses, self.baked_values) if memory[address] != value]
+
+
+class CompiledProgram():
+    def __init__(self, program_instructions, volatile_addresses=()):
+        """
+        Shared compiled code cache for a program. Blocks are compiled lazily from memory of machines running it.
+        :param program_instructions: [] program or ProgramImage (base image every machine starts with)
+        :param volatile_addresses: addresses, which are known to be changed before/while running (e.g. day02 noun and
+            verb). Their values are always read from memory at runtime, instead of being compiled in as constants.
+        """
+        self.base_image = list(program_instructions)
+        self.volatile_addresses = set(volatile_addresses)
+        self.blocks = {}  # Compiled blocks indexed by start address
+        self.compiled_blocks_count = 0
+
+        # Blocks valid for base image - new machines starting from base image copy them instead of verifying each block
+        self.base_blocks = {}
+        self.base_functions = [None] * len(program_instructions)
+        self.base_code = [0] * len(program_instructions)
+        self._stable_getter_volatile_count = None
+
+    def publish(self, block):
+        """
+        Shares compiled block with other machines.
+        :param block: CompiledBlock
+        """
+        self.blocks[block.start] = block
+
+        if block.start not in self.base_blocks and not block.matchesMemory(self.base_image):
+            self.base_blocks[block.start] = block
+            self.base_functions[block.start] = block.function
+            for address in block.baked_addresses:
+                self.base_code[address] += 1
+
+    def retract(self, block):
+        """
+        Stops sharing compiled block (e.g. one of its operands became volatile).
+        :param block: CompiledBlock
+        """
+        if self.blocks.get(block.start) is block:
+            del self.blocks[block.start]
+
+        if self.base_blocks.get(block.start) is block:
+            del self.base_blocks[block.start]
+            self.base_functions[block.start] = None
+            for address in block.baked_addresses:
+                self.base_code[address] -= 1
+
+    def startsFromBaseImage(self, memory):
+        """
+        Checks, whether memory equals to base image (volatile addresses excluded).
+        :param memory: [] machine memory
+        :return: True/False
+        """
+        if len(memory) != len(self.base_image):
+            return False
+
+        # Getter of all non-volatile addresses, rebuilt when volatile addresses change
+        if self._stable_getter_volatile_count != len(self.volatile_addresses):
+            stable_addresses = [address for address in range(len(self.base_image))
+                                if address not in self.volatile_addresses]
+            self._stable_getter = itemgetter(*stable_addresses) if stable_addresses else lambda x: ()
+            self._stable_values = self._stable_getter(self.base_image)
+            self._stable_getter_volatile_count = len(self.volatile_addresses)
+
+        return self._stable_getter(memory) == self._stable_values
+
+    def _operandSource(self, mode, address, memory):
+        """
+        Returns python expression, which reads parameter stored on address.
+        """
+        if address in self.volatile_addresses:
+            return "mem[mem[{}]]".format(address) if mode == 0 else "mem[{}]".format(address)
+        return "mem[{}]".format(memory[address]) if mode == 0 else str(memory[address])
+
+    def compileBlock(self, start, memory, interpreted_addresses=()):
+        """
+        Compiles basic block starting on address start from current contents of memory.
+        :param start: address of first instruction
+        :param memory: [] machine memory
+        :param interpreted_addresses: addresses, which must not be compiled (block ends before them)
+        :return: CompiledBlock or None, if there is no valid instruction on start
+        """
+        lines = []
+        baked_addresses = []
+        instruction_addresses = set()
+        steps = 0
+        ip = start
+        ended = False
+
+        def exitLines(next_ip_source, steps_done, indent="    "):
+            return [indent + "vm.steps_executed += {}".format(steps_done),
+                    indent + "return {}".format(next_ip_source)]
+
+        def writeLines(target_address, value_source, next_ip, steps_done):
+            # Target is parameter itself (assignments are always immediate), check for writes into compiled code
+            if target_address in self.volatile_addresses:
+                target_source = "target"
+                result = ["    target = mem[{}]".format(target_address)]
+            else:
+                target_source = str(memory[target_address])
+                result = []
+            result += ["    mem[{}] = {}".format(target_source, value_source),
+                       "    if code[{}]:".format(target_source),
+                       "        vm.steps_executed += {}".format(steps_done),
+                       "        return vm.jit_state.invalidate({}, {})".format(target_source, next_ip)]
+            return result
+
+        while not ended:
+            if ip >= len(memory) or ip in interpreted_addresses:
+                break
+            word = canonicalInstruction(memory[ip])
+            if word is None:
+                break
+
+            opcode = word % 100
+            length = INSTRUCTION_LENGTHS[opcode]
+            if ip + length > len(memory):
+                break
+
+            modes = (word // 100 % 10, word // 1000 % 10)
+            params = [self._operandSource(modes[idx], ip + 1 + idx, memory) for idx in range(min(length - 1, 2))]
+
+            instruction_addresses.add(ip)
+            baked_addresses.extend(address for address in range(ip, ip + length)
+                                   if address not in self.volatile_addresses)
+            next_ip = ip + length
+            steps += 1
+            lines.append("    # {}: {}".format(ip, ",".join(str(x) for x in memory[ip:next_ip])))
+
+            if opcode == 1:
+                lines += writeLines(ip + 3, "{} + {}".format(params[0], params[1]), next_ip, steps)
+            elif opcode == 2:
+                lines += writeLines(ip + 3, "{} * {}".format(params[0], params[1]), next_ip, steps)
+            elif opcode == 3:
+                # Blocked on input - leave before the instruction, it is retried on next run
+                lines += ["    value = vm.readInput()",
+                          "    if value is None:",
+                          "        vm.waiting_for_input = True"] + exitLines("~{}".format(ip), steps - 1, "        ")
+                lines += writeLines(ip + 1, "value", next_ip, steps)
+            elif opcode == 4:
+                lines += ["    value = {}".format(params[0]),
+                          "    vm.machine_output.append(value)",
+                          "    for channel in vm.output_channels:",
+                          "        channel.append(value)",
+                          "    if vm.pause_on_output:"] + exitLines("~{}".format(next_ip), steps, "        ")
+            elif opcode == 5:
+                lines += ["    if {} != 0:".format(params[0])] + exitLines(params[1], steps, "        ")
+            elif opcode == 6:
+                lines += ["    if {} == 0:".format(params[0])] + exitLines(params[1], steps, "        ")
+            elif opcode == 7:
+                lines += writeLines(ip + 3, "1 if {} < {} else 0".format(params[0], params[1]), next_ip, steps)
+            elif opcode == 8:
+                lines += writeLines(ip + 3, "1 if {} == {} else 0".format(params[0], params[1]), next_ip, steps)
+            elif opcode == 99:
+                lines += ["    vm.stopped = True"] + exitLines("~{}".format(next_ip), steps)
+
+            ended = opcode == 99
+            if opcode in _BLOCK_END_OPCODES and opcode != 99:
+                lines += exitLines(next_ip, steps)
+                ended = True
+
+            ip = next_ip
+
+        if steps == 0:
+            return None
+
+        # Block ended before invalid/interpreted instruction - continue from there
+        if not ended:
+            lines += exitLines(ip, steps)
+
+        function_name = "block{}".format(start)
+        source = "def {}(vm, mem, code):\n".format(function_name) + "\n".join(lines) + "\n"
+        namespace = {}
+        exec(compile(source, "<intcode jit {}>".format(function_name), "exec"), namespace)
+        self.compiled_blocks_count += 1
+
+        return CompiledBlock(start, ip, namespace[function_name], baked_addresses,
+                             [memory[address] for address in baked_addresses], instruction_addresses, source)
+
+    def run(self, vm):
+        """
+        Runs program in machine memory using compiled blocks, until it halts (or outputs a value, if pause_on_output
+        is set).
+        :param vm: IntcodeMachine
+        """
+        if vm.jit_state is None:
+            vm.jit_state = MachineCode(self, vm)
+
+        memory = vm.registers
+        code = vm.jit_state.code
+        blocks = vm.jit_state.functions
+        getBlock = vm.jit_state.getBlock
+        ip = vm.instruction_pointer
+
+        while ip >= 0:
+            block = blocks[ip]
+            if block is None:
+                block = getBlock(ip)
+            ip = block(vm, memory, code)
+
+        vm.instruction_pointer = ~ip
+
+
+class MachineCode():
+    def __init__(self, compiled_program, vm):
+        """
+        Compiled code used by single machine - subset of shared blocks valid for machine's memory.
+        :param compiled_program: CompiledProgram
+        :param vm: IntcodeMachine
+        """
+        self.compiled_program = compiled_program
+        self.vm = vm
+
+        if compiled_program.startsFromBaseImage(vm.registers):
+            self.functions = compiled_program.base_functions[:]
+            self.code = compiled_program.base_code[:]
+            self.active_blocks = dict(compiled_program.base_blocks)
+        else:
+            self.functions = [None] * len(vm.registers)  # Block functions indexed by start address
+            self.code = [0] * len(vm.registers)  # Non-zero, if some active block may have the address baked in
+            self.active_blocks = {}  # Active blocks indexed by start address
+        self.rewrites = {}  # Rewrite count of instruction words
+        self.interpreted_addresses = set()
+
+    def _activate(self, block):
+        self.active_blocks[block.start] = block
+        self.functions[block.start] = block.function
+        for address in block.baked_addresses:
+            self.code[address] = 1
+
+    def _deactivate(self, block):
+        # Code flags of the block are cleared lazily - the first write to each of them finds out no active block
+        # covers it anymore (see invalidate)
+        del self.active_blocks[block.start]
+        self.functions[block.start] = None
+
+    def getBlock(self, start):
+        """
+        Returns function of block starting on address start. Shared block is used, if it is valid for machine memory,
+        otherwise block is compiled (and shared, if possible).
+        :param start: address of first instruction
+        :return: function(vm, mem, code) -> next instruction pointer
+        """
+        memory = self.vm.registers
+        compiled_program = self.compiled_program
+
+        if start in self.interpreted_addresses:
+            self.functions[start] = partial(self.interpretStep, start)
+            return self.functions[start]
+
+        block = compiled_program.blocks.get(start)
+        if block is not None:
+            differences = block.matchesMemory(memory)
+            # Changed operand words become volatile, shared block is recompiled to read them at runtime
+            if differences and not any(address in block.instruction_addresses for address in differences):
+                compiled_program.volatile_addresses.update(differences)
+                compiled_program.retract(block)
+                block = None
+            # Changed instruction word - block is compiled for this machine only
+            elif differences:
+                block = compiled_program.compileBlock(start, memory, self.interpreted_addresses)
+                # Invalid instruction - let interpreter report it
+                if block is None:
+                    return partial(self.interpretStep, start)
+                self._activate(block)
+                return block.function
+
+        if block is None:
+            block = compiled_program.compileBlock(start, memory, self.interpreted_addresses)
+            # Invalid instruction - let interpreter report it
+            if block is None:
+                return partial(self.interpretStep, start)
+            compiled_program.publish(block)
+
+        self._activate(block)
+        return block.function
+
+    def invalidate(self, address, next_ip):
+        """
+        Called by compiled code after it wrote to an address baked into active blocks. Affected blocks are dropped.
+        :param address: written address
+        :param next_ip: instruction pointer to continue with
+        :return: next_ip
+        """
+        compiled_program = self.compiled_program
+        affected_blocks = [block for block in self.active_blocks.values() if block.start <= address < block.end]
+
+        for block in affected_blocks:
+            self._deactivate(block)
+
+        self.code[address] = 1 if any(block.start <= address < block.end for block in self.active_blocks.values()) else 0
+
+        if not affected_blocks:
+            return next_ip
+
+        if any(address in block.instruction_addresses for block in affected_blocks):
+            # Instruction itself is rewritten - recompile, but give up compiling it after too many rewrites
+            self.rewrites[address] = self.rewrites.get(address, 0) + 1
+            if self.rewrites[address] > REWRITE_LIMIT:
+                self.interpreted_addresses.add(address)
+        else:
+            # Operand is rewritten - read it at runtime from now on
+            compiled_program.volatile_addresses.add(address)
+            for block in affected_blocks:
+                compiled_program.retract(block)
+
+        return next_ip
+
+    def interpretStep(self, ip, vm, memory, code):
+        """
+        Executes single instruction by interpreter, used for code, which can't be compiled.
+        """
+        # Compiled code does not maintain interpreter cache, always decode current word
+        handler = vm.decode(ip)
+
+        # Target is read before the write (instruction may overwrite its own parameter). Parameter past the end of
+        # memory is left to the handler - it fails on the write, or doesn't write at all (input blocked)
+        target_offset = WRITE_TARGET_OFFSETS.get(memory[ip] % 100)
+        target = None
+        if target_offset is not None and ip + target_offset < len(memory):
+            target = memory[ip + target_offset]
+
+        next_ip = handler(vm, memory, vm.decoded, ip)
+        vm.steps_executed += 1
+
+        # Input, which blocked (stops on its own address), hasn't written anything
+        if target is not None and code[target] and next_ip != ~ip:
+            self.invalidate(target, next_ip if next_ip >= 0 else ~next_ip)
+        return next_ip
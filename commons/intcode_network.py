@@ -0,0 +1,78 @@
+"""
+Network of Intcode machines connected by blocking input/output channels.
+
+Every machine reads from its own input channel (deque). Connection source -> target appends every output of source to
+input channel of target, so chains, rings, fan-out and fan-in of any number of machines can be built. Machines are
+scheduled cooperatively - a machine runs until it halts or blocks on empty input channel, only then the next ready
+machine is switched in.
+"""
+from collections import deque
+
+
+class IntcodeNetwork():
+    def __init__(self):
+        """
+        Creates empty network.
+        """
+        self.machines = []
+        self.consumers = {}  # Machines receiving outputs, indexed by id of source machine
+        self.switches_count = 0  # How many times machine has been switched in by scheduler
+
+    def addMachine(self, machine):
+        """
+        Adds machine to network. Machine keeps values already waiting in its input channel, its output connections are
+        replaced by connections of this network.
+        :param machine: commons.intcode.IntcodeMachine
+        :return: machine
+        """
+        machine.input_channel = deque(machine.input_channel or ())
+        machine.output_channels = []
+        machine.pause_on_output = False
+
+        self.machines.append(machine)
+        self.consumers[id(machine)] = []
+        return machine
+
+    def connect(self, source, target):
+        """
+        Connects output of source machine to input of target machine.
+        :param source: machine
+        :param target: machine
+        """
+        source.output_channels.append(target.input_channel)
+        self.consumers[id(source)].append(target)
+
+    def connectChain(self, machines, loop=False):
+        """
+        Connects machines one after another, e.g. amplifiers A -> B -> C.
+        :param machines: [] of machines
+        :param loop: True - connect last machine back to first one (ring)
+        """
+        for source, target in zip(machines, machines[1:]):
+            self.connect(source, target)
+        if loop:
+            self.connect(machines[-1], machines[0])
+
+    def run(self):
+        """
+        Runs machines until all of them halt, or the rest is blocked waiting for input nobody is going to produce.
+        :return: [] of machines, which are blocked on input (empty if all machines halted)
+        """
+        ready = deque(machine for machine in self.machines if not machine.isStopped())
+        ready_ids = set(id(machine) for machine in ready)
+
+        while ready:
+            machine = ready.popleft()
+            ready_ids.discard(id(machine))
+
+            # Run machine until it halts or blocks on input
+            machine.runProgram()
+            self.switches_count += 1
+
+            # Consumers which got new input become ready
+            for consumer in self.consumers[id(machine)]:
+                if consumer.input_channel and not consumer.isStopped() and id(consumer) not in ready_ids:
+                    ready.append(consumer)
+                    ready_ids.add(id(consumer))
+
+        return [machine for machine in self.machines if not machine.isStopped()]
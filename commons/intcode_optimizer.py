@@ -0,0 +1,481 @@
+"""
+Intcode static analyzer and peephole optimizer.
+
+Analysis (analyzeProgram) walks the control-flow graph of a program from its entry point and finds:
+    - reachable instructions, their successors and basic blocks,
+    - every write (target address of add, mul, input, less-than, equals) and every address read as data,
+    - which instructions may execute after which (reachability between strongly connected components of the graph),
+      so a memory cell is known to be constant for an instruction, when no instruction writing it can run before it.
+Programs, whose control flow or write targets can't be determined statically (an instruction word, jump target or
+write target may be modified before the instruction runs, or a jump leaves the program), are left as they are.
+
+Optimizations (optimizeProgram):
+    - operand folding - position mode operands reading a constant (never written cell, or a value computed from
+      constants earlier in the same basic block) are rewritten to immediate mode,
+    - superinstructions - pairs of instructions in loops (arithmetic or compare followed by arithmetic, compare or
+      jump, e.g. compare-then-jump, or decrement-then-jump of loop counters) get a single fused handler in the
+      predecoded image, so the interpreter dispatches once per pair. Fused cells are never written, so their handlers
+      never get stale. Straight-line code runs once per run, compiling its handlers would cost more than it saves.
+Optimized program produces the same outputs, halts (or blocks) at the same point after the same number of steps and
+leaves the same memory, except for rewritten instruction cells (OptimizedProgram.rewritten_addresses), which no
+instruction reads as data. findDifferences checks it against the unmodified program on the interpreter.
+"""
+from collections import OrderedDict
+from commons.intcode import INSTRUCTION_LENGTHS, MODED_PARAMS_COUNTS, WRITE_TARGET_OFFSETS, IntcodeMachine, \
+    ProgramImage, canonicalInstruction, handlerBody, predecodeProgram
+import re
+import threading
+
+# Values computed by instructions with known operands
+_CONSTANT_OPERATIONS = {1: lambda a, b: a + b, 2: lambda a, b: a * b, 7: lambda a, b: 1 if a < b else 0,
+                        8: lambda a, b: 1 if a == b else 0}
+
+# Opcodes fused as first and as second instruction of a superinstruction - first one always continues to the second
+_FUSED_FIRST_OPCODES = (1, 2, 7, 8)
+_FUSED_SECOND_OPCODES = (1, 2, 5, 6, 7, 8)
+
+
+class ProgramAnalysis():
+    def __init__(self, words, volatile_addresses, entry):
+        """
+        Result of static analysis, see analyzeProgram.
+        """
+        self.words = words
+        self.volatile_addresses = set(volatile_addresses)
+        # Possible values of volatile addresses indexed by address (when volatile addresses are given as dict)
+        self.volatile_values = {address: set(values) for address, values in volatile_addresses.items()} \
+            if isinstance(volatile_addresses, dict) else {}
+        self.entry = entry
+        self.complete = True
+        self.reason = None  # Why analysis is incomplete
+        self.instructions = {}  # Opcode of reachable instructions indexed by address
+        self.successors = {}  # [] of addresses instruction may continue with, indexed by address
+        self.writes = {}  # Target address indexed by address of writing instruction
+        self.writers = {}  # [] of addresses of instructions writing to address, indexed by target address
+        self.reads = {}  # [] of addresses read as data (position mode operands) indexed by address of instruction
+        self.unknown_reads = False  # Some position mode operand address may change at runtime
+        self.components = {}  # Index of strongly connected component indexed by instruction address
+        # Bit set (int) of components, which may execute after any instruction of component, indexed by component
+        self.components_reach = []
+        self.blocks = []  # Basic blocks - [] of instruction addresses each
+
+    def fail(self, reason):
+        self.complete = False
+        self.reason = reason
+
+    def instructionCells(self, address):
+        """
+        Returns addresses of instruction word and parameters of instruction.
+        """
+        return range(address, address + INSTRUCTION_LENGTHS[self.instructions[address]])
+
+    def isConstantFor(self, address, instruction_address):
+        """
+        Checks, whether memory cell holds its initial value whenever instruction executes - cell is not volatile and
+        no instruction writing it may run before the instruction.
+        """
+        if address in self.volatile_addresses:
+            return False
+        component_bit = 1 << self.components[instruction_address]
+        return not any(self.components_reach[self.components[writer_address]] & component_bit
+                       for writer_address in self.writers.get(address, ()))
+
+    def isInLoop(self, instruction_address):
+        """
+        Checks, whether instruction may execute again after itself.
+        """
+        component = self.components[instruction_address]
+        return bool(self.components_reach[component] >> component & 1)
+
+    def getWrittenAddresses(self):
+        """
+        Returns set of addresses written by any reachable instruction (or externally - volatile addresses).
+        """
+        return set(self.writes.values()) | self.volatile_addresses
+
+
+def _findComponentsReach(analysis):
+    """
+    Finds strongly connected components of control-flow graph (iterative Tarjan's algorithm) and components reachable
+    from each of them - instructions of a loop may all run after each other, reach of a component is union of reaches
+    of its successors. Bit sets keep it linear in number of edges (times machine words of a set), instead of a search
+    from every writing instruction.
+    """
+    successors = analysis.successors
+    indices = {}
+    low_links = {}
+    stack = []
+    on_stack = set()
+    for root in analysis.instructions:
+        if root in indices:
+            continue
+        indices[root] = low_links[root] = len(indices)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors[root]))]
+        while work:
+            ip, successors_iterator = work[-1]
+            for successor in successors_iterator:
+                if successor not in indices:
+                    indices[successor] = low_links[successor] = len(indices)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(successors[successor])))
+                    break
+                if successor in on_stack:
+                    low_links[ip] = min(low_links[ip], indices[successor])
+            else:
+                work.pop()
+                if work:
+                    low_links[work[-1][0]] = min(low_links[work[-1][0]], low_links[ip])
+                if low_links[ip] != indices[ip]:
+                    continue
+                # Components are completed in reverse topological order - reaches of successors are known already
+                component = len(analysis.components_reach)
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    analysis.components[member] = component
+                    members.append(member)
+                    if member == ip:
+                        break
+                reach = 0
+                for member in members:
+                    for successor in successors[member]:
+                        successor_component = analysis.components[successor]
+                        if successor_component == component:
+                            reach |= 1 << component
+                        else:
+                            reach |= analysis.components_reach[successor_component] | (1 << successor_component)
+                analysis.components_reach.append(reach)
+
+
+def analyzeProgram(program_instructions, volatile_addresses=(), entry=0):
+    """
+    Builds control-flow graph of a program and finds reads and writes of its reachable instructions.
+    :param program_instructions: [] program or commons.intcode.ProgramImage
+    :param volatile_addresses: addresses modified from outside before or between runs, or dict {address: possible
+        values} (e.g. {1: range(100), 2: range(100)} - day02 noun and verb used as addresses)
+    :param entry: address execution starts at
+    :return: ProgramAnalysis, check its complete attribute before using the results
+    """
+    words = list(program_instructions)
+    analysis = ProgramAnalysis(words, volatile_addresses, entry)
+    # Cells instruction relies on (instruction word, jump target, write target), which must not change before it runs
+    structure_cells = []
+
+    pending = [entry]
+    while pending:
+        ip = pending.pop()
+        if ip in analysis.instructions:
+            continue
+        if not 0 <= ip < len(words) or canonicalInstruction(words[ip]) is None:
+            analysis.fail("No valid instruction at address {}".format(ip))
+            return analysis
+
+        word = words[ip]
+        opcode = word % 100
+        length = INSTRUCTION_LENGTHS[opcode]
+        if ip + length > len(words):
+            analysis.fail("Instruction at address {} exceeds program".format(ip))
+            return analysis
+
+        analysis.instructions[ip] = opcode
+        structure_cells.append((ip, ip))
+
+        reads = []
+        for param_idx in range(MODED_PARAMS_COUNTS[opcode]):
+            if word // (100 * pow(10, param_idx)) % 10 == 0:
+                reads.append(words[ip + 1 + param_idx])
+        analysis.reads[ip] = reads
+
+        if opcode in WRITE_TARGET_OFFSETS:
+            analysis.writes[ip] = words[ip + WRITE_TARGET_OFFSETS[opcode]]
+            structure_cells.append((ip + WRITE_TARGET_OFFSETS[opcode], ip))
+
+        if opcode == 99:
+            successors = []
+        elif opcode in (5, 6):
+            # Jump target - immediate parameter, or cell parameter points to
+            structure_cells.append((ip + 2, ip))
+            if word // 1000 % 10:
+                target = words[ip + 2]
+            else:
+                if not 0 <= words[ip + 2] < len(words):
+                    analysis.fail("Jump target of address {} outside program".format(ip))
+                    return analysis
+                structure_cells.append((words[ip + 2], ip))
+                target = words[words[ip + 2]]
+            successors = [ip + length, target]
+        else:
+            successors = [ip + length]
+
+        analysis.successors[ip] = successors
+        pending.extend(successors)
+
+    for writer_address, target in analysis.writes.items():
+        if not 0 <= target < len(words):
+            analysis.fail("Write target of address {} outside program".format(writer_address))
+            return analysis
+        analysis.writers.setdefault(target, []).append(writer_address)
+
+    _findComponentsReach(analysis)
+
+    # Control flow and write targets above hold only, if cells they were read from can't change before use
+    for address, instruction_address in structure_cells:
+        if not analysis.isConstantFor(address, instruction_address):
+            analysis.fail("Address {} used by instruction at {} may be modified before it runs".format(
+                address, instruction_address))
+            return analysis
+
+    # Position mode operand, whose address changes, reads one of possible values of volatile address, or anything
+    for instruction_address, opcode in analysis.instructions.items():
+        word = words[instruction_address]
+        for param_idx in range(MODED_PARAMS_COUNTS[opcode]):
+            param_address = instruction_address + 1 + param_idx
+            if word // (100 * pow(10, param_idx)) % 10 or analysis.isConstantFor(param_address, instruction_address):
+                continue
+            if param_address in analysis.volatile_values and param_address not in analysis.writers:
+                analysis.reads[instruction_address].extend(analysis.volatile_values[param_address])
+            else:
+                analysis.unknown_reads = True
+
+    # Basic blocks start at entry, jump targets, after jumps and where overlapping instructions meet
+    leaders = {entry}
+    predecessors_counts = {}
+    for ip, opcode in analysis.instructions.items():
+        if opcode in (5, 6):
+            leaders.update(analysis.successors[ip])
+        for successor in analysis.successors[ip]:
+            predecessors_counts[successor] = predecessors_counts.get(successor, 0) + 1
+    leaders.update(ip for ip, predecessors_count in predecessors_counts.items() if predecessors_count > 1)
+    for leader in sorted(leaders):
+        block = []
+        ip = leader
+        while True:
+            block.append(ip)
+            if analysis.instructions[ip] in (5, 6, 99):
+                break
+            ip = analysis.successors[ip][0]
+            if ip in leaders:
+                break
+        analysis.blocks.append(block)
+
+    return analysis
+
+
+class OptimizedProgram():
+    def __init__(self, analysis, words, fused_addresses, folded_operands, rewritten_addresses):
+        """
+        Result of optimizeProgram.
+        :param analysis: ProgramAnalysis of original program
+        :param words: [] optimized program
+        :param fused_addresses: [] addresses of first instructions of fused pairs
+        :param folded_operands: number of operands rewritten to immediate mode
+        :param rewritten_addresses: [] addresses, which differ from original program
+        """
+        self.analysis = analysis
+        self.words = words
+        self.fused_addresses = fused_addresses
+        self.folded_operands = folded_operands
+        self.rewritten_addresses = rewritten_addresses
+
+        predecoded = predecodeProgram(words)
+        for address in fused_addresses:
+            predecoded[address] = getFusedHandler(words, address)
+        self.image = ProgramImage(words, predecoded)
+
+
+def _foldOperands(analysis, preserve_addresses):
+    """
+    Rewrites position mode operands with statically known values to immediate mode.
+    :return: tuple(words[list], folded_operands[int])
+    """
+    words = analysis.words[:]
+    folded_operands = 0
+
+    # Unknown read may see any cell - no cell can be rewritten
+    if analysis.unknown_reads:
+        return words, folded_operands
+
+    # Cells, which must keep their values - read as data, shared by overlapping instructions, or external
+    data_cells = {address for reads in analysis.reads.values() for address in reads}
+    cell_owners = {}
+    for instruction_address in analysis.instructions:
+        for address in analysis.instructionCells(instruction_address):
+            cell_owners[address] = cell_owners.get(address, 0) + 1
+    fixed_cells = data_cells | analysis.volatile_addresses | set(preserve_addresses) | \
+        {address for address, owners in cell_owners.items() if owners > 1}
+
+    for block in analysis.blocks:
+        # Values written by earlier instructions of the block (block runs only from its start)
+        known_values = {}
+
+        for instruction_address in block:
+            opcode = analysis.instructions[instruction_address]
+            word = analysis.words[instruction_address]
+
+            operand_values = []
+            for param_idx in range(MODED_PARAMS_COUNTS[opcode]):
+                param_address = instruction_address + 1 + param_idx
+                if word // (100 * pow(10, param_idx)) % 10:
+                    operand_values.append(analysis.words[param_address]
+                                          if analysis.isConstantFor(param_address, instruction_address) else None)
+                    continue
+
+                operand_address = analysis.words[param_address]
+                if not analysis.isConstantFor(param_address, instruction_address) or \
+                        not 0 <= operand_address < len(words):
+                    # Operand address itself changes (or is invalid - error is left to the interpreter)
+                    value = None
+                elif analysis.isConstantFor(operand_address, instruction_address):
+                    value = analysis.words[operand_address]
+                else:
+                    value = known_values.get(operand_address)
+                operand_values.append(value)
+
+                if value is not None and instruction_address not in fixed_cells and param_address not in fixed_cells:
+                    words[instruction_address] += 100 * pow(10, param_idx)
+                    words[param_address] = value
+                    folded_operands += 1
+
+            if instruction_address in analysis.writes:
+                target = analysis.writes[instruction_address]
+                value = None
+                if opcode in _CONSTANT_OPERATIONS and None not in operand_values:
+                    value = _CONSTANT_OPERATIONS[opcode](*operand_values)
+                if value is None or target in analysis.volatile_addresses:
+                    known_values.pop(target, None)
+                else:
+                    known_values[target] = value
+
+    return words, folded_operands
+
+
+def optimizeProgram(program_instructions, volatile_addresses=(), preserve_addresses=(), entry=0, fuse=True):
+    """
+    Analyzes and optimizes program. Program, which can't be fully analyzed, is returned unchanged.
+    :param program_instructions: [] program or commons.intcode.ProgramImage
+    :param volatile_addresses: addresses modified from outside before or between runs, or dict {address: possible
+        values}, see analyzeProgram
+    :param preserve_addresses: addresses, which must keep their original values (e.g. results read after the run)
+    :param entry: address execution starts at
+    :param fuse: False - don't fuse instruction pairs in loops (optimized words only)
+    :return: OptimizedProgram, run it as IntcodeMachine(optimized_program.image)
+    """
+    analysis = analyzeProgram(program_instructions, volatile_addresses, entry)
+    if not analysis.complete:
+        return OptimizedProgram(analysis, analysis.words[:], [], 0, [])
+
+    words, folded_operands = _foldOperands(analysis, preserve_addresses)
+
+    fused_addresses = []
+    if fuse:
+        written_addresses = analysis.getWrittenAddresses()
+        for first_address, first_opcode in sorted(analysis.instructions.items()):
+            second_address = first_address + INSTRUCTION_LENGTHS[first_opcode]
+            second_opcode = analysis.instructions.get(second_address)
+            if first_opcode not in _FUSED_FIRST_OPCODES or second_opcode not in _FUSED_SECOND_OPCODES or \
+                    not analysis.isInLoop(first_address):
+                continue
+            if written_addresses.isdisjoint(range(first_address,
+                                                  second_address + INSTRUCTION_LENGTHS[second_opcode])):
+                fused_addresses.append(first_address)
+
+    rewritten_addresses = [address for address, (word, original_word) in enumerate(zip(words, analysis.words))
+                           if word != original_word]
+    return OptimizedProgram(analysis, words, fused_addresses, folded_operands, rewritten_addresses)
+
+
+def _bakeOperands(body, words, address):
+    # Parameters and addresses are constants for never written instructions
+    body = re.sub(r"mem\[ip \+ (\d)\]", lambda match: str(words[address + int(match.group(1))]), body)
+    return re.sub(r"ip \+ (\d)", lambda match: str(address + int(match.group(1))), body)
+
+
+def getFusedHandler(words, address):
+    """
+    Returns handler executing two consecutive instructions starting on address - first one (never a jump, input or
+    output) continues directly with the second one. Parameters are compiled in as constants, so cells of both
+    instructions must never be written. Counts the extra executed instruction in vm.steps_executed.
+    :param words: [] program
+    :param address: address of first instruction
+    :return: handler(vm, mem, decoded, ip)
+    """
+    first_length = INSTRUCTION_LENGTHS[words[address] % 100]
+    second_address = address + first_length
+    first_body = handlerBody(words[address]).replace("return ip + {}\n".format(first_length),
+                                                      "vm.steps_executed += 1\n")
+    body = _bakeOperands(first_body, words, address) + \
+        _bakeOperands(handlerBody(words[second_address]), words, second_address)
+
+    handler_name = "fused{}".format(address)
+    handler_source = "def {}(vm, mem, decoded, ip):\n".format(handler_name) + \
+                     "".join("    " + line + "\n" for line in body.splitlines())
+
+    namespace = {}
+    exec(compile(handler_source, "<intcode {}>".format(handler_name), "exec"), namespace)
+    return namespace[handler_name]
+
+
+# Optimized images of recently used programs (see getOptimizedImage)
+OPTIMIZED_IMAGE_CACHE_SIZE = 32
+_optimized_images = OrderedDict()
+_optimized_images_lock = threading.Lock()
+
+
+def getOptimizedImage(program_instructions, volatile_addresses=(), preserve_addresses=()):
+    """
+    Returns shared optimized ProgramImage of a program (see optimizeProgram), images of recently used programs are
+    kept, so repeated runs skip analysis.
+    :return: commons.intcode.ProgramImage
+    """
+    volatile_key = tuple(sorted((address, tuple(sorted(values))) for address, values in volatile_addresses.items())) \
+        if isinstance(volatile_addresses, dict) else tuple(sorted(volatile_addresses))
+    key = (tuple(program_instructions), volatile_key, tuple(sorted(preserve_addresses)))
+    with _optimized_images_lock:
+        program_image = _optimized_images.pop(key, None)
+    if program_image is None:
+        program_image = optimizeProgram(key[0], volatile_addresses, preserve_addresses).image
+
+    with _optimized_images_lock:
+        # Most recently used image is last, least recently used is dropped
+        _optimized_images[key] = program_image
+        if len(_optimized_images) > OPTIMIZED_IMAGE_CACHE_SIZE:
+            _optimized_images.popitem(last=False)
+    return program_image
+
+
+def findDifferences(program_instructions, optimized_program, inputs=(), registers=None):
+    """
+    Equivalence check - runs unmodified program and optimized program on the interpreter with the same inputs, until
+    they halt or block waiting for input, and compares outputs, final state, executed steps and memory (except for
+    rewritten addresses).
+    :param program_instructions: [] unmodified program
+    :param optimized_program: OptimizedProgram
+    :param inputs: input values
+    :param registers: dict {address: value} set before the run (volatile addresses)
+    :return: [] of descriptions of differences, empty if runs are equivalent
+    """
+    machines = []
+    for program in (list(program_instructions), optimized_program.image):
+        machine = IntcodeMachine(program)
+        for address, value in (registers or {}).items():
+            machine.setRegister(address, value)
+        machine.addInput(*inputs)
+        machine.runProgram()
+        machines.append(machine)
+
+    original, optimized = machines
+    differences = []
+    for attribute in ("machine_output", "stopped", "waiting_for_input", "instruction_pointer", "steps_executed"):
+        if getattr(original, attribute) != getattr(optimized, attribute):
+            differences.append("{}: {} != {}".format(attribute, getattr(original, attribute),
+                                                      getattr(optimized, attribute)))
+
+    rewritten_addresses = set(optimized_program.rewritten_addresses)
+    differences.extend("memory[{}]: {} != {}".format(address, value, optimized_value) for address, (value,
+                       optimized_value) in enumerate(zip(original.registers, optimized.registers))
+                       if value != optimized_value and address not in rewritten_addresses)
+    return differences
@@ -0,0 +1,133 @@
+"""
+Opt-in execution profiler for Intcode machines.
+
+Machine with profiler attached (IntcodeMachine.setProfiler) runs an instrumented copy of the interpreter loop, which
+records per-opcode counts, per-address hit counts, taken/not-taken counts of every branch, total steps and wall time.
+Machines without profiler run the regular loop, so disabled profiling costs a single attribute check per run.
+Single profiler can be shared by several machines (e.g. all amplifiers) to aggregate their statistics.
+Instructions are dispatched by their words (commons.intcode.getHandler), not by cached handlers of the machine, so fused
+handlers of optimized images (commons.intcode_optimizer) are bypassed and every instruction is counted on its own.
+"""
+from commons.intcode import getHandler
+import json
+import time
+
+OPCODE_NAMES = {1: "add", 2: "mul", 3: "in", 4: "out", 5: "jump-if-true", 6: "jump-if-false", 7: "less-than",
+                8: "equals", 99: "halt"}
+
+
+class IntcodeProfiler():
+    def __init__(self):
+        """
+        Creates empty profiler.
+        """
+        self.opcode_counts = {}
+        self.address_hits = {}
+        self.branches = {}  # [taken, not_taken] indexed by address of jump instruction
+        self.steps = 0
+        self.wall_time = 0.0
+        self.runs = 0
+
+    def run(self, vm):
+        """
+        Runs program of the machine (same as IntcodeMachine.runProgram), recording statistics.
+        :param vm: commons.intcode.IntcodeMachine
+        """
+        # Compiled code doesn't maintain decoded cache, and interpreted writes don't invalidate compiled blocks - machine,
+        # which already ran compiled, is switched to interpreter with fresh cache (blocks are rebuilt on next compiled run)
+        if vm.jit_state is not None:
+            vm.decoded = [None] * len(vm.registers)
+            vm.jit_state = None
+
+        memory = vm.registers
+        decoded = vm.decoded
+        ip = vm.instruction_pointer
+        opcode_counts = self.opcode_counts
+        address_hits = self.address_hits
+        branches = self.branches
+        steps = 0
+        blocked_inputs = 0
+
+        start_time = time.perf_counter()
+
+        while ip >= 0:
+            word = memory[ip]
+            handler = getHandler(word)
+            if handler is None:
+                raise ValueError("Invalid instruction {} at address {}".format(word, ip))
+            opcode = word % 100
+
+            # Branch is taken, when its condition holds (evaluated before the instruction is executed)
+            if opcode == 5 or opcode == 6:
+                condition = memory[ip + 1] if word // 100 % 10 else memory[memory[ip + 1]]
+                taken = (condition != 0) if opcode == 5 else (condition == 0)
+                branch = branches.setdefault(ip, [0, 0])
+                branch[0 if taken else 1] += 1
+
+            current_ip = ip
+            ip = handler(vm, memory, decoded, ip)
+            steps += 1
+
+            # Input instruction, which blocked, hasn't been executed (handler already corrected steps of the machine)
+            if opcode == 3 and ip == ~current_ip:
+                blocked_inputs += 1
+                continue
+
+            opcode_counts[opcode] = opcode_counts.get(opcode, 0) + 1
+            address_hits[current_ip] = address_hits.get(current_ip, 0) + 1
+
+        self.wall_time += time.perf_counter() - start_time
+        self.steps += steps - blocked_inputs
+        self.runs += 1
+
+        vm.instruction_pointer = ~ip
+        vm.steps_executed += steps
+
+    def toDict(self):
+        """
+        Returns recorded statistics as dict (JSON serializable).
+        """
+        return {
+            "steps": self.steps,
+            "runs": self.runs,
+            "wall_time": self.wall_time,
+            "opcode_counts": {OPCODE_NAMES.get(opcode, str(opcode)): count
+                              for opcode, count in sorted(self.opcode_counts.items())},
+            "address_hits": {str(address): count for address, count in sorted(self.address_hits.items())},
+            "branches": {str(address): {"taken": taken, "not_taken": not_taken}
+                         for address, (taken, not_taken) in sorted(self.branches.items())},
+        }
+
+    def toJson(self, indent=None):
+        """
+        Returns recorded statistics as JSON string.
+        """
+        return json.dumps(self.toDict(), indent=indent)
+
+    def formatReport(self, hot_addresses_count=10):
+        """
+        Returns flat text report.
+        :param hot_addresses_count: how many most executed addresses are listed
+        :return: str
+        """
+        lines = ["steps: {}, runs: {}, wall time: {:.6f}s, steps/s: {:.0f}".format(
+            self.steps, self.runs, self.wall_time, self.steps / self.wall_time if self.wall_time else 0)]
+
+        lines.append("")
+        lines.append("{:<16}{:>12}{:>9}".format("opcode", "count", "share"))
+        for opcode, count in sorted(self.opcode_counts.items(), key=lambda x: -x[1]):
+            lines.append("{:<16}{:>12}{:>8.1f}%".format(OPCODE_NAMES.get(opcode, str(opcode)), count,
+                                                      100 * count / self.steps))
+
+        lines.append("")
+        lines.append("{:<16}{:>12}{:>9}".format("hot address", "hits", "share"))
+        for address, count in sorted(self.address_hits.items(), key=lambda x: -x[1])[:hot_addresses_count]:
+            lines.append("{:<16}{:>12}{:>8.1f}%".format(address, count, 100 * count / self.steps))
+
+        lines.append("")
+        lines.append("{:<16}{:>12}{:>12}{:>9}".format("branch address", "taken", "not taken", "taken"))
+        for address, (taken, not_taken) in sorted(self.branches.items()):
+            lines.append("{:<16}{:>12}{:>12}{:>8.1f}%".format(address, taken, not_taken,
+                                                              100 * taken / (taken + not_taken)))
+
+        return "\n".join(lines)
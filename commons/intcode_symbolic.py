@@ -0,0 +1,195 @@
+"""
+Symbolic execution of add/mul-only Intcode programs (day02 style).
+
+Selected memory cells are replaced by symbols (e.g. noun and verb) and the program is executed once, with every cell
+holding either an int or a Polynomial over the symbols. Output cell then contains closed-form expression, which can be
+solved for expected value directly, instead of running the program for every combination of inputs.
+"""
+from commons.intcode import canonicalInstruction
+from itertools import product
+
+
+class SymbolicExecutionError(ValueError):
+    """
+    Program can't be executed symbolically - e.g. it contains other instructions than add/mul/halt, or a symbol is
+    used as an instruction or write address.
+    """
+    pass
+
+
+class Polynomial():
+    def __init__(self, terms, symbols_count):
+        """
+        Polynomial with integer coefficients.
+        :param terms: dict {exponents tuple: coefficient}, e.g. {(1, 0): 100, (0, 1): 1, (0, 0): 5} = 100*x + y + 5
+        :param symbols_count: number of symbols
+        """
+        self.terms = {exponents: coefficient for exponents, coefficient in terms.items() if coefficient != 0}
+        self.symbols_count = symbols_count
+
+    @staticmethod
+    def symbol(symbol_idx, symbols_count):
+        """
+        Returns polynomial representing single symbol.
+        """
+        return Polynomial({tuple(1 if idx == symbol_idx else 0 for idx in range(symbols_count)): 1}, symbols_count)
+
+    def _toPolynomial(self, other):
+        if isinstance(other, Polynomial):
+            return other
+        return Polynomial({(0,) * self.symbols_count: other}, self.symbols_count)
+
+    def __add__(self, other):
+        result = dict(self.terms)
+        for exponents, coefficient in self._toPolynomial(other).terms.items():
+            result[exponents] = result.get(exponents, 0) + coefficient
+        return Polynomial(result, self.symbols_count)
+
+    __radd__ = __add__
+
+    def __mul__(self, other):
+        result = {}
+        for exponents_one, coefficient_one in self.terms.items():
+            for exponents_two, coefficient_two in self._toPolynomial(other).terms.items():
+                exponents = tuple(one + two for one, two in zip(exponents_one, exponents_two))
+                result[exponents] = result.get(exponents, 0) + coefficient_one * coefficient_two
+        return Polynomial(result, self.symbols_count)
+
+    __rmul__ = __mul__
+
+    def degree(self, symbol_idx):
+        """
+        Returns highest exponent of symbol.
+        """
+        return max((exponents[symbol_idx] for exponents in self.terms), default=0)
+
+    def evaluate(self, values):
+        """
+        Evaluates polynomial.
+        :param values: [] value of every symbol
+        :return: int
+        """
+        result = 0
+        for exponents, coefficient in self.terms.items():
+            term = coefficient
+            for value, exponent in zip(values, exponents):
+                term *= pow(value, exponent)
+            result += term
+        return result
+
+    def splitLinear(self, symbol_idx):
+        """
+        Splits polynomial linear in symbol to P = a * symbol + b.
+        :return: tuple(a[Polynomial], b[Polynomial])
+        """
+        linear_terms = {}
+        constant_terms = {}
+        for exponents, coefficient in self.terms.items():
+            if exponents[symbol_idx] == 1:
+                exponents = exponents[:symbol_idx] + (0,) + exponents[symbol_idx + 1:]
+                linear_terms[exponents] = coefficient
+            else:
+                constant_terms[exponents] = coefficient
+        return Polynomial(linear_terms, self.symbols_count), Polynomial(constant_terms, self.symbols_count)
+
+    def __repr__(self):
+        return " + ".join("{}{}".format(coefficient, "".join("*s{}^{}".format(idx, exponent)
+                                                             for idx, exponent in enumerate(exponents) if exponent))
+                          for exponents, coefficient in sorted(self.terms.items(), reverse=True)) or "0"
+
+
+def runSymbolic(program_instructions, symbol_addresses):
+    """
+    Executes add/mul-only program once, with cells on symbol_addresses replaced by symbols.
+    :param program_instructions: [] program
+    :param symbol_addresses: [] addresses of symbols, e.g. [1, 2] for day02 noun and verb
+    :return: [] memory after halt, cells are ints or Polynomials (None for cells with unknown value)
+    """
+    memory = program_instructions[:]
+    for symbol_idx, address in enumerate(symbol_addresses):
+        memory[address] = Polynomial.symbol(symbol_idx, len(symbol_addresses))
+
+    def concrete(value, what):
+        if not isinstance(value, int):
+            raise SymbolicExecutionError("Symbolic value used as {}".format(what))
+        return value
+
+    def operand(mode, address):
+        parameter = memory[address]
+        if mode == 1:
+            return parameter
+        # Reading from symbolic address, value can't be expressed - it stays unknown (fine, until it is used)
+        if not isinstance(parameter, int):
+            return None
+        return memory[parameter]
+
+    ip = 0
+    while True:
+        word = concrete(memory[ip], "instruction")
+        canonical_word = canonicalInstruction(word)
+        opcode = canonical_word % 100 if canonical_word is not None else None
+
+        if opcode == 99:
+            return memory
+        if opcode not in (1, 2):
+            raise SymbolicExecutionError("Unsupported instruction {} at address {}".format(word, ip))
+        word = canonical_word
+
+        param_one = operand(word // 100 % 10, ip + 1)
+        param_two = operand(word // 1000 % 10, ip + 2)
+        target = concrete(memory[ip + 3], "write address")
+
+        if param_one is None or param_two is None:
+            memory[target] = None
+        elif opcode == 1:
+            memory[target] = param_one + param_two
+        else:
+            memory[target] = param_one * param_two
+
+        ip += 4
+
+
+def solveSymbolic(program_instructions, symbol_addresses, output_address, expected_output, domains):
+    """
+    Finds first (in lexicographic order) assignment of symbols, for which program produces expected output.
+    Program is executed only once, output expression is then solved for the last symbol, other symbols are enumerated.
+    :param program_instructions: [] program
+    :param symbol_addresses: [] addresses of symbols
+    :param output_address: address of output cell
+    :param expected_output: value we are looking for
+    :param domains: [] of ranges, possible values of every symbol
+    :return: tuple of symbol values, None if there is no solution
+    :raises SymbolicExecutionError: program can't be executed symbolically
+    """
+    output = runSymbolic(program_instructions, symbol_addresses)[output_address]
+    if output is None:
+        raise SymbolicExecutionError("Output depends on unknown value")
+
+    # Output doesn't depend on symbols at all
+    if isinstance(output, int):
+        return tuple(domain[0] for domain in domains) if output == expected_output else None
+
+    last_idx = len(symbol_addresses) - 1
+    last_domain = domains[last_idx]
+
+    if output.degree(last_idx) > 1:
+        # Non-linear in last symbol - evaluate closed form for every combination (still no program runs)
+        for values in product(*domains):
+            if output.evaluate(values) == expected_output:
+                return values
+        return None
+
+    # Linear in last symbol: output = a * last + b, so last = (expected - b) / a
+    linear_part, constant_part = output.splitLinear(last_idx)
+    for prefix in product(*domains[:last_idx]):
+        values = prefix + (0,)
+        a = linear_part.evaluate(values)
+        b = constant_part.evaluate(values)
+
+        if a == 0:
+            if b == expected_output:
+                return prefix + (last_domain[0],)
+        elif (expected_output - b) % a == 0 and (expected_output - b) // a in last_domain:
+            return prefix + ((expected_output - b) // a,)
+
+    return None
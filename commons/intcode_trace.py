@@ -0,0 +1,420 @@
+"""
+Opt-in execution trace recorder for Intcode machines, with compact binary trace format.
+
+Machine with recorder attached (IntcodeMachine.setProfiler accepts any instrumented runner) runs an instrumented copy
+of the interpreter loop, which packs one fixed-width record per executed instruction into a buffer - no Python objects
+are kept per step, so memory stays bounded for traces of millions of steps. Buffer starts small and doubles, until it
+holds capacity records:
+    - ring buffer mode (default) - only last capacity records are kept, older ones are dropped,
+    - file mode (output_file) - full buffer is appended to the file, so the whole trace is kept on disk.
+Record (RECORD_STRUCT, little-endian, 35 bytes):
+    ip              uint32  address of instruction
+    word            uint16  canonical instruction word (opcode + modes, see commons.intcode.canonicalInstruction)
+    flags           uint8   FLAG_WRITE - instruction wrote to memory, FLAG_OVERFLOW - some value didn't fit int64
+    operand1        int64   value read with a mode (arithmetic operand, output value, jump condition)
+    operand2        int64   second arithmetic operand, for jumps address execution continued at (target of taken jump)
+    write_address   int32   target address of add, mul, input, less-than, equals
+    write_value     int64   value written
+Trace file starts with TRACE_HEADER_STRUCT - magic, format version, record size and step number of first record.
+
+Usage:
+    recorder = TraceRecorder(capacity=100000)
+    machine.setProfiler(recorder)
+    machine.runProgram()
+    recorder.save("trace.bin")
+    trace = readTrace("trace.bin")
+    print(trace.formatSummary())
+    print(trace.formatRecords(-20))
+Blocked input instructions are not recorded (they didn't execute). Fused handlers of optimized images
+(commons.intcode_optimizer) are bypassed, so every instruction gets its own record.
+Run from root package to summarize a trace file: python -m commons.intcode_trace trace.bin [--last 20]
+"""
+from commons.intcode import DECODE_TABLE, MODED_PARAMS_COUNTS, WRITE_TARGET_OFFSETS, canonicalInstruction, getHandler
+from commons.intcode_disassembler import MNEMONICS
+from commons.intcode_profiler import OPCODE_NAMES
+import argparse
+import struct
+
+RECORD_STRUCT = struct.Struct("<IHBqqiq")
+RECORD_SIZE = RECORD_STRUCT.size
+
+TRACE_MAGIC = b"ICTR"
+TRACE_FORMAT_VERSION = 1
+# Magic, format version, record size, step number of first record (records dropped from ring buffer before it)
+TRACE_HEADER_STRUCT = struct.Struct("<4sBHQ")
+
+FLAG_WRITE = 1
+FLAG_OVERFLOW = 2
+
+# Records kept by default ring buffer (about 35 MB, once it is full)
+DEFAULT_CAPACITY = 1000000
+# Records allocated by new recorder, buffer doubles when it fills up, until it reaches capacity
+INITIAL_BUFFER_RECORDS = 1024
+
+_INT64_MIN = -pow(2, 63)
+_INT64_MAX = pow(2, 63) - 1
+
+
+def _instructionLayout(word):
+    """
+    Returns tuple(opcode, param1 mode, param2 mode, moded params count, write target offset[0 - no write]).
+    """
+    opcode = word % 100
+    return (opcode, word // 100 % 10, word // 1000 % 10, MODED_PARAMS_COUNTS[opcode],
+            WRITE_TARGET_OFFSETS.get(opcode, 0))
+
+
+# Layouts of valid instruction words
+_LAYOUTS = {word: _instructionLayout(word) for word in DECODE_TABLE}
+
+
+class TraceRecorder():
+    def __init__(self, capacity=DEFAULT_CAPACITY, output_file=None):
+        """
+        Creates recorder with small buffer, which grows up to capacity records.
+        :param capacity: maximum number of records held in memory - ring buffer keeps last capacity records, in file
+            mode it is the size of chunks appended to the file
+        :param output_file: path or binary file object - file mode, every record is written to the file (call close()
+            at the end), None - ring buffer mode
+        """
+        if capacity < 1:
+            raise ValueError("Capacity must be at least 1 record")
+        self.capacity = capacity
+        self.buffer = bytearray(min(capacity, INITIAL_BUFFER_RECORDS) * RECORD_SIZE)
+        self.buffered_records = 0  # Records in buffer (buffer is full in ring buffer mode, once it wraps around)
+        self.next_slot = 0  # Buffer slot of next record
+        self.records_count = 0  # Records recorded so far, including dropped or flushed ones
+        self.runs = 0
+
+        self.output_file = None
+        self.owns_output_file = False
+        if output_file is not None:
+            if isinstance(output_file, str):
+                self.output_file = open(output_file, "wb")
+                self.owns_output_file = True
+            else:
+                self.output_file = output_file
+            self.output_file.write(TRACE_HEADER_STRUCT.pack(TRACE_MAGIC, TRACE_FORMAT_VERSION, RECORD_SIZE, 0))
+
+    def run(self, vm):
+        """
+        Runs program of the machine (same as IntcodeMachine.runProgram), recording every executed instruction.
+        :param vm: commons.intcode.IntcodeMachine
+        """
+        # Same as commons.intcode_profiler.IntcodeProfiler.run - interpreted writes don't invalidate compiled blocks
+        if vm.jit_state is not None:
+            vm.decoded = [None] * len(vm.registers)
+            vm.jit_state = None
+
+        memory = vm.registers
+        decoded = vm.decoded
+        ip = vm.instruction_pointer
+        buffer = self.buffer
+        pack_into = RECORD_STRUCT.pack_into
+        capacity = self.capacity
+        allocated = len(buffer) // RECORD_SIZE
+        slot = self.next_slot
+        steps = 0
+        blocked_inputs = 0
+
+        try:
+            while ip >= 0:
+                word = canonicalInstruction(memory[ip])
+                if word is None:
+                    raise ValueError("Invalid instruction {} at address {}".format(memory[ip], ip))
+                handler = getHandler(word)
+                opcode, mode1, mode2, moded_params_count, write_offset = _LAYOUTS[word]
+
+                # Operands and write target are read before the instruction executes (it may overwrite them), only
+                # parameters the instruction reads itself - target of input past the end of memory is left to the
+                # handler (input may block), jump target is taken from the handler's result
+                operand1 = operand2 = target = 0
+                if moded_params_count:
+                    operand1 = memory[ip + 1] if mode1 else memory[memory[ip + 1]]
+                    if moded_params_count == 2 and opcode not in (5, 6):
+                        operand2 = memory[ip + 2] if mode2 else memory[memory[ip + 2]]
+                if write_offset and ip + write_offset < len(memory):
+                    target = memory[ip + write_offset]
+
+                current_ip = ip
+                ip = handler(vm, memory, decoded, ip)
+                steps += 1
+
+                # Input instruction, which blocked, hasn't been executed (handler already corrected machine steps)
+                if opcode == 3 and ip == ~current_ip:
+                    blocked_inputs += 1
+                    continue
+                if opcode == 5 or opcode == 6:
+                    operand2 = ip
+
+                flags = 0
+                value = 0
+                if write_offset:
+                    flags = FLAG_WRITE
+                    value = memory[target]
+                if not (_INT64_MIN <= operand1 <= _INT64_MAX and _INT64_MIN <= operand2 <= _INT64_MAX and
+                        _INT64_MIN <= value <= _INT64_MAX):
+                    flags |= FLAG_OVERFLOW
+                    operand1, operand2, value = (min(max(number, _INT64_MIN), _INT64_MAX)
+                                                 for number in (operand1, operand2, value))
+
+                pack_into(buffer, slot * RECORD_SIZE, current_ip, word, flags, operand1, operand2, target, value)
+                slot += 1
+                if slot == allocated:
+                    if allocated < capacity:
+                        # Buffer grows in place, records stay in order (nothing was dropped or flushed before it fills)
+                        buffer.extend(bytes((min(2 * allocated, capacity) - allocated) * RECORD_SIZE))
+                        allocated = len(buffer) // RECORD_SIZE
+                    else:
+                        # File mode appends the whole buffer, ring buffer continues over the oldest records
+                        if self.output_file is not None:
+                            self.output_file.write(buffer)
+                        slot = 0
+        finally:
+            # Records up to an error (e.g. invalid instruction) are kept, to be inspected
+            recorded = steps - blocked_inputs
+            self.next_slot = slot
+            self.records_count += recorded
+            self.buffered_records = slot if self.output_file is not None else \
+                min(capacity, self.buffered_records + recorded)
+            self.runs += 1
+
+        vm.instruction_pointer = ~ip
+        vm.steps_executed += steps
+
+    def getRecordsData(self):
+        """
+        Returns kept records, oldest first, as bytes.
+        :return: tuple(step number of first record[int], data[bytes])
+        """
+        if self.output_file is not None:
+            raise ValueError("Records of file mode recorder are in its output file")
+        if self.buffered_records < self.capacity:
+            return 0, bytes(self.buffer[:self.buffered_records * RECORD_SIZE])
+        split = self.next_slot * RECORD_SIZE
+        return self.records_count - self.capacity, bytes(self.buffer[split:] + self.buffer[:split])
+
+    def save(self, path):
+        """
+        Writes kept records of ring buffer to trace file.
+        """
+        first_step, data = self.getRecordsData()
+        with open(path, "wb") as trace_file:
+            trace_file.write(TRACE_HEADER_STRUCT.pack(TRACE_MAGIC, TRACE_FORMAT_VERSION, RECORD_SIZE, first_step))
+            trace_file.write(data)
+
+    def getTrace(self):
+        """
+        Returns TraceReader over kept records of ring buffer.
+        """
+        first_step, data = self.getRecordsData()
+        return TraceReader(data, first_step)
+
+    def close(self):
+        """
+        Flushes buffered records to output file (file mode).
+        """
+        if self.output_file is None:
+            return
+        self.output_file.write(self.buffer[:self.next_slot * RECORD_SIZE])
+        self.next_slot = 0
+        self.buffered_records = 0
+        if self.owns_output_file:
+            self.output_file.close()
+        else:
+            self.output_file.flush()
+
+
+class TraceRecord():
+    def __init__(self, step, ip, word, flags, operand1, operand2, write_address, write_value):
+        """
+        Single executed instruction (see RECORD_STRUCT).
+        :param step: number of the record in whole trace
+        """
+        self.step = step
+        self.ip = ip
+        self.word = word
+        self.opcode = word % 100
+        self.overflow = bool(flags & FLAG_OVERFLOW)
+        self.operands = (operand1, operand2)[:MODED_PARAMS_COUNTS[self.opcode]]
+        self.write_address = write_address if flags & FLAG_WRITE else None
+        self.write_value = write_value if flags & FLAG_WRITE else None
+
+    def format(self):
+        """
+        Returns record as text, e.g. "  1234      20  mul 75, 69 -> [224] = 5175", "  1235      24  jt 1 -> 31".
+        """
+        text = MNEMONICS[self.opcode]
+        if self.opcode == 5 or self.opcode == 6:
+            text += " {} -> {}".format(*self.operands)
+        elif self.operands:
+            text += " " + ", ".join(str(operand) for operand in self.operands)
+        if self.write_address is not None:
+            text += "{}[{}] = {}".format(" -> " if self.operands else " ", self.write_address, self.write_value)
+        if self.overflow:
+            text += "  (overflow)"
+        return "{:>10}{:>8}  {}".format(self.step, self.ip, text)
+
+
+class TraceReader():
+    def __init__(self, data, first_step=0):
+        """
+        Read-only view of trace records, records are decoded on access.
+        :param data: bytes of records (without header)
+        :param first_step: step number of first record (records dropped before it)
+        """
+        if len(data) % RECORD_SIZE:
+            raise ValueError("Trace data is not a whole number of {} byte records".format(RECORD_SIZE))
+        self.data = memoryview(data)
+        self.first_step = first_step
+
+    def __len__(self):
+        return len(self.data) // RECORD_SIZE
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Trace record index out of range")
+        return TraceRecord(self.first_step + index, *RECORD_STRUCT.unpack_from(self.data, index * RECORD_SIZE))
+
+    def __iter__(self):
+        for index, fields in enumerate(RECORD_STRUCT.iter_unpack(self.data)):
+            yield TraceRecord(self.first_step + index, *fields)
+
+    def isComplete(self):
+        """
+        Checks, whether trace starts with first executed instruction (no records were dropped).
+        """
+        return self.first_step == 0
+
+    def replay(self, program_instructions):
+        """
+        Replays trace over program - writes of records are applied to a copy of the program, each record is checked
+        against memory it ran on (instruction word on its address).
+        :param program_instructions: [] program the trace was recorded from (or commons.intcode.ProgramImage)
+        :return: generator of tuple(TraceRecord, memory[list] after the instruction) - memory is updated in place
+        """
+        if not self.isComplete():
+            raise ValueError("Trace starts at step {}, memory before it is unknown".format(self.first_step))
+
+        memory = list(program_instructions)
+        for record in self:
+            if not 0 <= record.ip < len(memory) or canonicalInstruction(memory[record.ip]) != record.word:
+                raise ValueError("Trace diverges from program at step {}, address {}".format(record.step, record.ip))
+            if record.write_address is not None:
+                if record.overflow:
+                    raise ValueError("Value written at step {} doesn't fit the trace".format(record.step))
+                memory[record.write_address] = record.write_value
+            yield record, memory
+
+    def summarize(self, hot_addresses_count=10):
+        """
+        Returns statistics of the trace as dict (JSON serializable).
+        :param hot_addresses_count: how many most executed addresses are listed
+        """
+        opcode_counts = {}
+        address_hits = {}
+        outputs = []
+        inputs = []
+        writes = 0
+        overflows = 0
+        for ip, word, flags, operand1, operand2, write_address, write_value in RECORD_STRUCT.iter_unpack(self.data):
+            opcode = word % 100
+            opcode_counts[opcode] = opcode_counts.get(opcode, 0) + 1
+            address_hits[ip] = address_hits.get(ip, 0) + 1
+            if flags & FLAG_WRITE:
+                writes += 1
+            if flags & FLAG_OVERFLOW:
+                overflows += 1
+            if opcode == 4:
+                outputs.append(operand1)
+            elif opcode == 3:
+                inputs.append(write_value)
+
+        last_record = self[-1] if len(self) else None
+        return {
+            "records": len(self),
+            "first_step": self.first_step,
+            "last_ip": last_record.ip if last_record else None,
+            "halted": last_record is not None and last_record.opcode == 99,
+            "writes": writes,
+            "overflows": overflows,
+            "inputs": inputs,
+            "outputs": outputs,
+            "opcode_counts": {OPCODE_NAMES[opcode]: count for opcode, count in sorted(opcode_counts.items())},
+            "hot_addresses": {str(address): count for address, count in
+                              sorted(address_hits.items(), key=lambda x: -x[1])[:hot_addresses_count]},
+        }
+
+    def formatSummary(self, hot_addresses_count=10):
+        """
+        Returns flat text summary of the trace.
+        """
+        summary = self.summarize(hot_addresses_count)
+        lines = ["records: {}, first step: {}, last address: {}, halted: {}, writes: {}, overflows: {}".format(
+            summary["records"], summary["first_step"], summary["last_ip"], summary["halted"], summary["writes"],
+            summary["overflows"])]
+        lines.append("inputs: {}".format(summary["inputs"]))
+        lines.append("outputs: {}".format(summary["outputs"]))
+
+        lines.append("")
+        lines.append("{:<16}{:>12}".format("opcode", "count"))
+        for opcode_name, count in sorted(summary["opcode_counts"].items(), key=lambda x: -x[1]):
+            lines.append("{:<16}{:>12}".format(opcode_name, count))
+
+        lines.append("")
+        lines.append("{:<16}{:>12}".format("hot address", "hits"))
+        for address, count in summary["hot_addresses"].items():
+            lines.append("{:<16}{:>12}".format(address, count))
+
+        return "\n".join(lines)
+
+    def formatRecords(self, start=0, count=None):
+        """
+        Returns records as text, one line per record (see TraceRecord.format).
+        :param start: index of first record, negative - counted from the end (e.g. -20 - last 20 records)
+        :param count: number of records (default - all up to the end)
+        """
+        if start < 0:
+            start = max(0, len(self) + start)
+        end = len(self) if count is None else min(len(self), start + count)
+        return "\n".join(self[index].format() for index in range(start, end))
+
+
+def readTrace(path):
+    """
+    Reads trace file written by TraceRecorder.
+    :return: TraceReader
+    """
+    with open(path, "rb") as trace_file:
+        header = trace_file.read(TRACE_HEADER_STRUCT.size)
+        if len(header) != TRACE_HEADER_STRUCT.size:
+            raise ValueError("{} is not an Intcode trace file".format(path))
+        magic, version, record_size, first_step = TRACE_HEADER_STRUCT.unpack(header)
+        if magic != TRACE_MAGIC:
+            raise ValueError("{} is not an Intcode trace file".format(path))
+        if version != TRACE_FORMAT_VERSION or record_size != RECORD_SIZE:
+            raise ValueError("Unsupported trace format version {} (record size {})".format(version, record_size))
+        data = trace_file.read()
+
+    # Trace written by interrupted run may end with partial record
+    return TraceReader(data[:len(data) - len(data) % RECORD_SIZE], first_step)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarizes Intcode trace file written by TraceRecorder")
+    parser.add_argument("trace_file", help="trace file")
+    parser.add_argument("--last", type=int, default=20, help="number of last records listed (default - 20)")
+    parser.add_argument("--hot", type=int, default=10, help="number of most executed addresses (default - 10)")
+    arguments = parser.parse_args()
+
+    trace = readTrace(arguments.trace_file)
+    print(trace.formatSummary(arguments.hot))
+    if arguments.last > 0:
+        print("")
+        print(trace.formatRecords(-arguments.last))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Long running solver service - jobs (day, parts, input) are read as JSON lines from stdin, results are written as JSON
+lines to stdout, as soon as every job is done (not necessarily in order of jobs, use "id" to match them).
+Interpreter start, imports and warm caches are paid once for all the jobs:
+    - parsed inputs (indexed by day and SHA-256 of input) are kept by every worker, same input is parsed only once
+    - decoded images of Intcode programs (commons.intcode.ProgramImage, handlers of every instruction word decoded in
+      advance) are kept by commons.intcode.getProgramImage - programs are interpreted, compiled code of
+      commons.intcode_jit is not used by the solvers
+Run from root package:
+    python -m commons.solver_service [--workers 4] [--executor process|thread|serial] < jobs.jsonl > results.jsonl
+
+Job:
+    {"id": 1, "day": 3, "parts": [1, 2], "input": "R8,U5,L5,D3\\nU7,R6,D4,L4"}
+    {"id": 2, "day": 6, "input_file": "day06/day06_input.txt"}  - parts default to both
+    {"command": "stats"}                                          - throughput of jobs done so far
+Result:
+    {"id": 1, "day": "03", "parts": [1, 2], "results": [6, 30], "cache_hit": false, "queue_time": ...,
+     "parse_time": ..., "solve_time": ..., "latency": ...}
+    {"id": 3, "error": "ValueError: Unknown day 42"}
+Times are in seconds, latency is measured from reading the job to finishing it. Summary of all jobs is written to
+stderr at the end of input.
+"""
+from collections import OrderedDict
+from commons.solvers import PART_NUMBERS, dayNumber, getSolver
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+
+# Parsed inputs kept by every worker
+PARSED_INPUTS_CACHE_SIZE = 64
+
+# Parsed inputs of this worker, indexed by (day number, SHA-256 of input), least recently used first
+_parsed_inputs = OrderedDict()
+_parsed_inputs_lock = threading.Lock()
+
+
+def _parseCached(solver, input_data):
+    """
+    Returns parsed input from worker cache, input is parsed on a miss.
+    :return: tuple(parsed_input, cache_hit[bool], parse_time[float])
+    """
+    key = (solver.day_number, hashlib.sha256(input_data.encode("utf-8")).hexdigest())
+    with _parsed_inputs_lock:
+        parsed_input = _parsed_inputs.pop(key, None)
+        if parsed_input is not None:
+            _parsed_inputs[key] = parsed_input
+            return parsed_input, True, 0.0
+
+    start = time.perf_counter()
+    parsed_input = solver.parseInput(input_data)
+    parse_time = time.perf_counter() - start
+
+    with _parsed_inputs_lock:
+        _parsed_inputs[key] = parsed_input
+        if len(_parsed_inputs) > PARSED_INPUTS_CACHE_SIZE:
+            _parsed_inputs.popitem(last=False)
+    return parsed_input, False, parse_time
+
+
+def solveJob(job, submit_time):
+    """
+    Solves single job in a worker.
+    :param job: dict - "day", "parts" (optional), "input" or "input_file"
+    :param submit_time: time.time() job was submitted at (queue time is measured across processes)
+    :return: dict - result of the job without latency
+    """
+    queue_time = max(0.0, time.time() - submit_time)
+    solver = getSolver(job["day"])
+    parts = tuple(job.get("parts") or PART_NUMBERS)
+
+    if "input" in job:
+        input_data = job["input"]
+    else:
+        with open(job["input_file"], "r") as input_file:
+            input_data = input_file.read()
+
+    parsed_input, cache_hit, parse_time = _parseCached(solver, input_data)
+
+    start = time.perf_counter()
+    results = list(solver.solve(parsed_input, parts))
+    solve_time = time.perf_counter() - start
+
+    return {"id": job.get("id"), "day": solver.day_number, "parts": list(parts), "results": results,
+            "cache_hit": cache_hit, "queue_time": queue_time, "parse_time": parse_time, "solve_time": solve_time}
+
+
+def validateJob(job):
+    """
+    Checks job before it is submitted to a worker, raises ValueError if job is invalid (also for values of wrong JSON
+    type, e.g. "day": null).
+    """
+    if not isinstance(job, dict):
+        raise ValueError("Job must be JSON object")
+    if "day" not in job:
+        raise ValueError("Job has no day")
+    if isinstance(job["day"], bool) or not isinstance(job["day"], (int, str)):
+        raise ValueError("Job day must be integer or string, e.g. 3 or \"03\"")
+    dayNumber(job["day"])
+    if ("input" in job) == ("input_file" in job):
+        raise ValueError("Job must have either input or input_file")
+    if not isinstance(job.get("input", ""), str) or not isinstance(job.get("input_file", ""), str):
+        raise ValueError("Job input and input_file must be strings")
+    if not isinstance(job.get("parts", []), list):
+        raise ValueError("Job parts must be list, e.g. [1, 2]")
+    for part in job.get("parts") or PART_NUMBERS:
+        if part not in PART_NUMBERS:
+            raise ValueError("Unknown part {}, expected one of {}".format(part, PART_NUMBERS))
+
+
+def _errorResult(job_id, error):
+    return {"id": job_id, "error": "{}: {}".format(type(error).__name__, error)}
+
+
+class SerialExecutor():
+    """
+    Runs jobs right away in this thread, with executor interface used by SolverService.
+    """
+
+    def submit(self, function, *args):
+        future = _DoneFuture()
+        try:
+            future.result_value = function(*args)
+        except Exception as error:
+            future.error = error
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class _DoneFuture():
+    def __init__(self):
+        self.result_value = None
+        self.error = None
+
+    def add_done_callback(self, callback):
+        callback(self)
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.result_value
+
+
+class SolverService():
+    def __init__(self, output_stream, executor="process", workers=None):
+        """
+        Service solving jobs concurrently in a pool of workers, every worker keeps its own warm caches.
+        :param output_stream: text stream results are written to, one JSON line per job
+        :param executor: "process" - pool of processes, "thread" - pool of threads sharing caches (solvers are
+            CPU-bound, threads help only for jobs waiting on input files), "serial" - jobs run in calling thread
+        :param workers: number of pool workers (default - number of CPUs)
+        """
+        if executor == "process":
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        elif executor == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        elif executor == "serial":
+            self.pool = SerialExecutor()
+        else:
+            raise ValueError("Unknown executor {}, expected process, thread or serial".format(executor))
+
+        self.output_stream = output_stream
+        self.output_lock = threading.Lock()
+        self.pending_jobs = 0
+        self.pending_condition = threading.Condition(self.output_lock)
+        self.start_time = time.perf_counter()
+        self.latencies = []  # Latencies of finished jobs
+        self.failed_jobs = 0
+
+    def writeResult(self, result):
+        """
+        Writes result as JSON line (call with output_lock held).
+        """
+        self.output_stream.write(json.dumps(result) + "\n")
+        self.output_stream.flush()
+
+    def submitLine(self, line):
+        """
+        Handles single input line - job or command.
+        """
+        line = line.strip()
+        if not line:
+            return
+
+        receive_time = time.perf_counter()
+        job = None
+        try:
+            job = json.loads(line)
+            if isinstance(job, dict) and job.get("command") == "stats":
+                with self.output_lock:
+                    self.writeResult(self.getStatistics())
+                return
+            validateJob(job)
+        except (TypeError, ValueError) as error:
+            # Invalid jobs are answered right away
+            job_id = job.get("id") if isinstance(job, dict) else None
+            with self.output_lock:
+                self._recordResult(_errorResult(job_id, error), receive_time)
+            return
+
+        with self.output_lock:
+            self.pending_jobs += 1
+        future = self.pool.submit(solveJob, job, time.time())
+        future.add_done_callback(lambda done_future: self._finishJob(job, done_future, receive_time))
+
+    def _finishJob(self, job, done_future, receive_time):
+        try:
+            result = done_future.result()
+        except Exception as error:
+            result = _errorResult(job.get("id"), error)
+
+        with self.output_lock:
+            self._recordResult(result, receive_time)
+            self.pending_jobs -= 1
+            self.pending_condition.notify_all()
+
+    def _recordResult(self, result, receive_time):
+        # Called with output_lock held
+        result["latency"] = time.perf_counter() - receive_time
+        if "error" in result:
+            self.failed_jobs += 1
+        else:
+            self.latencies.append(result["latency"])
+        self.writeResult(result)
+
+    def getStatistics(self):
+        """
+        Returns throughput and latency statistics of jobs finished so far (call with output_lock held).
+        """
+        elapsed = time.perf_counter() - self.start_time
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else None
+
+        return {"jobs": len(latencies), "failed_jobs": self.failed_jobs, "pending_jobs": self.pending_jobs,
+                "elapsed": elapsed, "throughput": len(latencies) / elapsed if elapsed > 0 else None,
+                "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+                "latency_p50": percentile(0.5), "latency_p95": percentile(0.95),
+                "latency_max": latencies[-1] if latencies else None}
+
+    def serve(self, input_stream):
+        """
+        Reads jobs until end of input stream, waits for all of them and returns final statistics.
+        """
+        for line in input_stream:
+            self.submitLine(line)
+
+        with self.output_lock:
+            while self.pending_jobs:
+                self.pending_condition.wait()
+            statistics = self.getStatistics()
+        self.pool.shutdown(wait=True)
+        return statistics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solver service - JSON lines jobs on stdin, results on stdout")
+    parser.add_argument("--executor", choices=("process", "thread", "serial"), default="process",
+                        help="worker pool type (default - process)")
+    parser.add_argument("--workers", type=int, default=None, help="number of workers (default - number of CPUs)")
+    arguments = parser.parse_args()
+
+    service = SolverService(sys.stdout, arguments.executor, arguments.workers)
+    statistics = service.serve(sys.stdin)
+    print(json.dumps(statistics), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Registry of day solvers.
+
+Every day module (dayNN/dayNN.py) exposes:
+    parseInput(input_data)      - parses puzzle input held in memory (str)
+    loadInput()                 - reads and parses the bundled puzzle input file (with parsed input cache)
+    solvePartOne(parsed_input)  - part functions, they don't read any files and accept the parsed input only
+    solvePartTwo(parsed_input)
+    solveParts(parsed_input, parts)  - optional, solves several parts with one call, for days whose parts share work
+                                     (e.g. day03 crossings found once for both parts)
+Input is parsed once and the parsed form can be queried by any number of part calls:
+    solver = getSolver(6)
+    orbit_map = solver.parseInput(text)
+    solver.solvePart(2, orbit_map)
+Day modules are imported only when their solver is requested first.
+"""
+import importlib
+import os
+import re
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PART_NUMBERS = (1, 2)
+PART_NAMES = {1: "One", 2: "Two"}
+
+
+def discoverDays():
+    """
+    Returns day numbers of all day packages, e.g. ["01", "02"], without importing them.
+    """
+    return sorted(match.group(1) for match in (re.match(r"day(\d\d)$", name) for name in os.listdir(ROOT_PATH))
+                  if match and os.path.isfile(os.path.join(ROOT_PATH, match.group(0), match.group(0) + ".py")))
+
+
+def dayNumber(day):
+    """
+    Normalizes day number, e.g. 3 or "3" to "03".
+    """
+    return "{:02d}".format(int(day))
+
+
+class DaySolver():
+    def __init__(self, day_number):
+        """
+        Parse and part functions of single day.
+        :param day_number: e.g. "03"
+        """
+        self.day_number = day_number
+        self.module = importlib.import_module("day{0}.day{0}".format(day_number))
+        self.parseInput = self.module.parseInput
+        self.loadInput = self.module.loadInput
+        self.parts = {1: self.module.solvePartOne, 2: self.module.solvePartTwo}
+        self.solve_parts = getattr(self.module, "solveParts", None)
+
+    def solvePart(self, part, parsed_input):
+        """
+        Solves single part for parsed input.
+        :param part: 1 or 2
+        """
+        try:
+            part_function = self.parts[part]
+        except KeyError:
+            raise ValueError("Unknown part {}, expected one of {}".format(part, PART_NUMBERS)) from None
+        return part_function(parsed_input)
+
+    def solve(self, parsed_input=None, parts=PART_NUMBERS):
+        """
+        Solves parts for parsed input, with single call of day's solveParts (if it has one) for several parts.
+        :param parsed_input: parsed input, None - bundled puzzle input is loaded
+        :param parts: parts to be solved
+        :return: tuple of results in order of parts
+        """
+        if parsed_input is None:
+            parsed_input = self.loadInput()
+        parts = tuple(parts)
+        for part in parts:
+            if part not in self.parts:
+                raise ValueError("Unknown part {}, expected one of {}".format(part, PART_NUMBERS))
+        # Parts sharing work are solved together
+        if self.solve_parts is not None and len(set(parts)) > 1:
+            return tuple(self.solve_parts(parsed_input, parts))
+        return tuple(self.solvePart(part, parsed_input) for part in parts)
+
+
+# Solvers created so far, indexed by day number
+_solvers = {}
+
+
+def getSolver(day):
+    """
+    Returns solver of a day, created once per process.
+    :param day: day number, e.g. 3 or "03"
+    :return: DaySolver
+    """
+    day_number = dayNumber(day)
+    if day_number not in _solvers:
+        if day_number not in discoverDays():
+            raise ValueError("Unknown day {}".format(day_number))
+        _solvers[day_number] = DaySolver(day_number)
+    return _solvers[day_number]
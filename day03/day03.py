@@ -1,87 +1,380 @@
-from commons.commons import read_puzzle_input
+from commons.commons import iter_puzzle_lines, load_parsed_input
+from bisect import bisect_left, bisect_right
 import os
 
+# Version of cached parsed segments - increase, when parseWire or segment tuples change
+PARSED_INPUT_VERSION = 1
 
-def solve():
+# Wire directions
+TWO_DIM_DIRECTIONS = {
+    "L": (-1, 0),
+    "R": (1, 0),
+    "U": (0, -1),
+    "D": (0, 1)
+}
+
+
+def parseWire(wire_description):
     """
-    Advent Of Code 2019 - Day03 Solution.
-    :return: tuple(partOneResult[int], partTwoResult[int])
+    Splits wire to straight horizontal and vertical segments, cells of the wire are not visited one by one.
+    Segment is a tuple (fixed, low, high, start, start_steps):
+        fixed - y of horizontal segment, x of vertical segment
+        low, high - inclusive range of cells along the segment (start of segment is excluded - it is the last cell of
+            previous segment, or the central port)
+        start - coordinate of segment start along the segment
+        start_steps - wire steps at start of segment, steps at cell c are start_steps + abs(c - start)
+    :param wire_description: str, e.g. "R8,U5,L5,D3"
+    :return: tuple(horizontal_segments[list], vertical_segments[list])
+    """
+    horizontal_segments = []
+    vertical_segments = []
+
+    # Starting position of a wire and total steps
+    wire_pos_x = 0
+    wire_pos_y = 0
+    current_length = 0
+
+    for line_coordinate in wire_description.strip().split(","):
+        direction_x, direction_y = TWO_DIM_DIRECTIONS[line_coordinate[:1]]
+        section_length = int(line_coordinate[1:])
+
+        if section_length > 0:
+            if direction_x:
+                end = wire_pos_x + direction_x * section_length
+                horizontal_segments.append((wire_pos_y, min(wire_pos_x + direction_x, end),
+                                            max(wire_pos_x + direction_x, end), wire_pos_x, current_length))
+                wire_pos_x = end
+            else:
+                end = wire_pos_y + direction_y * section_length
+                vertical_segments.append((wire_pos_x, min(wire_pos_y + direction_y, end),
+                                          max(wire_pos_y + direction_y, end), wire_pos_y, current_length))
+                wire_pos_y = end
+
+        current_length += section_length
+
+    return horizontal_segments, vertical_segments
+
+
+def sweepPerpendicularCrossings(horizontal_segments, vertical_segments):
+    """
+    Finds crossings of horizontal segments (of one wire) with vertical segments (of another wire) with sweep line moving
+    along x - horizontal segments enter and leave the active set (sorted by y), every vertical segment queries range of
+    the active set it spans.
+    :return: generator of tuples (x, y, horizontal_steps, vertical_steps)
     """
+    # Events ordered by x, at the same x: enter (0) before query (1) before leave (2) - cell ranges are inclusive
+    events = []
+    for segment_idx, (y, low, high, start, start_steps) in enumerate(horizontal_segments):
+        events.append((low, 0, segment_idx))
+        events.append((high, 2, segment_idx))
+    for segment_idx, vertical_segment in enumerate(vertical_segments):
+        events.append((vertical_segment[0], 1, segment_idx))
+    events.sort()
+
+    # Active horizontal segments as sorted (y, segment_idx)
+    active = []
+
+    for x, event_type, segment_idx in events:
+        if event_type == 0:
+            y = horizontal_segments[segment_idx][0]
+            active.insert(bisect_left(active, (y, segment_idx)), (y, segment_idx))
+        elif event_type == 2:
+            y = horizontal_segments[segment_idx][0]
+            active.pop(bisect_left(active, (y, segment_idx)))
+        else:
+            vertical_x, low, high, vertical_start, vertical_start_steps = vertical_segments[segment_idx]
+            # Segment indexes are never lower than 0 and never reach len(horizontal_segments)
+            for y, horizontal_idx in active[bisect_left(active, (low, -1)):
+                                            bisect_right(active, (high, len(horizontal_segments)))]:
+                horizontal_start, horizontal_start_steps = horizontal_segments[horizontal_idx][3:]
+                yield (x, y, horizontal_start_steps + abs(x - horizontal_start),
+                       vertical_start_steps + abs(y - vertical_start))
+
+
+def findCollinearOverlaps(segments_one, segments_two):
+    """
+    Finds overlaps of parallel segments of two wires lying on the same line.
+    :param segments_one: segments of first wire (all horizontal or all vertical)
+    :param segments_two: segments of second wire (same orientation)
+    :return: generator of tuples (fixed, low, high, steps_at_low, steps_at_high) - combined steps of both wires at the
+        ends of overlapping cell range
+    """
+    # Segments of second wire grouped by line and sorted by low end
+    lines = {}
+    for segment in segments_two:
+        lines.setdefault(segment[0], []).append(segment)
+    for line_segments in lines.values():
+        line_segments.sort()
+    line_lows = {fixed: [segment[1] for segment in line_segments] for fixed, line_segments in lines.items()}
+
+    for fixed, low_one, high_one, start_one, start_steps_one in segments_one:
+        if fixed not in lines:
+            continue
+
+        # Only segments starting before end of the segment can overlap it
+        for line_segment in lines[fixed][:bisect_right(line_lows[fixed], high_one)]:
+            low_two, high_two, start_two, start_steps_two = line_segment[1:]
+            low = max(low_one, low_two)
+            high = min(high_one, high_two)
+            if low > high:
+                continue
+
+            yield (fixed, low, high,
+                   start_steps_one + abs(low - start_one) + start_steps_two + abs(low - start_two),
+                   start_steps_one + abs(high - start_one) + start_steps_two + abs(high - start_two))
+
+
+def findWireCrossings(wire_one, wire_two):
+    """
+    Finds crossing of two wires closest to central port and crossing with fewest combined steps. Wires are compared
+    segment by segment - time and memory depend on number of segments, not on length of wires.
+    :param wire_one: tuple(horizontal_segments, vertical_segments), result of parseWire
+    :param wire_two: tuple(horizontal_segments, vertical_segments), result of parseWire
+    :return: tuple(closest_distance[int], fewest_combined_steps[int]), tuple(None, None) if wires don't cross
+    """
+    closest_distance = None
+    fewest_steps = None
+
+    # Horizontal segment of one wire crosses vertical segment of the other one in a single cell
+    for horizontal_segments, vertical_segments in ((wire_one[0], wire_two[1]), (wire_two[0], wire_one[1])):
+        for x, y, horizontal_steps, vertical_steps in sweepPerpendicularCrossings(horizontal_segments,
+                                                                                 vertical_segments):
+            distance = abs(x) + abs(y)
+            if closest_distance is None or distance < closest_distance:
+                closest_distance = distance
+            if fewest_steps is None or horizontal_steps + vertical_steps < fewest_steps:
+                fewest_steps = horizontal_steps + vertical_steps
+
+    # Parallel segments on the same line share a range of cells. Distance is lowest in the cell closest to 0, combined
+    # steps change linearly along the range, so they are lowest at one of its ends
+    for segments_one, segments_two in ((wire_one[0], wire_two[0]), (wire_one[1], wire_two[1])):
+        for fixed, low, high, steps_at_low, steps_at_high in findCollinearOverlaps(segments_one, segments_two):
+            distance = abs(fixed) + min(abs(low), abs(high)) if low > 0 or high < 0 else abs(fixed)
+            if closest_distance is None or distance < closest_distance:
+                closest_distance = distance
+            if fewest_steps is None or min(steps_at_low, steps_at_high) < fewest_steps:
+                fewest_steps = min(steps_at_low, steps_at_high)
+
+    return closest_distance, fewest_steps
+
+
+class WireCrossingIndex():
+    def __init__(self, wires, cell_size=None):
+        """
+        Spatial index of segments of any number of wires. Segments are bucketed into square grid cells of cell_size,
+        long segments are stored in every grid cell they pass through.
+        :param wires: [] of tuple(horizontal_segments, vertical_segments), results of parseWire
+        :param cell_size: size of grid cell (default - average segment length)
+        """
+        self.wires_count = len(wires)
+
+        # Segments of both orientations (0 - horizontal, 1 - vertical) as (wire_idx, fixed, low, high, start,
+        # start_steps), lines of segments indexed by fixed coordinate
+        self.segments = ([], [])
+        self.lines = ({}, {})
+        for wire_idx, wire in enumerate(wires):
+            for orientation in (0, 1):
+                for fixed, low, high, start, start_steps in wire[orientation]:
+                    segment_idx = len(self.segments[orientation])
+                    self.segments[orientation].append((wire_idx, fixed, low, high, start, start_steps))
+                    self.lines[orientation].setdefault(fixed, []).append(segment_idx)
 
-    def findCrossingPositions():
+        if cell_size is None:
+            segments = self.segments[0] + self.segments[1]
+            cell_size = max(1, sum(segment[3] - segment[2] + 1 for segment in segments) // max(1, len(segments)))
+        self.cell_size = cell_size
+
+        # Grid of segment indexes of both orientations, indexed by grid cell (x // cell_size, y // cell_size)
+        self.grids = ({}, {})
+        for orientation in (0, 1):
+            for segment_idx, (wire_idx, fixed, low, high, start, start_steps) in enumerate(self.segments[orientation]):
+                for along_cell in range(low // cell_size, high // cell_size + 1):
+                    self.grids[orientation].setdefault(self._gridCell(orientation, fixed // cell_size, along_cell),
+                                                       []).append(segment_idx)
+
+    @staticmethod
+    def _gridCell(orientation, fixed_cell, along_cell):
+        # Grid cell (x, y) of horizontal segment is (along, fixed), of vertical one (fixed, along)
+        return (along_cell, fixed_cell) if orientation == 0 else (fixed_cell, along_cell)
+
+    def _lineIntervals(self, orientation, fixed):
         """
-        Returns dict of position indexed dicts of wire index and distance to that point, where the wires cross
+        Returns cell ranges of all wires on a line - segments lying on the line, and single cells, where perpendicular
+        segments cross it (found through the grid).
+        :return: [] of tuples (low, high, wire_idx, start, start_steps)
         """
-        # Read puzzle input from file - input is single line
-        puzzle_input = read_puzzle_input(os.path.dirname(os.path.abspath(__file__)), "day03_input.txt")
+        cell_size = self.cell_size
+        perpendicular = 1 - orientation
+        perpendicular_segments = self.segments[perpendicular]
+        perpendicular_grid = self.grids[perpendicular]
 
-        # (x,y) indexed dictionary of space occupied by wire, e.g. : (10, 20): set (1, 3) - on position (10, 20)
-        #   there are two wires placed - with id 1 and 3
-        wires_occupied = {}
+        intervals = []
+        found_perpendicular = set()
 
-        # Wire directions
-        two_dim_directions = {
-            "L": (-1, 0),
-            "R": (1, 0),
-            "U": (0, -1),
-            "D": (0, 1)
-        }
+        for segment_idx in self.lines[orientation][fixed]:
+            wire_idx, fixed, low, high, start, start_steps = self.segments[orientation][segment_idx]
+            intervals.append((low, high, wire_idx, start, start_steps))
 
-        # Loop through lines, each line is a wire
-        for wire_idx in range(len(puzzle_input)):
-            # Starting position of a wire
-            wire_pos_x = 0
-            wire_pos_y = 0
+            for along_cell in range(low // cell_size, high // cell_size + 1):
+                for perpendicular_idx in perpendicular_grid.get(
+                        self._gridCell(orientation, fixed // cell_size, along_cell), ()):
+                    if perpendicular_idx in found_perpendicular:
+                        continue
+                    wire_idx, crossing, perpendicular_low, perpendicular_high, perpendicular_start, \
+                        perpendicular_steps = perpendicular_segments[perpendicular_idx]
+                    if low <= crossing <= high and perpendicular_low <= fixed <= perpendicular_high:
+                        found_perpendicular.add(perpendicular_idx)
+                        intervals.append((crossing, crossing, wire_idx, crossing,
+                                          perpendicular_steps + abs(fixed - perpendicular_start)))
 
-            # Total steps
-            current_length = 0
+        return intervals
 
-            # Split line on comma to coordinates
-            line_coordinates = puzzle_input[wire_idx].split(",")
+    def findCrossingRanges(self, min_wires=None):
+        """
+        Finds ranges of cells on horizontal and vertical lines, where the same set of at least min_wires wires meet.
+        Cells are never visited one by one - every line is split on ends of wire ranges only.
+        Cell may be reported twice (once on its horizontal and once on its vertical line).
+        :param min_wires: minimum number of wires crossing in a cell (default - all wires)
+        :return: generator of tuples (orientation, fixed, low, high, wires_count, steps_at_low, steps_at_high) -
+            orientation 0 is horizontal line y = fixed, 1 vertical line x = fixed; combined steps (sum of fewest steps
+            of every crossing wire) at both ends of the range
+        """
+        if min_wires is None:
+            min_wires = self.wires_count
+        # Cell without any wire is not a crossing
+        min_wires = max(1, min_wires)
 
-            # Loop through all coordinates for single wire
-            for line_coordinate in line_coordinates:
-                section_direction = line_coordinate[:1]
-                section_length = int(line_coordinate[1:])
+        for orientation in (0, 1):
+            for fixed in self.lines[orientation]:
+                intervals = self._lineIntervals(orientation, fixed)
+                if len(set(interval[2] for interval in intervals)) < min_wires:
+                    continue
+                # Ranges enter at low and leave after high, events at the same cell are applied together
+                events = sorted([(interval[0], interval_idx) for interval_idx, interval in enumerate(intervals)] +
+                                [(interval[1] + 1, ~interval_idx) for interval_idx, interval in enumerate(intervals)])
 
-                # Move section_length times in specified direction
-                for i in range(section_length):
-                    wire_pos_x += two_dim_directions[section_direction][0]
-                    wire_pos_y += two_dim_directions[section_direction][1]
+                active = set()
+                active_by_wire = {}  # Number of active ranges of every wire
 
-                    wire_pos = (wire_pos_x, wire_pos_y)
+                for event_idx, (cell, interval_idx) in enumerate(events):
+                    if interval_idx >= 0:
+                        active.add(interval_idx)
+                        wire_idx = intervals[interval_idx][2]
+                        active_by_wire[wire_idx] = active_by_wire.get(wire_idx, 0) + 1
+                    else:
+                        active.discard(~interval_idx)
+                        wire_idx = intervals[~interval_idx][2]
+                        active_by_wire[wire_idx] -= 1
+                        if not active_by_wire[wire_idx]:
+                            del active_by_wire[wire_idx]
 
-                    current_length += 1
+                    # Set of wires changes only on the next event cell
+                    if len(active_by_wire) < min_wires or events[event_idx + 1][0] == cell:
+                        continue
 
-                    # Place the wire into space
-                    if wire_pos not in wires_occupied:
-                        wires_occupied[wire_pos] = {}
+                    wire_steps = {}
+                    for active_idx in active:
+                        wire_steps.setdefault(intervals[active_idx][2], []).append(intervals[active_idx])
 
-                    if wire_idx not in wires_occupied[wire_pos]:
-                        wires_occupied[wire_pos][wire_idx] = current_length
+                    # Steps of every segment change linearly along the range, fewest steps of a wire (minimum of
+                    # linear functions) and their sum are concave - lowest value is at one of the ends
+                    low = cell
+                    high = events[event_idx + 1][0] - 1
+                    steps_at_ends = [sum(min(start_steps + abs(end_cell - start)
+                                             for _, _, _, start, start_steps in wire_intervals)
+                                         for wire_intervals in wire_steps.values())
+                                     for end_cell in (low, high)]
 
-        # Return dict of position indexed dicts of wire index and distance to that point, where the wires cross
-        return {key: value for (key, value) in wires_occupied.items() if len(value) >= len(puzzle_input)}
+                    yield (orientation, fixed, low, high, len(wire_steps), steps_at_ends[0], steps_at_ends[1])
 
-    def solvePartOne():
-        """Advent Of Code 2019 - Day03 - Part One Solution.
-        :return: int
+    def findClosestCrossing(self, min_wires=None):
         """
-        part_one_result = list(findCrossingPositions().keys())  # All positions at which wires cross
-        part_one_result.sort(key=lambda x: abs(x[0]) + abs(x[1]))  # Sort positions by manhattan distance
-        part_one_result = part_one_result[0]  # Select first - 0th element
-        return abs(part_one_result[0]) + abs(part_one_result[1])  # Return manhattan distance to position
-
-    def solvePartTwo():
-        """Advent Of Code 2019 - Day03 - Part Two Solution.
-        :return: int
+        Returns Manhattan distance from central port to closest cell, where at least min_wires wires meet.
+        :param min_wires: minimum number of wires crossing in a cell (default - all wires)
+        :return: int, None if there is no such cell
         """
+        return min((abs(fixed) + (min(abs(low), abs(high)) if low > 0 or high < 0 else 0)
+                    for orientation, fixed, low, high, wires_count, steps_at_low, steps_at_high
+                    in self.findCrossingRanges(min_wires)), default=None)
+
+    def findFewestStepsCrossing(self, min_wires=None):
         """
-        for wire_idx_and_distance in findCrossingPositions().values() - loops through values - wire index and total
-                distance to the point (please note, we are not interested in position itself), e.g. {0:250, 1:100}
-        sum(wire_idx_and_distance.values()) - sum of values inside, e.g. 250 + 100
-        min([]) - minimum of all values
+        Returns fewest combined steps of wires to a cell, where at least min_wires wires meet (steps of all wires
+        meeting in the cell are summed).
+        :param min_wires: minimum number of wires crossing in a cell (default - all wires)
+        :return: int, None if there is no such cell
         """
-        return min([sum(wire_idx_and_distance.values()) for wire_idx_and_distance in findCrossingPositions().values()])
+        return min((min(steps_at_low, steps_at_high)
+                    for orientation, fixed, low, high, wires_count, steps_at_low, steps_at_high
+                    in self.findCrossingRanges(min_wires)), default=None)
+
+
+def parseInput(input_data):
+    """
+    Parses puzzle input - each line is a wire.
+    :param input_data: str
+    :return: [] of wires, see parseWire
+    """
+    return [parseWire(wire_description) for wire_description in input_data.splitlines() if wire_description.strip()]
+
+
+def loadInput():
+    """
+    Reads and parses puzzle input file (parsed segments are cached).
+    """
+    return load_parsed_input(os.path.dirname(os.path.abspath(__file__)), "day03_input.txt", "segments",
+                             lambda path, file_name: [parseWire(wire_description) for wire_description
+                                                      in iter_puzzle_lines(path, file_name)
+                                                      if wire_description.strip()],
+                             parser_version=PARSED_INPUT_VERSION)
+
+
+def findCrossings(wires):
+    """
+    Finds crossing closest to central port and crossing with fewest combined steps. More than two wires must all
+    cross in the same cell.
+    :param wires: [] of wires, see parseWire
+    :return: tuple(closest_distance[int], fewest_steps[int])
+    """
+    if len(wires) == 2:
+        return findWireCrossings(wires[0], wires[1])
 
-    return solvePartOne(), solvePartTwo()
+    crossing_index = WireCrossingIndex(wires)
+    return crossing_index.findClosestCrossing(), crossing_index.findFewestStepsCrossing()
+
+
+def solvePartOne(wires):
+    """Advent Of Code 2019 - Day03 - Part One Solution.
+    :param wires: parsed input (see parseInput)
+    :return: int
+    """
+    # Manhattan distance to crossing closest to central port
+    return findCrossings(wires)[0]
+
+
+def solvePartTwo(wires):
+    """Advent Of Code 2019 - Day03 - Part Two Solution.
+    :param wires: parsed input (see parseInput)
+    :return: int
+    """
+    # Fewest combined steps the wires must take to reach a crossing
+    return findCrossings(wires)[1]
+
+
+def solveParts(wires, parts):
+    """
+    Solves several parts - crossings are found once, all parts share the result.
+    :param wires: parsed input (see parseInput)
+    :param parts: part numbers, e.g. (1, 2)
+    :return: tuple of results in order of parts
+    """
+    crossings = findCrossings(wires)
+    return tuple(crossings[part - 1] for part in parts)
+
+
+def solve():
+    """
+    Advent Of Code 2019 - Day03 Solution.
+    :return: tuple(partOneResult[int], partTwoResult[int])
+    """
+    return solveParts(loadInput(), (1, 2))
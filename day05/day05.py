@@ -1,117 +1,70 @@
-from commons.commons import read_puzzle_input
+from commons.commons import load_parsed_input, parse_ints, read_puzzle_ints
+from commons.intcode import IntcodeMachine, getProgramImage
 import os
 
 
-class VirtualMachine():
-    def __init__(self, program_instructions, systemid):
+class VirtualMachine(IntcodeMachine):
+    def __init__(self, program_instructions, systemid, compiled=None):
         """
         Creates virtual machine, copy of program in internal memory and moves instruction pointer to beginning of program.
         :param program_instructions: [] program
         :param systemid: id of a system
+        :param compiled: commons.intcode_jit.CompiledProgram - run in compiled mode (optional)
         """
-        self.registers = program_instructions[:]
-        self.instruction_pointer = 0
+        super().__init__(program_instructions, compiled=compiled)
         self.machine_input = systemid
-        self.machine_output = []
 
-    def getRegisterValue(self, register_mode_index_tuple):
+    def readInput(self):
         """
-        Returns value of a register, based on mode.
-        For position mode, register with index value is returned - self.registers[value].
-        For immediate mode, value itself is returned.
+        Every input instruction reads system id.
         """
-        param_mode, param_value = register_mode_index_tuple
+        return self.machine_input
 
-        if param_mode == 0:  # position mode 0
-            return self.registers[param_value]
-        else:  # immediate mode 1
-            return param_value
 
-    def runProgram(self):
-        """
-        Runs program in virtual machine memory.
-        """
-
-        # Run program forever
-        while True:
-            # 1) Load single instruction - opcode + register modes
-            param0 = self.registers[self.instruction_pointer]  # parameter 0 (op_code + parameter modes)
-            self.instruction_pointer += 1  # increase instruction pointer by one
-
-            opcode = param0 % 100  # Get opcode out of first parameter - two rightmost numbers
+def parseInput(input_data):
+    """
+    Parses puzzle input - single line of integers split by ",".
+    :param input_data: str
+    :return: [] program
+    """
+    return list(parse_ints(input_data))
 
-            # 2) Find how many additional parameters we need to read, based on instruction type
-            if opcode in (1, 2, 7, 8):
-                additional_parameters_count = 3
-            elif opcode in (3, 4):
-                additional_parameters_count = 1
-            elif opcode in (5, 6):
-                additional_parameters_count = 2
-            elif opcode in (99,):
-                additional_parameters_count = 0
 
-            # 3a) Load modes for additional parameters - two rightmost digits (ones and tens are opcode),
-            # the rest to the left hundreds, thousands, ten-thousands digits are modes for parameters from 1 to n,
-            # e.g. ABCDEF -> opcode = EF, D=param1 mode, C=param2 mode, B=param3 mode, A=param4 mode
-            #
-            # How to get e.g thousands digit: get remainder after division one magnitude higher,
-            # then whole-number divide (floor) by same magnitude,
-            # example: get thousands of 12345: 12345 % 10000 = 2345; 2345 // 1000 = 2 - thousands digit is 2
-            param_modes = [param0 % (1000 * pow(10, par_mode)) // (100 * pow(10, par_mode)) for par_mode in
-                           range(0, additional_parameters_count)]
+def loadInput():
+    """
+    Reads and parses puzzle input file (parsed program is cached).
+    """
+    return list(load_parsed_input(os.path.dirname(os.path.abspath(__file__)), "day05_input.txt", "intcode",
+                                  read_puzzle_ints))
 
-            # 3b) Load additional parameters
-            param_values = [self.registers[idx] for idx in
-                            range(self.instruction_pointer, self.instruction_pointer + additional_parameters_count)]
 
-            # 3c) Join parameter modes and parameters into list of sets [(par1_mode, par1_val), (par2_mode, par2_val),..]
-            parameters = list(zip(param_modes, param_values))
+def runDiagnostics(input_program, system_id):
+    """
+    Runs program with system id as input, returns diagnostic code (last output).
+    """
+    vm = VirtualMachine(getProgramImage(input_program), system_id)
+    vm.runProgram()
+    return vm.getDiagnosticCode()
 
-            # 4) Increase instruction pointer by number of parameters, which have been read
-            self.instruction_pointer += additional_parameters_count
 
-            # 5) Process instruction
-            # Assignments are always treated as IMMEDIATE, in contrary to puzzle requirements, and I explain why:
-            # position assignment to register 4 would mean, that we get value out of register 4, for example 8 and
-            # then store value in register 8. Value must be stored in 4 instead. This means, that assignments are
-            # always treated as immediate.
-            #
-            # example: self.getRegisterValue((1, parameters[2][1])) - we manually change mode of this parameter to (1, value) - immediate
+def solvePartOne(input_program):
+    """Advent Of Code 2019 - Day05 - Part One Solution.
+    :param input_program: parsed input (see parseInput)
+    :return: int
+    """
+    # Create machine with SYSTEMID = 1
+    # although machine type is same for both puzzles, setting system_id to 1 never triggers any of 4-8 instructions
+    # introduced by part-two
+    return runDiagnostics(input_program, 1)
 
-            if opcode == 1:  # Addition
-                self.registers[self.getRegisterValue((1, parameters[2][1]))] = self.getRegisterValue(
-                    parameters[0]) + self.getRegisterValue(parameters[1])
-            elif opcode == 2:  # Multiplication
-                self.registers[self.getRegisterValue((1, parameters[2][1]))] = self.getRegisterValue(
-                    parameters[0]) * self.getRegisterValue(parameters[1])
-            elif opcode == 3:  # Read Input
-                self.registers[self.getRegisterValue((1, parameters[0][1]))] = self.machine_input
-            elif opcode == 4:  # Write output
-                self.machine_output.append(self.getRegisterValue(parameters[0]))
-            elif opcode == 5:  # Jump-if-true
-                if self.getRegisterValue(parameters[0]) != 0:
-                    self.instruction_pointer = self.getRegisterValue(parameters[1])
-            elif opcode == 6:  # Jump-if-false
-                if self.getRegisterValue(parameters[0]) == 0:
-                    self.instruction_pointer = self.getRegisterValue(parameters[1])
-            elif opcode == 7:  # Less than
-                if self.getRegisterValue(parameters[0]) < self.getRegisterValue(parameters[1]):
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 1
-                else:
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 0
-            elif opcode == 8:  # Equals
-                if self.getRegisterValue(parameters[0]) == self.getRegisterValue(parameters[1]):
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 1
-                else:
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 0
-            elif opcode == 99:  # Terminate program
-                break
 
-    def getDiagnosticCode(self):
-        """
-        Returns diagnostic code of a machine - last entry in machine output.
-        """
-        return self.machine_output[-1]
+def solvePartTwo(input_program):
+    """Advent Of Code 2019 - Day05 - Part Two Solution.
+    :param input_program: parsed input (see parseInput)
+    :return: int
+    """
+    # Create machine with SYSTEMID = 5
+    return runDiagnostics(input_program, 5)
 
 
 def solve():
@@ -119,33 +72,6 @@ def solve():
     Advent Of Code 2019 - Day05 Solution.
     :return: tuple(partOneResult[int], partTwoResult[int])
     """
-
-    # Store parsed puzzle input "globally" to avoid re-reading input file in part-two of the puzzle. We copy parsed program instead.
-    # Read puzzle input from file - input is single line
-    puzzle_input = read_puzzle_input(os.path.dirname(os.path.abspath(__file__)), "day05_input.txt")[0]
-
-    # Split input on "," to list of integers
-    REGISTER_SPLITTER = ","
-    puzzle_input_program = [int(x) for x in puzzle_input.split(REGISTER_SPLITTER)]
-
-    def solvePartOne():
-        """Advent Of Code 2019 - Day05 - Part One Solution.
-        :return: int
-        """
-        # Create machine with SYSTEMID = 1
-        # although machine type is same for both puzzles, setting system_id to 1 never triggers any of 4-8 instructions
-        # introduced by part-two
-        vm_one = VirtualMachine(puzzle_input_program, 1)
-        vm_one.runProgram()
-        return vm_one.getDiagnosticCode()
-
-    def solvePartTwo():
-        """Advent Of Code 2019 - Day05 - Part Two Solution.
-        :return: int
-        """
-        # Create machine with SYSTEMID = 5
-        vm_two = VirtualMachine(puzzle_input_program, 5)
-        vm_two.runProgram()
-        return vm_two.getDiagnosticCode()
-
-    return solvePartOne(), solvePartTwo()
+    # Parsed once, parts copy the program into machine memory
+    input_program = loadInput()
+    return solvePartOne(input_program), solvePartTwo(input_program)
@@ -1,99 +1,244 @@
-from commons.commons import read_puzzle_input
+from commons.commons import iter_puzzle_lines, load_parsed_input
 import os
 
+# Parent of planet, which doesn't orbit anything (centre of universe)
+NO_SUN = -1
 
-class Planet():
-    def __init__(self):
-        self.sun_planet = None
+# Version of cached parsed map - increase, when parseOrbitMap or OrbitMap change
+PARSED_INPUT_VERSION = 1
 
-    def setSunPlanet(self, sun_planet):
-        self.sun_planet = sun_planet
 
-    def getAllSuns(self):
+class OrbitMap():
+    def __init__(self):
         """
-        Returns path - list of planets from CENTER to PLANET (CENTER as 0th, PLANET as last element)
+        Orbit map as indexed tree - every planet has integer id, sun of planet is stored in parents list.
         """
-        if self.sun_planet is None:
-            return []
-        else:
-            all_suns = self.sun_planet.getAllSuns().copy()
-            all_suns.append(self.sun_planet)
-            return all_suns
+        self.names = []  # Planet names indexed by id
+        self.ids = {}  # Planet ids indexed by name
+        self.parents = []  # Id of sun indexed by id of planet, NO_SUN for centre
+        self.depths = None  # Number of direct and indirect orbits indexed by id, computed by computeDepths
+        self.lca_index = None  # OrbitLcaIndex, built by getLcaIndex
 
+    def getPlanetId(self, planet_name):
+        """
+        Returns id of planet, planet is created if it doesn't exist yet.
+        """
+        try:
+            return self.ids[planet_name]
+        except KeyError:
+            planet_id = len(self.names)
+            self.ids[planet_name] = planet_id
+            self.names.append(planet_name)
+            self.parents.append(NO_SUN)
+            return planet_id
 
-def solve():
-    """
-    Advent Of Code 2019 - Day06 Solution.
-    :return: tuple(partOneResult[int], partTwoResult[int])
-    """
+    def addOrbit(self, sun_planet_name, orbiting_planet_name):
+        """
+        Sets orbiting planet to orbit around sun. Planets may be added in any order, e.g.: B)C, A)B (first we create
+        planet B, but learn later, that it orbits around planet A).
+        """
+        self.parents[self.getPlanetId(orbiting_planet_name)] = self.getPlanetId(sun_planet_name)
+        self.depths = None
+        self.lca_index = None
 
-    # Read puzzle input from file
-    puzzle_input = read_puzzle_input(os.path.dirname(os.path.abspath(__file__)), "day06_input.txt")
+    def computeDepths(self):
+        """
+        Computes depth (number of direct and indirect orbits) of every planet iteratively - path up to a planet with
+        known depth is walked once and depths are assigned on the way back, so every planet is visited O(1) times.
+        :return: [] depths indexed by planet id
+        """
+        parents = self.parents
+        depths = [-1] * len(parents)
+        path = []
+
+        for planet_id in range(len(parents)):
+            # Walk up to centre or to a planet with known depth
+            current_id = planet_id
+            while current_id != NO_SUN and depths[current_id] < 0:
+                path.append(current_id)
+                # Planet is on the walked path already
+                if len(path) > len(parents):
+                    raise ValueError("Orbit map contains a cycle at {}".format(self.names[planet_id]))
+                current_id = parents[current_id]
+
+            depth = -1 if current_id == NO_SUN else depths[current_id]
+            while path:
+                depth += 1
+                depths[path.pop()] = depth
+
+        self.depths = depths
+        return depths
+
+    def getDepths(self):
+        """
+        Returns depths of all planets, computed once.
+        """
+        if self.depths is None:
+            self.computeDepths()
+        return self.depths
 
-    # Split input on ")" to sun and orbiting planets
-    LINE_SPLITTER = ")"
+    def totalOrbits(self):
+        """
+        Returns total number of direct and indirect orbits - sum of depths of all planets.
+        """
+        return sum(self.getDepths())
 
-    # Planets dict indexed by planet name
-    planets = {}
+    def getLcaIndex(self):
+        """
+        Returns lowest common ancestor index of the map, built once (and again after the map changes).
+        """
+        if self.lca_index is None:
+            self.lca_index = OrbitLcaIndex(self)
+        return self.lca_index
 
-    # Get or create planet with specified name
-    def getOrCreatePlanet(planet_name):
-        try:
-            return planets[planet_name]
-        except KeyError:
-            new_planet = Planet()
-            planets[planet_name] = new_planet
-            return new_planet
+    def transferDistance(self, planet_one_name, planet_two_name):
+        """
+        Returns number of orbital transfers required to move from object planet one orbits to object planet two orbits.
+        """
+        sun_ids = []
+        for planet_name in (planet_one_name, planet_two_name):
+            sun_id = self.parents[self.ids[planet_name]]
+            if sun_id == NO_SUN:
+                raise ValueError("Planet {} doesn't orbit any object".format(planet_name))
+            sun_ids.append(sun_id)
+        return self.getLcaIndex().distanceById(*sun_ids)
 
-    # Loop through puzzle input
-    for puzzle_input_line in puzzle_input:
-        # Parse sun and orbiting planets out of input
-        sun_planet_name, orbiting_planet_name = puzzle_input_line.strip().split(LINE_SPLITTER)
 
-        # Get (or create) both planets and set the orbiting planet to orbit around sun
-        # This is necessary, as planet's sun may be unknown at time of parsing input, e.g.: B)C, A)B (first we created
-        # planet B, but learned later, that it orbits around planet A)
-        getOrCreatePlanet(orbiting_planet_name).setSunPlanet(getOrCreatePlanet(sun_planet_name))
+class OrbitLcaIndex():
+    def __init__(self, orbit_map):
+        """
+        Lowest common ancestor index (binary lifting) of orbit map - jumps[k][planet] is the planet 2^k orbits up
+        (centre jumps to itself). Built in O(N log depth), every query then takes O(log depth).
+        :param orbit_map: OrbitMap
+        """
+        self.orbit_map = orbit_map
+        self.depths = orbit_map.getDepths()
+
+        self.jumps = [[planet_id if parent_id == NO_SUN else parent_id
+                       for planet_id, parent_id in enumerate(orbit_map.parents)]]
+        for level in range(1, max(self.depths, default=0).bit_length()):
+            previous_jumps = self.jumps[-1]
+            self.jumps.append([previous_jumps[planet_id] for planet_id in previous_jumps])
 
-    def solvePartOne():
-        """Advent Of Code 2019 - Day06 - Part One Solution.
-        :return: int
+    def liftById(self, planet_id, steps):
+        """
+        Returns planet, which is steps orbits up from planet.
+        """
+        level = 0
+        while steps:
+            if steps & 1:
+                planet_id = self.jumps[level][planet_id]
+            steps >>= 1
+            level += 1
+        return planet_id
+
+    def lowestCommonAncestorById(self, planet_one, planet_two):
         """
-        # Loop through all planets and find how many planets does it orbit direct and undirect
-        total_orbits = 0
+        Returns id of closest planet both planets (directly or indirectly) orbit, or are. None if planets don't share
+        any centre.
+        """
+        depths = self.depths
+        if depths[planet_one] < depths[planet_two]:
+            planet_one, planet_two = planet_two, planet_one
+        planet_one = self.liftById(planet_one, depths[planet_one] - depths[planet_two])
+
+        if planet_one == planet_two:
+            return planet_one
 
-        for planet in planets.values():
-            total_orbits += len(planet.getAllSuns())
+        # Jump as high as possible, while planets stay below common ancestor
+        for level_jumps in reversed(self.jumps):
+            if level_jumps[planet_one] != level_jumps[planet_two]:
+                planet_one = level_jumps[planet_one]
+                planet_two = level_jumps[planet_two]
 
-        return total_orbits
+        planet_one = self.jumps[0][planet_one]
+        return planet_one if planet_one == self.jumps[0][planet_two] else None
 
-    def solvePartTwo():
-        """Advent Of Code 2019 - Day06 - Part Two Solution.
-        :return: int
+    def distanceById(self, planet_one, planet_two):
+        """
+        Returns number of orbit hops between two planets.
         """
-        # All planets from SAN to centre of universe (SAN excluding) - distance increasing from left to right
-        san_to_center_path = planets["SAN"].getAllSuns()
-        # All planets from YOU to centre of universe (YOU excluding)
-        you_to_center_path = planets["YOU"].getAllSuns()
+        common_id = self.lowestCommonAncestorById(planet_one, planet_two)
+        if common_id is None:
+            raise ValueError("Planets {} and {} are not connected".format(self.orbit_map.names[planet_one],
+                                                                        self.orbit_map.names[planet_two]))
+        return self.depths[planet_one] + self.depths[planet_two] - 2 * self.depths[common_id]
 
-        # Planets which are common for both paths
-        common_path_to_center = [x for x in san_to_center_path if x in you_to_center_path]
+    def distance(self, planet_one_name, planet_two_name):
+        """
+        Returns number of orbit hops between two planets, e.g. distance("COM", "B") = 1.
+        """
+        return self.distanceById(self.orbit_map.ids[planet_one_name], self.orbit_map.ids[planet_two_name])
 
-        # Rightmost (or first common) is the planet which is closest to SAN and YOU
-        # (since each planet can have only single sun - parent in graph, the first (rightmost) path is shortest.
-        # There are no shortcuts in the space. If we moved one step closed, we would need to take that same step back
-        # (remember, there is only one way to each of planets).
-        first_common_planet = common_path_to_center[-1]
+    def distances(self, planet_name_pairs):
+        """
+        Answers batch of distance queries.
+        :param planet_name_pairs: iterable of tuple(planet_one_name, planet_two_name)
+        :return: [] of distances
+        """
+        ids = self.orbit_map.ids
+        return [self.distanceById(ids[planet_one_name], ids[planet_two_name])
+                for planet_one_name, planet_two_name in planet_name_pairs]
 
-        # Find how many steps are required from SAN to COMMON planet and YOU to COMMON planet. Substract 2
-        # (we don't need to actually step on COMMON planet. Being on the orbit is enough. Those two hops are TO
-        # and FROM common planet)
-        # As our path is given as SUN-DIST_N-COMMON-DIST_2-DIST_1-(PLANET - not actual part of path), we get
-        # the distance from PLANET to COMMON as path_length - index(COMMON),
-        # for example: total hops to sun(len) = 5, index(COMMON) = 2, distance = 5-2 = 3
-        san_to_you_steps_count = len(san_to_center_path) - san_to_center_path.index(first_common_planet) + \
-                                 len(you_to_center_path) - you_to_center_path.index(first_common_planet) - 2
 
-        return san_to_you_steps_count
+def parseOrbitMap(puzzle_input):
+    """
+    Parses lines of orbits, e.g. "COM)B", into OrbitMap.
+    """
+    # Split input on ")" to sun and orbiting planets
+    LINE_SPLITTER = ")"
+
+    orbit_map = OrbitMap()
+    for puzzle_input_line in puzzle_input:
+        puzzle_input_line = puzzle_input_line.strip()
+        if puzzle_input_line:
+            sun_planet_name, orbiting_planet_name = puzzle_input_line.split(LINE_SPLITTER)
+            orbit_map.addOrbit(sun_planet_name, orbiting_planet_name)
+    return orbit_map
+
+
+def parseInput(input_data):
+    """
+    Parses puzzle input - one orbit per line.
+    :param input_data: str
+    :return: OrbitMap
+    """
+    return parseOrbitMap(input_data.splitlines())
 
-    return solvePartOne(), solvePartTwo()
+
+def loadInput():
+    """
+    Reads and parses puzzle input file - lines are parsed one by one (parsed map is cached).
+    """
+    return load_parsed_input(os.path.dirname(os.path.abspath(__file__)), "day06_input.txt", "orbit_map",
+                             lambda path, file_name: parseOrbitMap(iter_puzzle_lines(path, file_name)),
+                             parser_version=PARSED_INPUT_VERSION)
+
+
+def solvePartOne(orbit_map):
+    """Advent Of Code 2019 - Day06 - Part One Solution.
+    :param orbit_map: parsed input (see parseInput)
+    :return: int
+    """
+    # How many planets does every planet orbit direct and undirect
+    return orbit_map.totalOrbits()
+
+
+def solvePartTwo(orbit_map):
+    """Advent Of Code 2019 - Day06 - Part Two Solution.
+    :param orbit_map: parsed input (see parseInput)
+    :return: int
+    """
+    # Transfers between objects YOU and SAN orbit (we don't need to step on the common planet, being on the orbit
+    # is enough)
+    return orbit_map.transferDistance("YOU", "SAN")
+
+
+def solve():
+    """
+    Advent Of Code 2019 - Day06 Solution.
+    :return: tuple(partOneResult[int], partTwoResult[int])
+    """
+    # Depths computed by part one are reused by part two
+    orbit_map = loadInput()
+    return solvePartOne(orbit_map), solvePartTwo(orbit_map)
@@ -1,249 +1,241 @@
-from commons.commons import read_puzzle_input
+from commons.commons import load_parsed_input, parse_ints, read_puzzle_ints
+from commons.intcode import IntcodeMachine, ProgramImage, getProgramImage
+from commons.intcode_batch import BatchMachine
+from commons.intcode_network import IntcodeNetwork
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from itertools import permutations
+from math import factorial
 import os
 
 
-class VirtualMachine():
-    def __init__(self, program_instructions):
+class VirtualMachine(IntcodeMachine):
+    def __init__(self, program_instructions, phase, compiled=None):
         """
-        Creates virtual machine, copy of program in internal memory and moves instruction pointer to beginning of program.
-        :param program_instructions: [] program
-        :param systemid: id of a system
+        Creates amplifier - virtual machine with phase setting waiting in its input channel.
+        Machine runs until it halts or blocks waiting for next input signal.
+        :param program_instructions: [] program or commons.intcode.ProgramImage
+        :param phase: phase setting of amplifier
+        :param compiled: commons.intcode_jit.CompiledProgram - run in compiled mode (optional)
         """
-        self.registers = program_instructions[:]
-        self.instruction_pointer = 0
-        self.machine_input = []
-        self.machine_output = []
-        self.input_read_times = 0
-        self.stopped = False
-
-    def setInput(self, input):
-        """
-        Sets input for machine.
-        :param input: list of parameters
-        """
-        self.machine_input = input[:]
+        super().__init__(program_instructions, compiled=compiled)
+        self.phase = phase
+        self.addInput(phase)
 
-    def getRegisterValue(self, register_mode_index_tuple):
-        """
-        Returns value of a register, based on mode.
-        For position mode, register with index value is returned - self.registers[value].
-        For immediate mode, value itself is returned.
-        """
-        param_mode, param_value = register_mode_index_tuple
 
-        if param_mode == 0:  # position mode 0
-            return self.registers[param_value]
-        else:  # immediate mode 1
-            return param_value
+def findMaxAmplifiersOutput(program_image, phases, feedback_loop, statistics=None, executor="serial", workers=None):
+    """
+    Finds maximum output of amplifiers chain over all phase permutations.
+    Permutations are walked as a tree of phase prefixes - amplifiers of a prefix are run only once (until their first
+    output) and the machines are forked for every permutation sharing the prefix, instead of re-running them.
+    :param program_image: commons.intcode.ProgramImage (or [] program) of an amplifier
+    :param phases: phase settings to permute, one for each amplifier
+    :param feedback_loop: True - output of last amplifier is fed back to first one, until last amplifier stops
+    :param statistics: optional dict, filled with "steps_executed" and "steps_saved" (compared to running every
+        permutation from scratch)
+    :param executor: "serial", "thread" or "process" - subtrees of every first phase are searched in a pool of workers,
+        "batch" - all permutations run in lockstep as one commons.intcode_batch.BatchMachine per amplifier (needs numpy)
+    :param workers: number of pool workers (default - number of CPUs)
+    :return: int
+    """
+    phases = list(phases)
 
-    def runProgram(self):
-        """
-        Runs program in virtual machine memory.
-        """
+    if statistics is None:
+        statistics = {}
 
-        # Run program forever
-        while True:
-            # 1) Load single instruction - opcode + register modes
-            param0 = self.registers[self.instruction_pointer]  # parameter 0 (op_code + parameter modes)
-            self.instruction_pointer += 1  # increase instruction pointer by one
-
-            opcode = param0 % 100  # Get opcode out of first parameter - two rightmost numbers
-
-            # 2) Find how many additional parameters we need to read, based on instruction type
-            if opcode in (1, 2, 7, 8):
-                additional_parameters_count = 3
-            elif opcode in (3, 4):
-                additional_parameters_count = 1
-            elif opcode in (5, 6):
-                additional_parameters_count = 2
-            elif opcode in (99,):
-                additional_parameters_count = 0
-
-            # 3a) Load modes for additional parameters - two rightmost digits (ones and tens are opcode),
-            # the rest to the left hundreds, thousands, ten-thousands digits are modes for parameters from 1 to n,
-            # e.g. ABCDEF -> opcode = EF, D=param1 mode, C=param2 mode, B=param3 mode, A=param4 mode
-            #
-            # How to get e.g thousands digit: get remainder after division one magnitude higher,
-            # then whole-number divide (floor) by same magnitude,
-            # example: get thousands of 12345: 12345 % 10000 = 2345; 2345 // 1000 = 2 - thousands digit is 2
-            param_modes = [param0 % (1000 * pow(10, par_mode)) // (100 * pow(10, par_mode)) for par_mode in
-                           range(0, additional_parameters_count)]
-
-            # 3b) Load additional parameters
-            param_values = [self.registers[idx] for idx in
-                            range(self.instruction_pointer, self.instruction_pointer + additional_parameters_count)]
-
-            # 3c) Join parameter modes and parameters into list of sets [(par1_mode, par1_val), (par2_mode, par2_val),..]
-            parameters = list(zip(param_modes, param_values))
-
-            # 4) Increase instruction pointer by number of parameters, which have been read
-            self.instruction_pointer += additional_parameters_count
-
-            # 5) Process instruction
-            # Assignments are always treated as IMMEDIATE, in contrary to puzzle requirements, and I explain why:
-            # position assignment to register 4 would mean, that we get value out of register 4, for example 8 and
-            # then store value in register 8. Value must be stored in 4 instead. This means, that assignments are
-            # always treated as immediate.
-            #
-            # example: self.getRegisterValue((1, parameters[2][1])) - we manually change mode of this parameter to (1, value) - immediate
-
-            if opcode == 1:  # Addition
-                self.registers[self.getRegisterValue((1, parameters[2][1]))] = self.getRegisterValue(
-                    parameters[0]) + self.getRegisterValue(parameters[1])
-            elif opcode == 2:  # Multiplication
-                self.registers[self.getRegisterValue((1, parameters[2][1]))] = self.getRegisterValue(
-                    parameters[0]) * self.getRegisterValue(parameters[1])
-            elif opcode == 3:  # Read Input
-                # in case, input is read first time, it is phase setting
-                if self.input_read_times == 0:
-                    self.registers[self.getRegisterValue((1, parameters[0][1]))] = self.machine_input[0]
-                # otherwise it is "power input" and it stays for consequents reading
-                else:
-                    self.registers[self.getRegisterValue((1, parameters[0][1]))] = self.machine_input[-1]
-
-                self.input_read_times += 1
-
-            elif opcode == 4:  # Write output
-                self.machine_output.append(self.getRegisterValue(parameters[0]))
-                break
-            elif opcode == 5:  # Jump-if-true
-                if self.getRegisterValue(parameters[0]) != 0:
-                    self.instruction_pointer = self.getRegisterValue(parameters[1])
-            elif opcode == 6:  # Jump-if-false
-                if self.getRegisterValue(parameters[0]) == 0:
-                    self.instruction_pointer = self.getRegisterValue(parameters[1])
-            elif opcode == 7:  # Less than
-                if self.getRegisterValue(parameters[0]) < self.getRegisterValue(parameters[1]):
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 1
-                else:
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 0
-            elif opcode == 8:  # Equals
-                if self.getRegisterValue(parameters[0]) == self.getRegisterValue(parameters[1]):
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 1
-                else:
-                    self.registers[self.getRegisterValue((1, parameters[2][1]))] = 0
-            elif opcode == 99:  # Terminate program
-                self.stopped = True
-                break
-
-    def isStopped(self):
-        return self.stopped
-
-    def getDiagnosticCode(self):
-        """
-        Returns diagnostic code of a machine - last entry in machine output.
-        """
-        return self.machine_output[-1]
+    if executor == "serial":
+        max_amplifiers_output, search_statistics = walkAmplifierPrefixes(program_image, phases, feedback_loop, phases)
+        statistics.update(search_statistics)
+        return max_amplifiers_output
 
+    if executor == "batch":
+        max_amplifiers_output, search_statistics = searchAmplifiersBatch(program_image, phases, feedback_loop)
+        statistics.update(search_statistics)
+        return max_amplifiers_output
 
-def solve():
+    if executor == "thread":
+        # Threads share the program image, search state is bound to the task of this call only
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            subtree_results = list(pool.map(partial(walkAmplifierPrefixes, program_image, phases, feedback_loop),
+                                            [[phase] for phase in phases]))
+    elif executor == "process":
+        # Program is sent to every worker process only once (pool initializer), tasks consist of the first phase only
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initAmplifiersWorker,
+                                 initargs=(tuple(program_image), phases, feedback_loop)) as pool:
+            subtree_results = list(pool.map(_searchAmplifiersSubtree, phases))
+    else:
+        raise ValueError("Unknown executor {}, expected serial, thread, process or batch".format(executor))
+
+    statistics["steps_executed"] = sum(result[1]["steps_executed"] for result in subtree_results)
+    statistics["steps_saved"] = sum(result[1]["steps_saved"] for result in subtree_results)
+    return max(result[0] for result in subtree_results)
+
+
+# Amplifiers search of pool worker process - program image is built once per worker process
+_worker_search = {}
+
+
+def _initAmplifiersWorker(program_words, phases, feedback_loop):
+    _worker_search["program_image"] = ProgramImage(program_words)
+    _worker_search["phases"] = phases
+    _worker_search["feedback_loop"] = feedback_loop
+
+
+def _searchAmplifiersSubtree(first_phase):
+    return walkAmplifierPrefixes(_worker_search["program_image"], _worker_search["phases"],
+                                 _worker_search["feedback_loop"], [first_phase])
+
+
+def searchAmplifiersBatch(program_image, phases, feedback_loop):
     """
-    Advent Of Code 2019 - Day07 Solution.
-    :return: tuple(partOneResult[int], partTwoResult[int])
+    Runs all phase permutations at once - every amplifier is a batch of instances, one instance per permutation.
+    :param program_image: commons.intcode.ProgramImage (or [] program) of an amplifier
+    :param phases: phase settings to permute, one for each amplifier
+    :param feedback_loop: True - output of last amplifier is fed back to first one, until last amplifier stops
+    :return: tuple(max_output[int], statistics[dict])
     """
+    phase_permutations = list(permutations(phases))
+    amplifiers_count = len(phases)
 
-    # Store parsed puzzle input "globally" to avoid re-reading input file in part-two of the puzzle. We copy parsed program instead.
-    # Read puzzle input from file - input is single line
-    puzzle_input = read_puzzle_input(os.path.dirname(os.path.abspath(__file__)), "day07_input.txt")[0]
+    # Every amplifier reads phase of its permutation first
+    amplifiers = [BatchMachine(program_image, len(phase_permutations)) for i in range(amplifiers_count)]
+    for amplifier_idx, amplifier in enumerate(amplifiers):
+        amplifier.addInput([phase_permutation[amplifier_idx] for phase_permutation in phase_permutations])
 
-    # Split input on "," to list of integers
-    REGISTER_SPLITTER = ","
-    puzzle_input_program = [int(x) for x in puzzle_input.split(REGISTER_SPLITTER)]
+    # Output of previous amplifier, initialized to 0 (0 input to 0th amplifier)
+    previous_machine_outputs = 0
+    amplifier_offset = 0
 
-    def solvePartOne():
-        """Advent Of Code 2019 - Day07 - Part One Solution.
-        :return: int
-        """
-        amplifiers_config_options = permutations([i for i in range(5)])
+    # Single pass through the chain, or loop until last amplifier of every permutation stops
+    while amplifier_offset < amplifiers_count or (feedback_loop and not amplifiers[-1].isStopped()):
+        current_amplifier = amplifiers[amplifier_offset % amplifiers_count]
+        current_amplifier.addInput(previous_machine_outputs)
+        current_amplifier.runProgram()
 
-        # Answer for part one - maximum output
-        max_amplifiers_output = 0
+        # Last output of every instance (diagnostic code)
+        previous_machine_outputs = current_amplifier.last_output.copy()
+        amplifier_offset += 1
 
-        # Try every possible phase permutation
-        for amplifier_config_option in amplifiers_config_options:
+    statistics = {"steps_executed": sum(amplifier.steps_executed for amplifier in amplifiers), "steps_saved": 0}
+    return int(previous_machine_outputs.max()), statistics
 
-            previous_machine_output = 0  # Output of previous amplifier, initialized to 0 (0 input to 0th amplifier)
 
-            # Create five machines
-            amplifiers_count = 5
-            amplifiers = [VirtualMachine(puzzle_input_program) for i in range(amplifiers_count)]
+def walkAmplifierPrefixes(program_image, phases, feedback_loop, first_phases):
+    """
+    Searches subtrees of phase prefixes tree, starting with first_phases.
+    :param program_image: commons.intcode.ProgramImage (or [] program) of an amplifier
+    :param phases: phase settings to permute, one for each amplifier
+    :param feedback_loop: True - output of last amplifier is fed back to first one, until last amplifier stops
+    :param first_phases: phases of first amplifier to be searched
+    :return: tuple(max_output[int], statistics[dict])
+    """
+    amplifiers_count = len(phases)
+    statistics = {"steps_executed": 0, "steps_saved": 0}
 
-            # Convert permutation object to list
-            amplifiers_config = list(amplifier_config_option)
+    # Number of permutations sharing prefix of given length
+    permutations_count_by_prefix_length = [factorial(amplifiers_count - prefix_length)
+                                           for prefix_length in range(amplifiers_count + 1)]
 
-            # Order of amplifier to be started
-            amplifier_offset = 0
+    def finishFeedbackLoop(prefix_amplifiers, previous_machine_outputs):
+        # Work on copies, prefix machines are shared by other permutations
+        amplifiers = [amplifier.fork() for amplifier in prefix_amplifiers]
+        steps_before = sum(amplifier.steps_executed for amplifier in amplifiers)
 
-            # Run all machines
-            for i in range(amplifiers_count):
-                # Construct configuration, consisting of [phase, previous_output]
-                amplifier_config = [amplifiers_config[amplifier_offset % amplifiers_count], previous_machine_output]
+        # Connect amplifiers into a ring, first round has been already done by prefix walk - outputs of last amplifier
+        # are waiting for the first one
+        network = IntcodeNetwork()
+        for amplifier in amplifiers:
+            network.addMachine(amplifier)
+        network.connectChain(amplifiers, loop=True)
+        amplifiers[0].addInput(*previous_machine_outputs)
 
-                # Load and set input for current virtual machine/amplifier
-                current_vm = amplifiers[amplifier_offset % amplifiers_count]
-                current_vm.setInput(amplifier_config)
+        # Run until machines stop
+        network.run()
 
-                # Run program on machine (until it stops, or outputs new value)
-                current_vm.runProgram()
+        statistics["steps_executed"] += sum(amplifier.steps_executed for amplifier in amplifiers) - steps_before
+        return amplifiers[-1].getDiagnosticCode()
 
-                # Get output value from current machine
-                previous_machine_output = current_vm.getDiagnosticCode()
+    def walkPrefix(prefix_amplifiers, previous_machine_outputs, phase, remaining_phases):
+        # Run next amplifier with phase and outputs of previous amplifier, until it stops or needs next input
+        current_vm = VirtualMachine(program_image, phase)
+        current_vm.addInput(*previous_machine_outputs)
+        current_vm.runProgram()
 
-                amplifier_offset += 1
+        # Same run would be repeated by every permutation sharing the prefix
+        statistics["steps_executed"] += current_vm.steps_executed
+        statistics["steps_saved"] += current_vm.steps_executed * (
+                permutations_count_by_prefix_length[len(prefix_amplifiers) + 1] - 1)
 
-            # Store new maximum
-            if previous_machine_output > max_amplifiers_output:
-                max_amplifiers_output = previous_machine_output
+        prefix_amplifiers = prefix_amplifiers + [current_vm]
+        previous_machine_outputs = current_vm.machine_output
 
-        return max_amplifiers_output
+        # All phases are set - permutation is complete
+        if not remaining_phases:
+            if feedback_loop:
+                return finishFeedbackLoop(prefix_amplifiers, previous_machine_outputs)
+            return current_vm.getDiagnosticCode()
 
-    def solvePartTwo():
-        """Advent Of Code 2019 - Day07 - Part Two Solution.
-        :return: int
-        """
-        # All configuration options - permutations of [5, 6, 7, 8, 9]
-        amplifiers_config_options = permutations([i for i in range(5, 10)])
+        # Try every remaining phase for next amplifier and keep maximum
+        return max(walkPrefix(prefix_amplifiers, previous_machine_outputs, remaining_phases[idx],
+                              remaining_phases[:idx] + remaining_phases[idx + 1:])
+                   for idx in range(len(remaining_phases)))
 
-        # Answer for part two - maximum output
-        max_amplifiers_output = 0
+    max_amplifiers_output = 0
 
-        # Try every possible phase permutation
-        for amplifier_config_option in amplifiers_config_options:
+    for phase in first_phases:
+        remaining_phases = phases[:]
+        remaining_phases.remove(phase)
 
-            previous_machine_output = 0  # Output of previous amplifier, initialized to 0 (0 input to 0th amplifier)
+        # Output of previous amplifier, initialized to 0 (0 input to 0th amplifier)
+        amplifiers_output = walkPrefix([], [0], phase, remaining_phases)
 
-            # Create five machines
-            amplifiers_count = 5
-            amplifiers = [VirtualMachine(puzzle_input_program) for i in range(amplifiers_count)]
+        # Store new maximum
+        if amplifiers_output > max_amplifiers_output:
+            max_amplifiers_output = amplifiers_output
 
-            # Convert permutation object to list
-            amplifiers_config = list(amplifier_config_option)
+    return max_amplifiers_output, statistics
 
-            # Order of amplifier to be started
-            amplifier_offset = 0
 
-            # loop until last-4th machine stops
-            while not amplifiers[4].isStopped():
-                # Construct configuration, consisting of [phase, previous_output]
-                amplifier_config = [amplifiers_config[amplifier_offset % amplifiers_count], previous_machine_output]
+def parseInput(input_data):
+    """
+    Parses puzzle input - single line of integers split by ",".
+    :param input_data: str
+    :return: [] program
+    """
+    return list(parse_ints(input_data))
 
-                # Load and set input for current virtual machine/amplifier
-                current_vm = amplifiers[amplifier_offset % amplifiers_count]
-                current_vm.setInput(amplifier_config)
 
-                # Run program on machine (until it stops, or outputs new value)
-                current_vm.runProgram()
+def loadInput():
+    """
+    Reads and parses puzzle input file (parsed program is cached).
+    """
+    return list(load_parsed_input(os.path.dirname(os.path.abspath(__file__)), "day07_input.txt", "intcode",
+                                  read_puzzle_ints))
 
-                # Get output value from current machine
-                previous_machine_output = current_vm.getDiagnosticCode()
 
-                amplifier_offset += 1
+def solvePartOne(input_program):
+    """Advent Of Code 2019 - Day07 - Part One Solution.
+    :param input_program: parsed input (see parseInput), or commons.intcode.ProgramImage
+    :return: int
+    """
+    # All configuration options - permutations of [0, 1, 2, 3, 4]
+    return findMaxAmplifiersOutput(getProgramImage(input_program), range(5), False)
 
-            # Store new maximum
-            if previous_machine_output > max_amplifiers_output:
-                max_amplifiers_output = previous_machine_output
 
-        return max_amplifiers_output
+def solvePartTwo(input_program):
+    """Advent Of Code 2019 - Day07 - Part Two Solution.
+    :param input_program: parsed input (see parseInput), or commons.intcode.ProgramImage
+    :return: int
+    """
+    # All configuration options - permutations of [5, 6, 7, 8, 9]
+    return findMaxAmplifiersOutput(getProgramImage(input_program), range(5, 10), True)
+
 
-    return solvePartOne(), solvePartTwo()
+def solve():
+    """
+    Advent Of Code 2019 - Day07 Solution.
+    :return: tuple(partOneResult[int], partTwoResult[int])
+    """
+    # Decoded program image shared by all the amplifiers of both parts
+    program_image = getProgramImage(loadInput())
+    return solvePartOne(program_image), solvePartTwo(program_image)
@@ -1,95 +1,213 @@
-from commons.commons import read_puzzle_input
+from commons.commons import puzzle_input_path
 import os
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def getCharCount(input_string):
+# Pixel colors
+BLACK = 0
+WHITE = 1
+TRANSPARENT = 2
+
+
+class ImageDecoder():
+    def __init__(self, width, height):
+        """
+        Incremental Space Image Format decoder - layers are added in chunks (any number of whole layers), decoder
+        keeps only the running fewest zeros checksum and the running composite, so memory doesn't grow with image size.
+        Uses NumPy, when available.
+        :param width: width of image
+        :param height: height of image
+        """
+        self.width = width
+        self.height = height
+        self.layer_size = width * height
+        if self.layer_size <= 0:
+            raise ValueError("Invalid image size {}x{}".format(width, height))
+
+        self.layers_count = 0
+        self.fewest_zeros = None
+        self.checksum = None
+        if numpy is not None:
+            self.composite = numpy.full(self.layer_size, TRANSPARENT, dtype=numpy.uint8)
+        else:
+            self.composite = [TRANSPARENT] * self.layer_size
+            self.transparent_pixels = list(range(self.layer_size))  # Indexes of pixels still transparent
+
+    def addLayers(self, layers_data):
+        """
+        Adds next layers (below the already added ones).
+        :param layers_data: bytes of digits, length must be multiple of layer size
+        """
+        if len(layers_data) % self.layer_size != 0:
+            raise ValueError("Image data of {} digits can't be split to {}x{} layers".format(
+                len(layers_data), self.width, self.height))
+        if not layers_data:
+            return
+
+        if numpy is not None:
+            self._addLayersNumpy(layers_data)
+        else:
+            self._addLayersPython(layers_data)
+        self.layers_count += len(layers_data) // self.layer_size
+
+    def _updateChecksum(self, zeros_count, ones_count, twos_count):
+        # Strictly fewer zeros - first layer wins among layers with same number of zeros
+        if self.fewest_zeros is None or zeros_count < self.fewest_zeros:
+            self.fewest_zeros = zeros_count
+            self.checksum = ones_count * twos_count
+
+    def _addLayersNumpy(self, layers_data):
+        # Digits as array of shape (layers, pixels)
+        layers = (numpy.frombuffer(layers_data, dtype=numpy.uint8) - ord("0")).reshape(-1, self.layer_size)
+        if (layers > 9).any():
+            raise ValueError("Image contains non-digit characters")
+
+        # Occurrences of every digit in every layer - single bincount over (layer index * 10 + digit)
+        layer_indexes = numpy.repeat(numpy.arange(len(layers)), self.layer_size)
+        digit_counts = numpy.bincount(layer_indexes * 10 + layers.ravel(), minlength=len(layers) * 10).reshape(-1, 10)
+        fewest_zeros_layer = digit_counts[numpy.argmin(digit_counts[:, 0])]
+        self._updateChecksum(int(fewest_zeros_layer[0]), int(fewest_zeros_layer[1]), int(fewest_zeros_layer[2]))
+
+        # First non-transparent layer of every pixel (0, when all layers are transparent - pixel stays transparent),
+        # shows through pixels, which are transparent in layers above
+        visible_layer = numpy.argmax(layers != TRANSPARENT, axis=0)
+        visible_pixels = layers[visible_layer, numpy.arange(self.layer_size)]
+        self.composite = numpy.where(self.composite == TRANSPARENT, visible_pixels, self.composite)
+
+    def _addLayersPython(self, layers_data):
+        composite = self.composite
+        for idx_start in range(0, len(layers_data), self.layer_size):
+            layer = layers_data[idx_start:idx_start + self.layer_size]
+            self._updateChecksum(layer.count(b"0"), layer.count(b"1"), layer.count(b"2"))
+
+            # Only pixels still transparent are visited
+            still_transparent = []
+            for idx in self.transparent_pixels:
+                pixel = layer[idx] - ord("0")
+                if pixel == TRANSPARENT:
+                    still_transparent.append(idx)
+                else:
+                    composite[idx] = pixel
+            self.transparent_pixels = still_transparent
+
+    def getImage(self):
+        """
+        Returns composed image.
+        :return: [] of rows, every row list of pixel colors
+        """
+        composite = self.composite.tolist() if numpy is not None else self.composite
+        return [composite[row * self.width:(row + 1) * self.width] for row in range(self.height)]
+
+    def getResult(self):
+        """
+        Returns checksum of layer with fewest 0 digits (1 digits count multiplied by 2 digits count) and composed
+        image.
+        :return: tuple(checksum[int], image[list of rows])
+        """
+        if not self.layers_count:
+            raise ValueError("Image has no layers")
+        return self.checksum, self.getImage()
+
+
+def decodeImage(image_digits, width, height):
     """
-    Breaks input string into characters and counts occurrences of them.
-    :param input_string: e.g. "01122211"
-    :return: e.g. {'0':1, '1':4, '2':3}
+    Decodes Space Image Format image held in memory.
+    :param image_digits: str of digits, e.g. "123456789012"
+    :param width: width of image
+    :param height: height of image
+    :return: tuple(checksum[int], image[list of rows, every row list of pixel colors])
     """
-    char_count = {}
+    decoder = ImageDecoder(width, height)
+    decoder.addLayers(image_digits.strip().encode("ascii"))
+    return decoder.getResult()
 
-    for char in input_string:
-        try:
-            char_count[char] += 1
-        except KeyError:
-            char_count[char] = 1
 
-    return char_count
+def decodeImageFile(file_path, width, height, chunk_layers=1024):
+    """
+    Decodes Space Image Format image file in chunks of chunk_layers layers - memory use depends on chunk size only,
+    not on size of the image.
+    :param file_path: path to image file (single line of digits)
+    :param width: width of image
+    :param height: height of image
+    :param chunk_layers: number of layers read at once
+    :return: tuple(checksum[int], image[list of rows, every row list of pixel colors])
+    """
+    decoder = ImageDecoder(width, height)
+    chunk_size = decoder.layer_size * max(1, chunk_layers)
+
+    with open(file_path, "rb") as image_file:
+        while True:
+            chunk = image_file.read(chunk_size)
+            if len(chunk) == chunk_size and not chunk[-1:].isspace():
+                decoder.addLayers(chunk)
+                continue
 
+            # Trailing new line (or other whitespace) ends the image
+            decoder.addLayers(chunk.rstrip())
+            if image_file.read(chunk_size).strip():
+                raise ValueError("Image data continues after whitespace")
+            break
 
-def solve():
+    return decoder.getResult()
+
+
+def renderImage(image):
     """
-    Advent Of Code 2019 - Day08 Solution.
-    :return: tuple(partOneResult[int], partTwoResult[int])
+    Renders decoded image as text - white pixels as "#", black and transparent pixels as ".".
+    :param image: [] of rows, every row list of pixel colors
+    :return: str
     """
+    # Empty line to display nicely when running AdventOfCode2019.py from root package
+    return "\n" + "".join("".join("#" if pixel == WHITE else "." for pixel in row) + "\n" for row in image)
 
-    # Read puzzle input from file - input is single line
-    puzzle_input = read_puzzle_input(os.path.dirname(os.path.abspath(__file__)), "day08_input.txt")[0]
 
-    ROW_WIDTH = 25
-    COL_HEIGHT = 6
+# Size of puzzle image
+ROW_WIDTH = 25
+COL_HEIGHT = 6
 
-    def solvePartOne():
-        """Advent Of Code 2019 - Day08 - Part One Solution.
-        :return: int
-        """
-        layers = []
 
-        # Break input string into layers
-        for idx_start in range(0, len(puzzle_input), ROW_WIDTH * COL_HEIGHT):
-            # Calculate occurrences count for each character in layer
-            layers.append(getCharCount(puzzle_input[idx_start:idx_start + ROW_WIDTH * COL_HEIGHT]))
+def parseInput(input_data):
+    """
+    Parses (decodes) puzzle input - single line of digits. Both parts are answered from the decoded image.
+    :param input_data: str
+    :return: tuple(checksum[int], image[list of rows])
+    """
+    return decodeImage(input_data, ROW_WIDTH, COL_HEIGHT)
 
-        # Sort layers by occurrences of '0' character
-        layers.sort(key=lambda x: x['0'] if '0' in x else 0)
 
-        # Multiply occurrences of '1' by occurrences of '2'
-        return layers[0]['1'] * layers[0]['2']
+def loadInput():
+    """
+    Reads and decodes puzzle input file - image is streamed from file in layer chunks.
+    """
+    return decodeImageFile(puzzle_input_path(os.path.dirname(os.path.abspath(__file__)), "day08_input.txt"),
+                           ROW_WIDTH, COL_HEIGHT)
 
-    def solvePartTwo():
-        """Advent Of Code 2019 - Day08 - Part Two Solution.
-        :return: int
-        """
-        top_layer = None
 
-        # Loop through input string
-        for idx_start in range(0, len(puzzle_input), ROW_WIDTH * COL_HEIGHT):
-            # In case nothing is on top yet, copy first layer
-            if top_layer is None:
-                top_layer = puzzle_input[idx_start:ROW_WIDTH * COL_HEIGHT]
-                continue
+def solvePartOne(decoded_image):
+    """Advent Of Code 2019 - Day08 - Part One Solution.
+    :param decoded_image: parsed input (see parseInput)
+    :return: int
+    """
+    # Occurrences of '1' multiplied by occurrences of '2' in layer with fewest '0'
+    return decoded_image[0]
 
-            # Construct new "top-to-bottom" view
-            current_layer = ""
-            # Loop through currently parsed layer
-            for idx in range(ROW_WIDTH * COL_HEIGHT):
-                # If top layer is transparent on top, display character from currently parsed layer
-                if top_layer[idx] == '2':
-                    current_layer += puzzle_input[idx_start + idx]
-                # Otherwise display what is already on top
-                else:
-                    current_layer += top_layer[idx]
-
-            # Set layer just calculated as new top layer
-            top_layer = current_layer
-
-        # Empty line to display nicely when running AdventOfCode2019.py from root package
-        part_two_result = "\n"
-
-        # Break layers into rows
-        for row in range(COL_HEIGHT):
-            # Break layers into columns
-            for col in range(ROW_WIDTH):
-                # Display pixel if it is BLACK
-                if top_layer[row * ROW_WIDTH + col] == '1':
-                    part_two_result += "#"
-                # When white/transparent display nothing
-                else:
-                    part_two_result += "."
-            part_two_result += "\n"
 
-        return part_two_result
+def solvePartTwo(decoded_image):
+    """Advent Of Code 2019 - Day08 - Part Two Solution.
+    :param decoded_image: parsed input (see parseInput)
+    :return: str
+    """
+    return renderImage(decoded_image[1])
+
 
-    return solvePartOne(), solvePartTwo()
+def solve():
+    """
+    Advent Of Code 2019 - Day08 Solution.
+    :return: tuple(partOneResult[int], partTwoResult[str])
+    """
+    # Image is decoded once for both parts
+    decoded_image = loadInput()
+    return solvePartOne(decoded_image), solvePartTwo(decoded_image)
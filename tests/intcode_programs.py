@@ -0,0 +1,66 @@
+"""
+Random Intcode programs shared by equivalence tests - every engine must behave exactly as the interpreter
+(commons.intcode.IntcodeMachine) on them.
+"""
+from commons.intcode import IntcodeMachine
+
+# Step budget of random programs, which must halt (or block) within it to be tested
+RANDOM_PROGRAM_STEPS = 300
+
+
+def randomProgram(rng):
+    """
+    Generates random program - arithmetic, compare, jump, input and output instructions with parameters pointing mostly
+    to data area after the code (some of them into the code, so programs may modify themselves).
+    """
+    code_length = rng.randint(10, 60)
+    size = code_length + 20
+    words = []
+    while len(words) < code_length:
+        opcode = rng.choice((1, 1, 2, 7, 8, 5, 6, 4, 3, 1, 2))
+        modes = [rng.random() < 0.4 for param_idx in range(2)]
+        if opcode == 3:
+            word = opcode
+        elif opcode == 4:
+            word = opcode + 100 * modes[0]
+        else:
+            word = opcode + 100 * modes[0] + 1000 * modes[1]
+
+        params = []
+        for param_idx in range({1: 3, 2: 3, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3}[opcode]):
+            if opcode in (5, 6) and param_idx == 1 and rng.random() < 0.8:
+                # Jump target - into code for immediate target, cell of data area holding it for position mode
+                params.append(rng.randrange(0, code_length) if modes[1] else rng.randrange(code_length, size))
+            elif rng.random() < 0.85:
+                params.append(rng.randrange(code_length, size))
+            else:
+                params.append(rng.randrange(0, size))
+        words += [word] + params
+
+    words.append(99)
+    while len(words) < size + 10:
+        words.append(rng.randint(-3, 30))
+    return words
+
+
+def haltsWithin(program, inputs, steps_limit, value_limit=pow(10, 30)):
+    """
+    Checks, whether program halts or blocks within steps_limit steps, without error and values above value_limit.
+    Jump to a negative address stops the interpreter too, such programs are left out.
+    """
+    machine = IntcodeMachine(program)
+    machine.addInput(*inputs)
+    memory = machine.registers
+    ip = 0
+    try:
+        for step in range(steps_limit):
+            opcode = memory[ip] % 100
+            handler = machine.decoded[ip] or machine.decode(ip)
+            ip = handler(machine, memory, machine.decoded, ip)
+            if ip < 0:
+                return opcode in (3, 99)
+            if max(map(abs, memory)) > value_limit:
+                return False
+    except (ValueError, IndexError):
+        return False
+    return False
@@ -0,0 +1,77 @@
+"""
+Tests of NumPy batch Intcode machine - every instance must behave exactly as commons.intcode.IntcodeMachine.
+Run from root package: python -m pytest tests (or python -m unittest discover tests)
+"""
+from commons.intcode import IntcodeMachine
+from commons.intcode_batch import BatchMachine, numpy
+from tests.intcode_programs import RANDOM_PROGRAM_STEPS, haltsWithin, randomProgram
+import random
+import unittest
+
+# Jumps to address 7 directly (mem[12] != 0) or through address 3 - instances diverge for one step. Word on address 7
+# is add with mode digits of its write target (100001), which is accepted as add.
+DIVERGENT_PROGRAM = [1005, 12, 7, 1105, 1, 7, 0, 100001, 13, 13, 13, 99, 0, 5]
+
+# Values of random programs stay within it, so that no int64 operation of batch machine overflows
+_BATCH_VALUE_LIMIT = pow(2, 31)
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class BatchMachineTest(unittest.TestCase):
+    def testDivergentNonCanonicalWord(self):
+        for values in ([0, 1], [1, 1], [0, 0]):
+            batch_machine = BatchMachine(DIVERGENT_PROGRAM, len(values))
+            batch_machine.setRegisters(12, values)
+            batch_machine.runProgram()
+
+            for instance_idx, value in enumerate(values):
+                machine = IntcodeMachine(DIVERGENT_PROGRAM)
+                machine.setRegister(12, value)
+                machine.runProgram()
+                self.assertEqual(batch_machine.getRegisters(13)[instance_idx], machine.registers[13])
+
+    def testDivergentInvalidWord(self):
+        program = [1005, 9, 7, 1105, 1, 7, 0, 55, 99, 0]
+        batch_machine = BatchMachine(program, 2)
+        batch_machine.setRegisters(9, [0, 1])
+        with self.assertRaisesRegex(ValueError, "Invalid instruction 55 at address 7"):
+            batch_machine.runProgram()
+
+    def testRandomPrograms(self):
+        # Instances with different inputs diverge - grouped, lockstep and halted instances are mixed
+        rng = random.Random(2008)
+        tested_programs = 0
+        for trial in range(2000):
+            program = randomProgram(rng)
+            input_sets = [[rng.randint(0, 20) for input_idx in range(5)] for instance_idx in range(4)]
+            if not all(haltsWithin(program, inputs, RANDOM_PROGRAM_STEPS, _BATCH_VALUE_LIMIT) for inputs in input_sets):
+                continue
+            tested_programs += 1
+
+            batch_machine = BatchMachine(program, len(input_sets))
+            for input_idx in range(5):
+                batch_machine.addInput([inputs[input_idx] for inputs in input_sets])
+            batch_machine.runProgram()
+
+            machines = []
+            for instance_idx, inputs in enumerate(input_sets):
+                machine = IntcodeMachine(program)
+                machine.addInput(*inputs)
+                machine.runProgram()
+                machines.append(machine)
+
+                message = "program {}, inputs {}".format(program, inputs)
+                self.assertEqual(batch_machine.getOutputs()[instance_idx], machine.machine_output, message)
+                self.assertEqual(batch_machine.registers[instance_idx].tolist(), machine.registers, message)
+                self.assertEqual(batch_machine.stopped[instance_idx], machine.stopped, message)
+                # Halted instance stays on its halt instruction, only waiting instances are resumed from their address
+                if not machine.stopped:
+                    self.assertEqual(batch_machine.instruction_pointers[instance_idx], machine.instruction_pointer,
+                                     message)
+                self.assertEqual(batch_machine.waiting_for_input[instance_idx], machine.waiting_for_input, message)
+            self.assertEqual(batch_machine.steps_executed, sum(machine.steps_executed for machine in machines))
+        self.assertGreater(tested_programs, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
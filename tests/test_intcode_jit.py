@@ -0,0 +1,96 @@
+"""
+Tests of Intcode to Python compiler - compiled machines must behave exactly as interpreted ones.
+Run from root package: python -m pytest tests (or python -m unittest discover tests)
+"""
+from commons.intcode import IntcodeMachine
+from commons.intcode_jit import CompiledProgram, MachineCode
+from tests.intcode_programs import RANDOM_PROGRAM_STEPS, haltsWithin, randomProgram
+import random
+import unittest
+
+# Adds 1 + 1 into the last cell
+ADD_PROGRAM = [1101, 1, 1, 5, 99, 0]
+
+# Loop writing input over the operand of add on address 3, outputs running sum of previous inputs
+INPUT_OPERAND_PROGRAM = [1105, 1, 3,  # 0: jump to 3
+                         1101, 0, 0, 20,  # 3: mem[20] = input + 0
+                         3, 5,  # 7: mem[5] = input
+                         1, 20, 21, 21,  # 9: mem[21] += mem[20]
+                         4, 21,  # 13: output mem[21]
+                         1105, 1, 3] + [0] * 4  # 15: jump to 3
+
+
+def _runMachine(program, inputs, compiled_program=None):
+    """
+    Runs program with inputs (interpreted, or compiled with compiled_program) and returns final state of the machine.
+    """
+    machine = IntcodeMachine(program, compiled=compiled_program)
+    machine.addInput(*inputs)
+    machine.runProgram()
+    return {"output": machine.machine_output, "memory": machine.registers, "ip": machine.instruction_pointer,
+            "steps": machine.steps_executed, "stopped": machine.stopped, "waiting": machine.waiting_for_input}
+
+
+class IntcodeJitTest(unittest.TestCase):
+    def testSharedProgramWithChangedStartWord(self):
+        compiled_program = CompiledProgram(ADD_PROGRAM)
+        machine = IntcodeMachine(ADD_PROGRAM, compiled=compiled_program)
+        machine.runProgram()
+        self.assertEqual(machine.registers[5], 2)
+
+        # Shared block doesn't match the changed instruction word, it is compiled for the second machine only
+        machine = IntcodeMachine(ADD_PROGRAM, compiled=compiled_program)
+        machine.setRegister(0, 1102)
+        machine.runProgram()
+        self.assertEqual(machine.registers[5], 1)
+
+        # Invalid instruction is reported by interpreter
+        machine = IntcodeMachine(ADD_PROGRAM, compiled=compiled_program)
+        machine.setRegister(0, 55)
+        with self.assertRaisesRegex(ValueError, "Invalid instruction 55 at address 0"):
+            machine.runProgram()
+
+        machine = IntcodeMachine(ADD_PROGRAM, compiled=compiled_program)
+        machine.runProgram()
+        self.assertEqual(machine.registers[5], 2)
+
+    def testBlockedInterpretedInput(self):
+        compiled_program = CompiledProgram(INPUT_OPERAND_PROGRAM)
+        machine = IntcodeMachine(INPUT_OPERAND_PROGRAM, compiled=compiled_program)
+        machine.jit_state = MachineCode(compiled_program, machine)
+        machine.jit_state.interpreted_addresses.add(7)
+        machine.addInput()
+
+        # Input blocks without writing - operand baked into block on address 3 stays compiled
+        machine.runProgram()
+        self.assertTrue(machine.waiting_for_input)
+        self.assertNotIn(5, compiled_program.volatile_addresses)
+        self.assertIn(3, machine.jit_state.active_blocks)
+
+        # Written input makes it volatile
+        machine.addInput(4)
+        machine.runProgram()
+        self.assertIn(5, compiled_program.volatile_addresses)
+        machine.addInput(7)
+        machine.runProgram()
+        self.assertEqual(machine.machine_output, [0, 4])
+
+    def testRandomPrograms(self):
+        # Several input sets run on one compiled program - later machines reuse, retract or recompile shared blocks
+        rng = random.Random(2002)
+        tested_programs = 0
+        for trial in range(2000):
+            program = randomProgram(rng)
+            input_sets = [[rng.randint(0, 20) for input_idx in range(5)] for input_set_idx in range(3)]
+            if not all(haltsWithin(program, inputs, RANDOM_PROGRAM_STEPS) for inputs in input_sets):
+                continue
+            tested_programs += 1
+            compiled_program = CompiledProgram(program)
+            for inputs in input_sets:
+                self.assertEqual(_runMachine(program, inputs, compiled_program), _runMachine(program, inputs),
+                                 "program {}, inputs {}".format(program, inputs))
+        self.assertGreater(tested_programs, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Equivalence tests of Intcode optimizer - optimized program must behave exactly as unmodified one on the interpreter
+(same outputs, final state, executed steps and memory, see commons.intcode_optimizer.findDifferences).
+Run from root package: python -m pytest tests (or python -m unittest discover tests)
+"""
+from commons.intcode import IntcodeMachine
+from commons.intcode_optimizer import findDifferences, optimizeProgram
+from day02 import day02
+from day05 import day05
+from day07 import day07
+from tests.intcode_programs import RANDOM_PROGRAM_STEPS, haltsWithin, randomProgram
+import random
+import unittest
+
+# Loop adding step (volatile cell 102, set before every run) to accumulator step times, outputs accumulator
+STEP_LOOP_PROGRAM = [1001, 102, 0, 100,  # 0: counter = step
+                     1, 101, 102, 101,  # 4: accumulator += step
+                     1001, 100, -1, 100,  # 8: counter -= 1
+                     1007, 100, 1, 103,  # 12: done = counter < 1
+                     1006, 103, 4,  # 16: if not done: jump to 4
+                     4, 101,  # 19: output accumulator
+                     99] + [0] * 82
+
+# Loop counting input down to 0, outputs every counter value
+INPUT_LOOP_PROGRAM = [3, 100,  # 0: counter = input
+                      4, 100,  # 2: output counter
+                      1001, 100, -1, 100,  # 4: counter -= 1
+                      1005, 100, 2,  # 8: if counter != 0: jump to 2
+                      99] + [0] * 89
+
+# Self-modifying program - input is written over the immediate operand of instruction on address 6
+SELF_MODIFYING_OPERAND_PROGRAM = [3, 7,  # 0: mem[7] = input
+                                  1101, 0, 0, 100,  # 2: mem[100] = 0
+                                  1101, 5, 7, 100,  # 6: mem[100] = input + 7
+                                  4, 100,  # 10: output mem[100]
+                                  99] + [0] * 88
+
+# Self-modifying program - input is written over instruction word on address 2 (e.g. 1102 - mul, 99 - halt)
+SELF_MODIFYING_INSTRUCTION_PROGRAM = [3, 2,  # 0: mem[2] = input
+                                      1101, 5, 7, 100,  # 2: mem[100] = 5 + 7
+                                      4, 100,  # 6: output mem[100]
+                                      99] + [0] * 92
+
+
+class IntcodeOptimizerTest(unittest.TestCase):
+    def assertEquivalent(self, program, optimized_program, inputs=(), registers=None):
+        differences = findDifferences(program, optimized_program, inputs, registers)
+        self.assertEqual(differences, [], "inputs {}, registers {}".format(inputs, registers))
+
+    def testDay02(self):
+        program = day02.loadInput()
+        optimized_program = optimizeProgram(program, {1: range(100), 2: range(100)}, (0,))
+        self.assertTrue(optimized_program.analysis.complete)
+        self.assertGreater(optimized_program.folded_operands, 0)
+        for noun in range(0, 100, 9):
+            for verb in range(0, 100, 13):
+                self.assertEquivalent(program, optimized_program, registers={1: noun, 2: verb})
+
+    def testDay05(self):
+        program = day05.loadInput()
+        optimized_program = optimizeProgram(program)
+        # Input dependent self-modification - program is left as it is
+        self.assertFalse(optimized_program.analysis.complete)
+        self.assertEqual(optimized_program.words, program)
+        for system_id in (1, 5):
+            self.assertEquivalent(program, optimized_program, (system_id,))
+
+    def testDay07(self):
+        program = day07.loadInput()
+        optimized_program = optimizeProgram(program)
+        # Jump table indexed by phase setting - program is left as it is
+        self.assertFalse(optimized_program.analysis.complete)
+        for phase in range(10):
+            for signal in (0, 17):
+                self.assertEquivalent(program, optimized_program, (phase, signal))
+
+    def testLoopWithVolatileCell(self):
+        for volatile_addresses in ((102,), {102: range(1, 30)}):
+            optimized_program = optimizeProgram(STEP_LOOP_PROGRAM, volatile_addresses)
+            self.assertTrue(optimized_program.analysis.complete)
+            self.assertTrue(optimized_program.fused_addresses)
+            # Step is never folded into the code
+            self.assertNotIn(4, optimized_program.rewritten_addresses)
+            for step in range(1, 30, 4):
+                self.assertEquivalent(STEP_LOOP_PROGRAM, optimized_program, registers={102: step})
+                machine = IntcodeMachine(optimized_program.image)
+                machine.setRegister(102, step)
+                machine.runProgram()
+                self.assertEqual(machine.machine_output, [step * step])
+
+    def testLoopBlockingOnInput(self):
+        optimized_program = optimizeProgram(INPUT_LOOP_PROGRAM)
+        self.assertTrue(optimized_program.fused_addresses)
+        for inputs in ((), (1,), (7,), (40,)):
+            self.assertEquivalent(INPUT_LOOP_PROGRAM, optimized_program, inputs)
+
+    def testSelfModifyingOperand(self):
+        optimized_program = optimizeProgram(SELF_MODIFYING_OPERAND_PROGRAM)
+        # Control flow doesn't change, only the written operand must stay as it is
+        self.assertTrue(optimized_program.analysis.complete)
+        self.assertNotIn(7, optimized_program.rewritten_addresses)
+        self.assertEqual(optimized_program.fused_addresses, [])
+        for value in (0, 3, 11):
+            self.assertEquivalent(SELF_MODIFYING_OPERAND_PROGRAM, optimized_program, (value,))
+
+    def testSelfModifyingInstruction(self):
+        optimized_program = optimizeProgram(SELF_MODIFYING_INSTRUCTION_PROGRAM)
+        self.assertFalse(optimized_program.analysis.complete)
+        self.assertEqual(optimized_program.words, SELF_MODIFYING_INSTRUCTION_PROGRAM)
+        for word in (1101, 1102, 1107, 99):
+            self.assertEquivalent(SELF_MODIFYING_INSTRUCTION_PROGRAM, optimized_program, (word,))
+
+    def testRandomPrograms(self):
+        rng = random.Random(2019)
+        tested_programs = 0
+        for trial in range(3000):
+            program = randomProgram(rng)
+            inputs = [rng.randint(0, 20) for input_idx in range(5)]
+            if not haltsWithin(program, inputs, RANDOM_PROGRAM_STEPS):
+                continue
+            tested_programs += 1
+            self.assertEquivalent(program, optimizeProgram(program), inputs)
+        self.assertGreater(tested_programs, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()